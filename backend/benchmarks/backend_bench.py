@@ -0,0 +1,108 @@
+"""
+Backend benchmark: eager PyTorch vs ONNX Runtime vs TorchScript on CPU.
+
+Each backend runs in its own subprocess so load time and peak RSS are
+measured in isolation. Reports per-stage latency (YOLO detect, CycleGAN
+clean, Siamese embed) at the given batch size.
+
+Usage (after `python -m scripts.export_models --torchscript`):
+    python -m benchmarks.backend_bench --backends torch onnx torchscript --batch-size 4
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(rss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def summarize(samples) -> dict:
+    ordered = sorted(samples)
+    return {
+        "p50_ms": round(ordered[len(ordered) // 2] * 1000, 2),
+        "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 2),
+        "mean_ms": round(sum(ordered) / len(ordered) * 1000, 2),
+    }
+
+
+def run_worker(args) -> dict:
+    from PIL import Image
+    from services.inference_pipeline import InferencePipeline
+
+    started = time.perf_counter()
+    pipeline = InferencePipeline()
+    pipeline.start_loading().result()
+    load_seconds = time.perf_counter() - started
+    rss_after_load = peak_rss_mb()
+
+    rng = np.random.RandomState(0)
+    pages = [rng.randint(0, 256, (1100, 850, 3), dtype=np.uint8) for _ in range(args.batch_size)]
+    crops = [Image.fromarray(rng.randint(0, 256, (180, 420, 3), dtype=np.uint8)) for _ in range(args.batch_size)]
+
+    stages = {
+        "detect": lambda: pipeline._detect_batch([[page] for page in pages]),
+        "clean": lambda: pipeline._clean_batch(crops),
+        "embed": lambda: pipeline._embed_batch(crops),
+    }
+    report = {}
+    for stage, fn in stages.items():
+        for _ in range(args.warmup):
+            fn()
+        samples = []
+        for _ in range(args.iterations):
+            t0 = time.perf_counter()
+            fn()
+            samples.append(time.perf_counter() - t0)
+        report[stage] = summarize(samples)
+
+    return {
+        "backend": pipeline.backend,
+        "batch_size": args.batch_size,
+        "load_seconds": round(load_seconds, 2),
+        "rss_after_load_mb": rss_after_load,
+        "peak_rss_mb": peak_rss_mb(),
+        "stages": report,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", nargs="+", default=["torch", "onnx"])
+    parser.add_argument("--batch-size", type=int, default=1)
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_worker(args)))
+        return
+
+    results = []
+    for backend in args.backends:
+        env = {**os.environ, "INFERENCE_BACKEND": backend}
+        env.setdefault("STORAGE_BACKEND", "local")
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.backend_bench", "--worker",
+             "--batch-size", str(args.batch_size), "--iterations", str(args.iterations),
+             "--warmup", str(args.warmup)],
+            env=env, check=True, capture_output=True, text=True,
+        ).stdout
+        # Model loading prints progress; the report is the last line
+        results.append(json.loads(output.strip().splitlines()[-1]))
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
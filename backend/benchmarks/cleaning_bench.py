@@ -0,0 +1,76 @@
+"""
+Cleaning benchmark: latency of the classical and CycleGAN cleaning paths,
+and where the auto router sends each kind of crop.
+
+Crops come from benchmarks/synthetic.py: clean reference-style signatures,
+and signature boxes cut from scanned pages with ruled lines, with and
+without an overlapping stamp. Every crop is cleaned one at a time through
+InferencePipeline._clean_signature in each mode.
+
+Usage:
+    python -m benchmarks.cleaning_bench --crops 32 --dpi 150
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from collections import Counter
+
+from benchmarks.synthetic import make_document, make_signature
+from services.cleaning import CLEANING_MODES
+
+
+def summarize(samples) -> dict:
+    ordered = sorted(samples)
+    return {
+        "p50_ms": round(ordered[len(ordered) // 2] * 1000, 2),
+        "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 2),
+    }
+
+
+def make_crops(count: int, dpi: int) -> dict:
+    crops = {"clean": [], "scanned": [], "stamped": []}
+    for i in range(count):
+        crops["clean"].append(make_signature(i, seed=i))
+        for kind, stamp in (("scanned", False), ("stamped", True)):
+            page, bbox = make_document(i, seed=i, dpi=dpi, stamp=stamp)
+            crops[kind].append(page.crop(bbox))
+    return crops
+
+
+async def run(args) -> dict:
+    from services.inference_pipeline import InferencePipeline
+
+    pipeline = InferencePipeline()
+    await pipeline.ensure_loaded()
+    crops = make_crops(args.crops, args.dpi)
+
+    report = {"cyclegan_loaded": pipeline.cyclegan_model is not None, "results": []}
+    for kind, images in crops.items():
+        row = {"crops": kind}
+        for mode in args.modes:
+            # Warm-up: first call per shape pays for kernel selection
+            await pipeline._clean_signature(images[0], cleaning=mode)
+            latencies, paths = [], Counter()
+            for image in images:
+                started = time.perf_counter()
+                _, info = await pipeline._clean_signature(image, cleaning=mode)
+                latencies.append(time.perf_counter() - started)
+                paths[info["path"]] += 1
+            row[mode] = {"paths": dict(paths), **summarize(latencies)}
+        report["results"].append(row)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--crops", type=int, default=32, help="Crops of each kind")
+    parser.add_argument("--dpi", type=int, default=150)
+    parser.add_argument("--modes", nargs="+", choices=CLEANING_MODES, default=list(CLEANING_MODES))
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
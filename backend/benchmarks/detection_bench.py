@@ -0,0 +1,79 @@
+"""
+Detection benchmark: recall and latency of full-frame, tiled and adaptive
+detection on synthetic scans of increasing size.
+
+Pages come from benchmarks/synthetic.py, which knows where it drew the
+signature, so recall is measured against ground truth (IoU >= 0.5). Each
+page is decoded once at INGEST_MAX_SIDE, as /verify does, and run through
+InferencePipeline._detect_signature in every mode with the same loaded model.
+
+Usage:
+    python -m benchmarks.detection_bench --papers letter a3 --dpi 150 300 600 --pages 8
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+from benchmarks.synthetic import encode, make_document
+from services.ingest import decode_page
+from services.tiling import DETECTION_MODES, detection_recall
+
+
+def summarize(samples) -> dict:
+    ordered = sorted(samples)
+    return {
+        "p50_ms": round(ordered[len(ordered) // 2] * 1000, 2),
+        "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 2),
+    }
+
+
+async def run(args) -> list:
+    from services.inference_pipeline import InferencePipeline
+
+    pipeline = InferencePipeline()
+    await pipeline.ensure_loaded()
+
+    report = []
+    for paper in args.papers:
+        for dpi in args.dpi:
+            scans = []
+            for i in range(args.pages):
+                image, bbox = make_document(i, seed=i, dpi=dpi, paper=paper)
+                scans.append((decode_page(encode(image), pipeline.ingest_max_side), bbox))
+                del image
+
+            row = {"paper": paper, "dpi": dpi, "size": list(scans[0][0].full_size)}
+            for mode in args.modes:
+                pipeline.detection_mode = mode
+                # Warm-up: first call per shape pays for kernel selection
+                await pipeline._detect_signature(scans[0][0])
+                latencies, recalls = [], []
+                for page, bbox in scans:
+                    started = time.perf_counter()
+                    _, infos = await pipeline._detect_signature(page)
+                    latencies.append(time.perf_counter() - started)
+                    predicted = [info["bbox"] for info in infos if info["bbox"] is not None and info["confidence"] > 0]
+                    recalls.append(detection_recall(predicted, [bbox]))
+                row[mode] = {
+                    "windows": len(pipeline._detection_windows(scans[0][0])),
+                    "recall": round(sum(recalls) / len(recalls), 3),
+                    **summarize(latencies),
+                }
+            report.append(row)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--papers", nargs="+", default=["letter", "a3"])
+    parser.add_argument("--dpi", type=int, nargs="+", default=[150, 300, 600])
+    parser.add_argument("--pages", type=int, default=8)
+    parser.add_argument("--modes", nargs="+", choices=DETECTION_MODES, default=list(DETECTION_MODES))
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Identification index benchmark: top-k query latency against index size,
+exact (NumPy) vs ANN (hnswlib, if installed), plus ANN recall@k.
+
+Uses random 256-d embeddings, the size of SiameseNetwork.forward_one output,
+so it runs without models or a database.
+
+Usage:
+    python -m benchmarks.index_bench --sizes 1000 10000 50000 100000 --k 5
+"""
+
+import argparse
+import json
+import time
+
+import numpy as np
+
+from services.embedding_index import EmbeddingIndex
+
+
+def summarize(samples) -> dict:
+    ordered = sorted(samples)
+    return {
+        "p50_ms": round(ordered[len(ordered) // 2] * 1000, 3),
+        "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 3),
+    }
+
+
+def build(vectors: np.ndarray, ann: str) -> EmbeddingIndex:
+    index = EmbeddingIndex(index_dir=None, ann=ann, ann_threshold=0)
+    index.ensure_model("bench")
+    for i, vector in enumerate(vectors):
+        index.upsert(f"profile-{i}", vector, "v1")
+    return index
+
+
+def time_queries(index: EmbeddingIndex, queries: np.ndarray, k: int, batch: int):
+    index.search(queries[:batch], k)  # Builds the ANN graph / warms caches
+    samples, results = [], []
+    for start in range(0, len(queries), batch):
+        t0 = time.perf_counter()
+        results.extend(index.search(queries[start:start + batch], k))
+        samples.append(time.perf_counter() - t0)
+    return summarize(samples), results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--batch", type=int, default=1, help="Queries per search call (signatures per page)")
+    args = parser.parse_args()
+
+    try:
+        import hnswlib  # noqa: F401
+        modes = ["off", "on"]
+    except ImportError:
+        modes = ["off"]
+
+    rng = np.random.RandomState(0)
+    report = []
+    for size in args.sizes:
+        vectors = rng.randn(size, args.dim).astype(np.float32)
+        # Queries are noisy copies of indexed references, like a genuine signature
+        picks = rng.randint(0, size, args.queries)
+        queries = vectors[picks] + 0.3 * rng.randn(args.queries, args.dim).astype(np.float32)
+
+        row = {"size": size}
+        exact_results = None
+        for mode in modes:
+            started = time.perf_counter()
+            index = build(vectors, mode)
+            build_seconds = time.perf_counter() - started
+            latency, results = time_queries(index, queries, args.k, args.batch)
+            name = "exact" if mode == "off" else "ann"
+            row[name] = {"build_s": round(build_seconds, 2), **latency}
+            if mode == "off":
+                exact_results = results
+                row[name]["top1_accuracy"] = round(
+                    float(np.mean([r[0][0] == f"profile-{p}" for r, p in zip(results, picks)])), 4
+                )
+            else:
+                recall = np.mean([
+                    len({pid for pid, _ in a} & {pid for pid, _ in e}) / len(e)
+                    for a, e in zip(results, exact_results)
+                ])
+                row[name][f"recall_at_{args.k}"] = round(float(recall), 4)
+        report.append(row)
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+Ingest benchmark: peak RSS and latency of one /verify pipeline run on a
+high-resolution scan.
+
+Generates a synthetic 600 dpi letter-size scan and runs it through
+InferencePipeline.process in a fresh process per mode:
+
+- full:  decode at full resolution (INGEST_MAX_SIDE=0), the pre-streaming path
+- draft: reduced decode at INGEST_MAX_SIDE with a full-resolution crop of the chosen box
+- draft-only: reduced decode, artifacts from the working buffer as well
+
+Peak RSS is reset after the models load (Linux /proc/self/clear_refs), so
+the reported figure is what the request itself added.
+
+Usage:
+    python -m benchmarks.ingest_bench --dpi 600 --format jpeg
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+
+MODES = {
+    "full": {"INGEST_MAX_SIDE": "0", "ARTIFACT_FULL_RESOLUTION": "1"},
+    "draft": {"ARTIFACT_FULL_RESOLUTION": "1"},
+    "draft-only": {"ARTIFACT_FULL_RESOLUTION": "0"},
+}
+
+
+def make_scan(path: str, dpi: int, fmt: str):
+    import numpy as np
+    from PIL import Image, ImageDraw
+
+    width, height = int(8.5 * dpi), int(11 * dpi)
+    image = Image.new("RGB", (width, height), "white")
+    draw = ImageDraw.Draw(image)
+    rng = np.random.RandomState(0)
+    # Lines of "text"
+    for y in range(dpi, height - 3 * dpi, dpi // 4):
+        x = dpi
+        while x < width - dpi:
+            word = rng.randint(dpi // 8, dpi // 2)
+            draw.rectangle((x, y, x + word, y + dpi // 12), fill=(40, 40, 40))
+            x += word + dpi // 10
+    # A signature near the bottom right
+    t = np.linspace(0, 6 * np.pi, 400)
+    xs = width - 3.5 * dpi + t / (6 * np.pi) * 2.5 * dpi
+    ys = height - 2 * dpi + np.sin(t * 1.7) * dpi / 4 + np.cos(t * 0.6) * dpi / 8
+    draw.line(list(zip(xs, ys)), fill=(10, 20, 90), width=max(2, dpi // 100))
+    image.save(path, format=fmt.upper(), **({"quality": 90} if fmt == "jpeg" else {}))
+
+
+def reset_peak_rss():
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def run_worker(args) -> dict:
+    from services.inference_pipeline import InferencePipeline
+    from services.process_info import memory_usage
+
+    pipeline = InferencePipeline()
+    pipeline.start_loading().result()
+
+    with open(args.reference, "rb") as f:
+        reference = f.read()
+
+    async def verify(reference_url: str) -> float:
+        started = time.perf_counter()
+        await pipeline.process(image=args.scan, reference_sig_url=reference_url, verification_id="bench")
+        return time.perf_counter() - started
+
+    async def run():
+        reference_url = await pipeline.storage_service.upload_file(reference, "bench/reference.png")
+        # Warm up kernels and the reference embedding, then measure one request
+        await verify(reference_url)
+        before = memory_usage()
+        reset_peak_rss()
+        seconds = await verify(reference_url)
+        after = memory_usage()
+        return before, after, seconds
+
+    before, after, seconds = asyncio.run(run())
+    return {
+        "rss_before_mb": before.get("rss_mb"),
+        "peak_rss_mb": after.get("peak_rss_mb"),
+        "request_peak_delta_mb": round(after.get("peak_rss_mb", 0.0) - before.get("rss_mb", 0.0), 1),
+        "latency_ms": round(seconds * 1000, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dpi", type=int, default=600)
+    parser.add_argument("--format", choices=["jpeg", "png"], default="jpeg")
+    parser.add_argument("--modes", nargs="+", default=list(MODES), choices=list(MODES))
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--scan", help=argparse.SUPPRESS)
+    parser.add_argument("--reference", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_worker(args)))
+        return
+
+    from PIL import Image
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        scan = os.path.join(tmp, f"scan.{args.format}")
+        make_scan(scan, args.dpi, args.format)
+        # The reference is the signature region of the scan itself
+        reference = os.path.join(tmp, "reference.png")
+        with Image.open(scan) as image:
+            w, h = image.size
+            image.crop((w - 4 * args.dpi, h - 3 * args.dpi, w - args.dpi // 2, h - args.dpi)).save(reference)
+
+        for mode in args.modes:
+            env = {**os.environ, **MODES[mode]}
+            env.setdefault("STORAGE_BACKEND", "local")
+            env.setdefault("LOCAL_STORAGE_DIR", os.path.join(tmp, "storage"))
+            output = subprocess.run(
+                [sys.executable, "-m", "benchmarks.ingest_bench", "--worker",
+                 "--scan", scan, "--reference", reference],
+                env=env, check=True, capture_output=True, text=True,
+            ).stdout
+            # Model loading prints progress; the report is the last line
+            results.append({"mode": mode, **json.loads(output.strip().splitlines()[-1])})
+
+    print(json.dumps({
+        "scan": {"dpi": args.dpi, "format": args.format, "size": [int(8.5 * args.dpi), int(11 * args.dpi)]},
+        "results": results,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
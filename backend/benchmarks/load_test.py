@@ -0,0 +1,115 @@
+"""
+Load test: saturate /verify while probing /health.
+
+Shows that /health latency stays flat while /verify is saturated, and that
+excess /verify load is shed with 503s instead of queueing without bound.
+
+Usage (against a running server):
+    python -m benchmarks.load_test --url http://localhost:8000 \
+        --image sample.jpg --user-id <profile-id> --concurrency 64 --duration 30
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from collections import Counter
+from typing import Dict, List
+
+import httpx
+
+
+def percentiles(samples: List[float]) -> Dict[str, float]:
+    if not samples:
+        return {"count": 0}
+    ordered = sorted(samples)
+
+    def pick(q: float) -> float:
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    return {
+        "count": len(ordered),
+        "p50_ms": round(pick(0.50) * 1000, 2),
+        "p95_ms": round(pick(0.95) * 1000, 2),
+        "p99_ms": round(pick(0.99) * 1000, 2),
+        "max_ms": round(ordered[-1] * 1000, 2),
+    }
+
+
+async def probe_health(client: httpx.AsyncClient, stop_at: float, interval: float) -> List[float]:
+    latencies = []
+    while time.perf_counter() < stop_at:
+        started = time.perf_counter()
+        response = await client.get("/health")
+        response.raise_for_status()
+        latencies.append(time.perf_counter() - started)
+        await asyncio.sleep(interval)
+    return latencies
+
+
+async def verify_worker(client: httpx.AsyncClient, stop_at: float, image: bytes, filename: str,
+                        user_id: str, latencies: List[float], statuses: Counter):
+    while time.perf_counter() < stop_at:
+        started = time.perf_counter()
+        try:
+            response = await client.post(
+                "/verify",
+                params={"user_id": user_id},
+                files={"file": (filename, image, "image/jpeg")},
+            )
+            statuses[response.status_code] += 1
+            if response.status_code == 200:
+                latencies.append(time.perf_counter() - started)
+            elif response.status_code == 503:
+                await asyncio.sleep(float(response.headers.get("Retry-After", "1")))
+        except httpx.HTTPError as e:
+            statuses[type(e).__name__] += 1
+
+
+async def run(args) -> Dict:
+    with open(args.image, "rb") as f:
+        image = f.read()
+
+    limits = httpx.Limits(max_connections=args.concurrency + 4)
+    async with httpx.AsyncClient(base_url=args.url, timeout=args.timeout, limits=limits) as client:
+        # Baseline: /health with the server idle
+        baseline = await probe_health(client, time.perf_counter() + args.baseline, args.interval)
+
+        # Saturate /verify and keep probing /health
+        stop_at = time.perf_counter() + args.duration
+        verify_latencies: List[float] = []
+        statuses: Counter = Counter()
+        workers = [
+            verify_worker(client, stop_at, image, args.image, args.user_id, verify_latencies, statuses)
+            for _ in range(args.concurrency)
+        ]
+        loaded, *_ = await asyncio.gather(probe_health(client, stop_at, args.interval), *workers)
+
+    return {
+        "concurrency": args.concurrency,
+        "duration_s": args.duration,
+        "health_idle": percentiles(baseline),
+        "health_under_load": percentiles(loaded),
+        "verify": percentiles(verify_latencies),
+        "verify_throughput_rps": round(len(verify_latencies) / args.duration, 2),
+        "verify_status_codes": {str(k): v for k, v in statuses.items()},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--image", required=True, help="Document image to upload")
+    parser.add_argument("--user-id", required=True, help="Profile id with a reference signature")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds of /verify load")
+    parser.add_argument("--baseline", type=float, default=5.0, help="Seconds of idle /health probing")
+    parser.add_argument("--interval", type=float, default=0.05, help="Seconds between /health probes")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    args = parser.parse_args()
+
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,370 @@
+"""
+End-to-end benchmark: sustained verifications per second of one node.
+
+Generates synthetic signed documents offline (benchmarks/synthetic.py) and
+runs them through either
+
+- pipeline: InferencePipeline.process, in process
+- api:      POST /verify through an in-process ASGI client
+
+with storage and Supabase replaced by local stand-ins (STORAGE_BACKEND=local,
+SUPABASE_BACKEND=memory). Every combination of batch size, thread count,
+model replicas, backend and precision runs in a fresh process and reports
+throughput, p50/p95/p99 end to end and per stage, peak RSS and CPU
+utilization.
+
+--scaling instead measures how throughput grows with cores: for 1, 2, 4, ...
+up to all cores it pins the run to that many cores and compares one replica
+using every core ("threads") against one single-threaded replica per core
+("replicas"), reporting speedup and parallel efficiency for each.
+
+The report is JSON, tagged with the git commit; pass --compare to diff
+against an earlier report.
+
+Usage:
+    python -m benchmarks.pipeline_bench --mode pipeline api --batch-sizes 1 8 --threads 1 4 \\
+        --documents 64 --concurrency 16 --output bench.json
+    python -m benchmarks.pipeline_bench ... --compare bench-main.json
+    python -m benchmarks.pipeline_bench --scaling --batch-sizes 8 --output scaling.json
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime
+
+from services.replicas import available_cores, format_cores
+
+
+def percentiles(samples) -> dict:
+    if not samples:
+        return {}
+    ordered = sorted(samples)
+
+    def at(q: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(len(ordered) * q))] * 1000, 2)
+
+    return {"count": len(ordered), "p50_ms": at(0.50), "p95_ms": at(0.95), "p99_ms": at(0.99)}
+
+
+def cpu_seconds() -> float:
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+def make_corpus(documents: int, writers: int, dpi: int):
+    from benchmarks.synthetic import encode, make_document, make_signature
+
+    references = {writer: encode(make_signature(writer, seed=10_000 + writer), "png") for writer in range(writers)}
+    pages = [
+        (i % writers, encode(make_document(i % writers, seed=i, dpi=dpi, stamp=i % 3 != 0)[0]))
+        for i in range(documents)
+    ]
+    return references, pages
+
+
+async def run_pipeline_mode(args, references, pages) -> dict:
+    from services.inference_pipeline import InferencePipeline
+
+    pipeline = InferencePipeline()
+    await pipeline.ensure_loaded()
+    reference_urls = {
+        writer: await pipeline.storage_service.upload_file(content, f"bench/reference-{writer}.png")
+        for writer, content in references.items()
+    }
+
+    async def verify(i: int, writer: int, document: bytes):
+        await pipeline.process(
+            image=document, reference_sig_url=reference_urls[writer],
+            verification_id=f"bench-{i}", profile_id=f"writer-{writer}"
+        )
+
+    return await drive(args, pages, verify)
+
+
+async def run_api_mode(args, references, pages) -> dict:
+    import httpx
+    import main
+    from services.supabase_client import get_supabase_client
+
+    await main.startup()
+    await main.inference_pipeline.ensure_loaded()
+    supabase = get_supabase_client()
+    for writer, content in references.items():
+        url = await main.storage_service.upload_file(content, f"bench/reference-{writer}.png")
+        supabase.table("profiles").upsert({
+            "id": f"writer-{writer}", "user_name": f"Writer {writer}", "reference_sig_url": url,
+            "updated_at": datetime.utcnow().isoformat()
+        }).execute()
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        async def verify(i: int, writer: int, document: bytes):
+            response = await client.post(
+                "/verify", params={"user_id": f"writer-{writer}"},
+                files={"file": (f"doc-{i}.jpg", document, "image/jpeg")}
+            )
+            response.raise_for_status()
+
+        try:
+            return await drive(args, pages, verify)
+        finally:
+            await main.shutdown()
+
+
+async def drive(args, pages, verify) -> dict:
+    """Warm up, then push every page through `verify` at the given concurrency"""
+    from services import metrics
+    from services.process_info import memory_usage
+
+    stage_samples = defaultdict(list)
+    metrics.add_stage_observer(lambda stage, seconds: stage_samples[stage].append(seconds))
+
+    # The first `warmup` pages only warm up kernels and reference embeddings
+    warmup, pages = pages[:args.warmup], pages[args.warmup:]
+    for i, (writer, document) in enumerate(warmup):
+        await verify(-1 - i, writer, document)
+    stage_samples.clear()
+
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies = []
+
+    async def one(i: int, writer: int, document: bytes):
+        async with semaphore:
+            t0 = time.perf_counter()
+            await verify(i, writer, document)
+            latencies.append(time.perf_counter() - t0)
+
+    cpu_before = cpu_seconds()
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i, writer, document) for i, (writer, document) in enumerate(pages)))
+    wall = time.perf_counter() - started
+    cpu = cpu_seconds() - cpu_before
+
+    return {
+        "documents": len(pages),
+        "wall_s": round(wall, 3),
+        "throughput_per_s": round(len(pages) / wall, 2),
+        "latency": percentiles(latencies),
+        "stages": {stage: percentiles(samples) for stage, samples in sorted(stage_samples.items())},
+        "cpu_utilization": round(cpu / wall / (os.cpu_count() or 1), 3),
+        "cpu_cores_busy": round(cpu / wall, 2),
+        "peak_rss_mb": memory_usage().get("peak_rss_mb"),
+    }
+
+
+def run_worker(args) -> dict:
+    import torch
+    from services.replicas import pin_process_from_env
+
+    pin_process_from_env()
+    torch.set_num_threads(args.threads)
+    references, pages = make_corpus(args.warmup + args.documents, args.writers, args.dpi)
+    runner = run_pipeline_mode if args.worker_mode == "pipeline" else run_api_mode
+    return asyncio.run(runner(args, references, pages))
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def config_key(result: dict) -> tuple:
+    config = {"replicas": 1, "cores": None, **result["config"]}
+    return tuple(config[k] for k in ("mode", "backend", "precision", "batch_size", "threads", "replicas", "cores"))
+
+
+def core_counts(total: int) -> list:
+    """1, 2, 4, ... up to and including every core"""
+    counts, count = [], 1
+    while count < total:
+        counts.append(count)
+        count *= 2
+    return counts + [total]
+
+
+def scaling_configs(args) -> list:
+    configs = []
+    for mode, backend, precision, batch_size in itertools.product(
+        args.mode, args.backends, args.precisions, args.batch_sizes
+    ):
+        base = {"mode": mode, "backend": backend, "precision": precision, "batch_size": batch_size}
+        for cores in core_counts(len(available_cores())):
+            configs.append({**base, "scaling": "threads", "threads": cores, "replicas": 1, "cores": cores})
+            if cores > 1:
+                configs.append({**base, "scaling": "replicas", "threads": 1, "replicas": cores, "cores": cores})
+    return configs
+
+
+def scaling_curves(results: list) -> list:
+    """Throughput, speedup and efficiency against the fewest cores, per scaling mode"""
+    curves = defaultdict(list)
+    for result in results:
+        config = result["config"]
+        if "scaling" not in config or "error" in result:
+            continue
+        key = (config["mode"], config["backend"], config["precision"], config["batch_size"], config["scaling"])
+        curves[key].append(result)
+
+    rows = []
+    for (mode, backend, precision, batch_size, scaling), points in sorted(curves.items()):
+        points.sort(key=lambda r: r["config"]["cores"])
+        # The replicas curve has no single-core point of its own; one core is one replica either way
+        base = next(
+            (r for r in results if "error" not in r and r["config"].get("cores") == 1
+             and (r["config"]["mode"], r["config"]["backend"], r["config"]["precision"],
+                  r["config"]["batch_size"]) == (mode, backend, precision, batch_size)),
+            points[0],
+        )
+        base_cores, base_throughput = base["config"]["cores"], base["throughput_per_s"]
+        rows.append({
+            "mode": mode, "backend": backend, "precision": precision, "batch_size": batch_size,
+            "scaling": scaling,
+            "points": [
+                {
+                    "cores": r["config"]["cores"],
+                    "throughput_per_s": r["throughput_per_s"],
+                    "p95_ms": r["latency"].get("p95_ms"),
+                    "speedup": round(r["throughput_per_s"] / base_throughput, 2),
+                    "efficiency": round(
+                        r["throughput_per_s"] / base_throughput / (r["config"]["cores"] / base_cores), 2
+                    ),
+                }
+                for r in points
+            ],
+        })
+    return rows
+
+
+def compare(report: dict, baseline_path: str) -> list:
+    """Throughput and p95 change against a previous report, per matching config"""
+    with open(baseline_path) as f:
+        baseline = {config_key(r): r for r in json.load(f)["results"] if "error" not in r}
+    rows = []
+    for result in report["results"]:
+        before = baseline.get(config_key(result))
+        if before is None or "error" in result:
+            continue
+        rows.append({
+            **result["config"],
+            "throughput_change_pct": round(
+                100 * (result["throughput_per_s"] / before["throughput_per_s"] - 1), 1
+            ),
+            "p95_change_pct": round(
+                100 * (result["latency"]["p95_ms"] / before["latency"]["p95_ms"] - 1), 1
+            ),
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", nargs="+", choices=["pipeline", "api"], default=["pipeline"])
+    parser.add_argument("--backends", nargs="+", default=["torch"])
+    parser.add_argument("--precisions", nargs="+", default=["fp32"])
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 8])
+    parser.add_argument("--threads", type=int, nargs="+", default=[os.cpu_count() or 1])
+    parser.add_argument("--replicas", type=int, nargs="+", default=[1])
+    parser.add_argument("--scaling", action="store_true",
+                        help="Sweep 1, 2, 4, ... all cores, threads vs. replicas, instead of --threads/--replicas")
+    parser.add_argument("--documents", type=int, default=32)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--dpi", type=int, default=150)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--warmup", type=int, default=4)
+    parser.add_argument("--output", help="Also write the JSON report here")
+    parser.add_argument("--compare", help="Previous JSON report to compare against")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--worker-mode", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        args.threads = args.threads[0]
+        print(json.dumps(run_worker(args)))
+        return
+
+    if args.scaling:
+        configs = scaling_configs(args)
+    else:
+        configs = [
+            {"mode": mode, "backend": backend, "precision": precision, "batch_size": batch_size,
+             "threads": threads, "replicas": replicas, "cores": None}
+            for mode, backend, precision, batch_size, threads, replicas in itertools.product(
+                args.mode, args.backends, args.precisions, args.batch_sizes, args.threads, args.replicas
+            )
+        ]
+
+    cores = available_cores()
+    results = []
+    for config in configs:
+        mode, threads, replicas = config["mode"], config["threads"], config["replicas"]
+        batch_size = config["batch_size"]
+        with tempfile.TemporaryDirectory() as tmp:
+            env = {
+                **os.environ,
+                "INFERENCE_BACKEND": config["backend"],
+                "INFERENCE_PRECISION": config["precision"],
+                "YOLO_BATCH_SIZE": str(batch_size),
+                "CYCLEGAN_BATCH_SIZE": str(batch_size),
+                "SIAMESE_BATCH_SIZE": str(batch_size),
+                "INFERENCE_REPLICAS": str(replicas),
+                "INFERENCE_THREADS_PER_REPLICA": str(max(1, threads // replicas)),
+                "ONNX_INTRA_OP_THREADS": str(max(1, threads // replicas)),
+                "OMP_NUM_THREADS": str(threads),
+                "STORAGE_BACKEND": "local",
+                "LOCAL_STORAGE_DIR": os.path.join(tmp, "storage"),
+                "SUPABASE_BACKEND": "memory",
+                "WRITE_BEHIND_DIR": os.path.join(tmp, "journal"),
+                "EMBEDDING_INDEX_DIR": "",
+                "EMBEDDING_CACHE_DIR": "",
+                # Every document is distinct; keep repeat runs from hitting the cache
+                "RESULT_CACHE_SIZE": "0",
+                "MAX_INFLIGHT_VERIFICATIONS": str(max(32, args.concurrency)),
+            }
+            if config["cores"]:
+                env["PURESIGN_CORES"] = format_cores(cores[:config["cores"]])
+            completed = subprocess.run(
+                [sys.executable, "-m", "benchmarks.pipeline_bench", "--worker", "--worker-mode", mode,
+                 "--threads", str(threads), "--documents", str(args.documents), "--writers", str(args.writers),
+                 "--dpi", str(args.dpi), "--concurrency", str(args.concurrency), "--warmup", str(args.warmup)],
+                env=env, capture_output=True, text=True,
+            )
+        if completed.returncode != 0:
+            results.append({"config": config, "error": completed.stderr.strip().splitlines()[-1:]})
+            continue
+        # Model loading prints progress; the report is the last line
+        results.append({"config": config, **json.loads(completed.stdout.strip().splitlines()[-1])})
+
+    report = {
+        "commit": git_commit(),
+        "created_at": datetime.utcnow().isoformat(),
+        "host": {"platform": platform.platform(), "python": platform.python_version(), "cpus": os.cpu_count()},
+        "workload": {"documents": args.documents, "writers": args.writers, "dpi": args.dpi,
+                     "concurrency": args.concurrency, "warmup": args.warmup},
+        "results": results,
+    }
+    if args.scaling:
+        report["scaling"] = scaling_curves(results)
+    if args.compare:
+        report["comparison"] = {"baseline": args.compare, "changes": compare(report, args.compare)}
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Accuracy-regression harness for reduced-precision inference.
+
+Cleans and embeds a fixed signature set under each INFERENCE_PRECISION mode
+(each in its own process), scores every pair, and reports score drift and
+accept/reject flips against fp32, alongside clean+embed throughput.
+
+Usage:
+    python -m benchmarks.precision_drift --images signature_set/ \
+        --precisions fp32 int8_dynamic int8_static bf16
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".tif", ".tiff", ".bmp")
+
+
+def run_worker(args):
+    from PIL import Image
+    from services.inference_pipeline import InferencePipeline
+
+    pipeline = InferencePipeline()
+    pipeline.start_loading().result()
+    names = sorted(name for name in os.listdir(args.images) if name.lower().endswith(IMAGE_EXTENSIONS))
+    images = [Image.open(os.path.join(args.images, name)).convert("RGB") for name in names]
+
+    # Warm up kernels before timing
+    pipeline._embed_batch(pipeline._clean_batch(images[:args.batch_size]))
+
+    started = time.perf_counter()
+    embeddings = []
+    for start in range(0, len(images), args.batch_size):
+        batch = images[start:start + args.batch_size]
+        embeddings.extend(pipeline._embed_batch(pipeline._clean_batch(batch)))
+    elapsed = time.perf_counter() - started
+
+    embeddings = np.stack(embeddings)
+    scores = np.array([pipeline._score_embeddings(embeddings, reference) for reference in embeddings])
+    np.save(args.output, scores)
+
+    print(json.dumps({
+        "precision": pipeline.precision,
+        "images": len(images),
+        "images_per_s": round(len(images) / elapsed, 2),
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", required=True, help="Directory with the fixed signature set")
+    parser.add_argument("--precisions", nargs="+", default=["fp32", "int8_dynamic", "bf16"])
+    parser.add_argument("--threshold", type=float, default=0.7, help="Accept threshold for decision flips")
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--output", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args)
+        return
+
+    precisions = ["fp32"] + [p for p in args.precisions if p != "fp32"]
+    runs = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for precision in precisions:
+            output = os.path.join(tmp, f"{precision}.npy")
+            env = {**os.environ, "INFERENCE_PRECISION": precision, "INFERENCE_BACKEND": "torch"}
+            env.setdefault("STORAGE_BACKEND", "local")
+            stdout = subprocess.run(
+                [sys.executable, "-m", "benchmarks.precision_drift", "--worker",
+                 "--images", args.images, "--batch-size", str(args.batch_size), "--output", output],
+                env=env, check=True, capture_output=True, text=True,
+            ).stdout
+            runs[precision] = (json.loads(stdout.strip().splitlines()[-1]), np.load(output))
+
+    baseline_info, baseline = runs["fp32"]
+    report = []
+    for precision in precisions:
+        info, scores = runs[precision]
+        drift = np.abs(scores - baseline)
+        flips = int(((scores >= args.threshold) != (baseline >= args.threshold)).sum())
+        report.append({
+            **info,
+            "speedup_vs_fp32": round(info["images_per_s"] / baseline_info["images_per_s"], 2),
+            "mean_abs_drift": round(float(drift.mean()), 5),
+            "max_abs_drift": round(float(drift.max()), 5),
+            "decision_flips": flips,
+            "pairs": int(scores.size),
+        })
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
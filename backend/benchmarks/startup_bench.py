@@ -0,0 +1,89 @@
+"""
+Startup benchmark: cold-start time and per-worker memory for N workers.
+
+Starts N processes that each build an InferencePipeline and load its models
+at the same time, as N uvicorn workers on one host would, and keeps them all
+alive while memory is sampled. With memory-mapped weights the file-backed
+RSS is shared between workers, so the summed PSS is far below N x RSS.
+Run once with MODEL_WEIGHTS_MMAP=0 to compare against private copies.
+
+Usage:
+    python -m benchmarks.startup_bench --workers 4
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+
+def run_worker():
+    from services.inference_pipeline import InferencePipeline
+    from services.process_info import memory_usage
+
+    pipeline = InferencePipeline()
+    pipeline.start_loading().result()
+    print(json.dumps(pipeline.load_status()), flush=True)
+    # Report memory when asked, then hold the models until every worker was sampled
+    sys.stdin.readline()
+    print(json.dumps(memory_usage()), flush=True)
+    sys.stdin.read()
+
+
+def next_json_line(stream) -> dict:
+    # Model loading prints progress; skip to the first JSON line
+    for line in stream:
+        if line.startswith("{"):
+            return json.loads(line)
+    raise RuntimeError("worker exited without a report")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker()
+        return
+
+    env = {**os.environ}
+    env.setdefault("STORAGE_BACKEND", "local")
+    started = time.perf_counter()
+    workers = [
+        subprocess.Popen(
+            [sys.executable, "-m", "benchmarks.startup_bench", "--worker"],
+            env=env, stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True,
+        )
+        for _ in range(args.workers)
+    ]
+    loads = [next_json_line(worker.stdout) for worker in workers]
+    all_ready = time.perf_counter() - started
+
+    # Every worker is loaded now; sample memory while they are all alive
+    memory = []
+    for worker in workers:
+        worker.stdin.write("\n")
+        worker.stdin.flush()
+        memory.append(next_json_line(worker.stdout))
+    for worker in workers:
+        worker.stdin.close()
+        worker.wait()
+
+    print(json.dumps({
+        "workers": args.workers,
+        "weights_mmap": env.get("MODEL_WEIGHTS_MMAP", "1") != "0",
+        "all_ready_seconds": round(all_ready, 2),
+        "cold_start_seconds": [load.get("process_uptime_seconds") for load in loads],
+        "model_load_seconds": [load.get("models") for load in loads],
+        "per_worker_memory_mb": memory,
+        "total_rss_mb": round(sum(m.get("rss_mb", 0.0) for m in memory), 1),
+        "total_pss_mb": round(sum(m.get("pss_mb", 0.0) for m in memory), 1),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Storage benchmark: sequential vs concurrent artifact uploads.
+
+Simulates the three uploads of a /verify request (original, detected crop,
+cleaned crop) against the configured storage backend. Set
+STORAGE_BACKEND=local to run fully offline against the filesystem stand-in.
+
+Usage:
+    STORAGE_BACKEND=local LOCAL_STORAGE_DIR=/tmp/puresign-bench \
+        python -m benchmarks.storage_bench --requests 200
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+import uuid
+
+from services.storage_service import StorageService
+
+
+async def upload_sequential(storage: StorageService, payloads):
+    for content, path in payloads:
+        await storage.upload_file(content, path)
+
+
+async def upload_concurrent(storage: StorageService, payloads):
+    await storage.upload_many(payloads)
+
+
+async def run(args) -> dict:
+    storage = StorageService()
+    original = os.urandom(args.original_kb * 1024)
+    crop = os.urandom(args.crop_kb * 1024)
+
+    def payloads():
+        verification_id = str(uuid.uuid4())
+        return [
+            (original, f"bench/original_docs/{verification_id}_doc.jpg"),
+            (crop, f"bench/detected/{verification_id}_detected.jpg"),
+            (crop, f"bench/cleaned/{verification_id}_cleaned.jpg"),
+        ]
+
+    results = {}
+    try:
+        for name, upload in (("sequential", upload_sequential), ("concurrent", upload_concurrent)):
+            semaphore = asyncio.Semaphore(args.concurrency)
+
+            async def one_request():
+                async with semaphore:
+                    started = time.perf_counter()
+                    await upload(storage, payloads())
+                    return time.perf_counter() - started
+
+            started = time.perf_counter()
+            latencies = sorted(await asyncio.gather(*(one_request() for _ in range(args.requests))))
+            elapsed = time.perf_counter() - started
+            results[name] = {
+                "requests_per_s": round(args.requests / elapsed, 2),
+                "p50_ms": round(latencies[len(latencies) // 2] * 1000, 2),
+                "p99_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000, 2),
+            }
+    finally:
+        await storage.close()
+
+    return {
+        "backend": type(storage.backend).__name__,
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        **results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=16, help="Simulated /verify requests in flight")
+    parser.add_argument("--original-kb", type=int, default=1024)
+    parser.add_argument("--crop-kb", type=int, default=64)
+    args = parser.parse_args()
+
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
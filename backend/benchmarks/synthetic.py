@@ -0,0 +1,125 @@
+"""
+Synthetic signature documents, generated offline and deterministically.
+
+A "writer" is a seed: signatures from the same writer share their stroke
+shape and differ by small pen jitter, so a generated reference and a
+document signed by the same writer are a genuine pair. Documents are
+letter/A4/A3 pages with text lines, ruled form lines, a stamp that may
+overlap the signature, and scanner noise.
+"""
+
+from io import BytesIO
+from typing import Tuple
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFilter
+
+
+INKS = [(15, 25, 110), (20, 20, 20), (10, 60, 140)]
+
+# Page sizes in inches
+PAPER = {"letter": (8.5, 11.0), "a4": (8.27, 11.69), "a3": (11.69, 16.54)}
+
+
+def _stroke_path(writer: int, rng: np.random.RandomState, width: int, height: int) -> np.ndarray:
+    """Pen trajectory: a sum of writer-specific sinusoids plus per-signature jitter"""
+    shape = np.random.RandomState(writer)
+    t = np.linspace(0, 1, 600)
+    freqs = shape.uniform(1.5, 7.0, size=3)
+    phases = shape.uniform(0, 2 * np.pi, size=3)
+    amps = shape.uniform(0.1, 0.35, size=3)
+    loops = shape.uniform(0.02, 0.08)
+    x = t + loops * np.sin(2 * np.pi * freqs[0] * 3 * t)
+    y = 0.5 + sum(a * np.sin(2 * np.pi * f * t + p) for a, f, p in zip(amps, freqs, phases)) / 2
+    # The same writer never signs exactly alike
+    x = x + rng.normal(0, 0.004, size=t.shape).cumsum() / 20
+    y = y + rng.normal(0, 0.004, size=t.shape).cumsum() / 20
+    return np.stack([0.05 + 0.9 * x * width, (0.1 + 0.8 * np.clip(y, 0, 1)) * height], axis=1)
+
+
+def draw_signature(draw: ImageDraw.ImageDraw, box: Tuple[int, int, int, int], writer: int,
+                   rng: np.random.RandomState, ink=None):
+    x1, y1, x2, y2 = box
+    path = _stroke_path(writer, rng, x2 - x1, y2 - y1) + (x1, y1)
+    ink = ink or INKS[writer % len(INKS)]
+    pen = max(2, (y2 - y1) // 40)
+    # Lift the pen a couple of times
+    breaks = sorted(rng.choice(np.arange(50, len(path) - 50), size=2, replace=False))
+    for segment in np.split(path, breaks):
+        draw.line([tuple(p) for p in segment], fill=ink, width=pen, joint="curve")
+
+
+def make_signature(writer: int, seed: int, size: Tuple[int, int] = (600, 220)) -> Image.Image:
+    """A clean signature on white, as a profile's reference would be"""
+    rng = np.random.RandomState(seed)
+    image = Image.new("RGB", size, "white")
+    draw_signature(ImageDraw.Draw(image), (0, 0) + size, writer, rng)
+    return image
+
+
+def _draw_stamp(draw: ImageDraw.ImageDraw, center: Tuple[int, int], radius: int, rng: np.random.RandomState):
+    color = (170 + rng.randint(40), 30, 40) if rng.rand() < 0.7 else (40, 60, 160)
+    cx, cy = center
+    for r in (radius, int(radius * 0.78)):
+        draw.ellipse((cx - r, cy - r, cx + r, cy + r), outline=color, width=max(2, radius // 25))
+    # Lettering around the ring
+    for angle in np.linspace(0, 2 * np.pi, 18, endpoint=False):
+        x, y = cx + 0.89 * radius * np.cos(angle), cy + 0.89 * radius * np.sin(angle)
+        s = radius // 16
+        draw.rectangle((x - s, y - s, x + s, y + s), fill=color)
+    draw.line((cx - radius // 2, cy, cx + radius // 2, cy), fill=color, width=max(2, radius // 20))
+
+
+def make_document(writer: int, seed: int, dpi: int = 150, stamp: bool = True,
+                  noise: float = 8.0, paper: str = "letter") -> Tuple[Image.Image, Tuple[int, int, int, int]]:
+    """
+    A page signed by `writer`; the signature is the same physical size on any paper.
+    Returns the page and the signature's bounding box.
+    """
+    rng = np.random.RandomState(seed)
+    width, height = int(PAPER[paper][0] * dpi), int(PAPER[paper][1] * dpi)
+    page = Image.new("RGB", (width, height), (250, 249, 245))
+    draw = ImageDraw.Draw(page)
+
+    # Body text
+    for y in range(dpi, int(height * 0.65), dpi // 4):
+        x = dpi
+        while x < width - dpi:
+            word = rng.randint(dpi // 8, dpi // 2)
+            draw.rectangle((x, y, x + word, y + dpi // 12), fill=(45, 45, 45))
+            x += word + dpi // 10
+
+    # Ruled form lines, one of them the signature line
+    for y in np.arange(int(height * 0.7), height - dpi, dpi // 2):
+        draw.line((dpi, y, width - dpi, y), fill=(120, 120, 120), width=max(1, dpi // 150))
+
+    sig_w, sig_h = int(2.8 * dpi), int(1.0 * dpi)
+    x1 = width - dpi - sig_w - rng.randint(0, dpi // 2)
+    y1 = int(height * 0.7) + dpi // 2 - sig_h + dpi // 10
+    bbox = (x1, y1, x1 + sig_w, y1 + sig_h)
+    draw_signature(draw, bbox, writer, rng)
+
+    if stamp:
+        # Often overlapping the signature, as on real forms
+        cx = x1 + rng.randint(-dpi // 2, sig_w // 2)
+        cy = y1 + rng.randint(0, sig_h)
+        _draw_stamp(draw, (cx, cy), int(dpi * rng.uniform(0.45, 0.7)), rng)
+
+    # Scanner: slight blur, skew and sensor noise
+    page = page.filter(ImageFilter.GaussianBlur(radius=dpi / 300))
+    page = page.rotate(rng.uniform(-0.8, 0.8), resample=Image.BILINEAR, fillcolor=(250, 249, 245))
+    if noise:
+        # In bands, so 600 dpi A3 pages do not need gigabytes of float noise
+        pixels = np.array(page)
+        for start in range(0, len(pixels), 256):
+            band = pixels[start:start + 256].astype(np.int16)
+            band += rng.normal(0, noise, size=band.shape).astype(np.int16)
+            pixels[start:start + 256] = np.clip(band, 0, 255)
+        page = Image.fromarray(pixels)
+    return page, bbox
+
+
+def encode(image: Image.Image, fmt: str = "jpeg") -> bytes:
+    buffer = BytesIO()
+    image.save(buffer, format=fmt.upper(), **({"quality": 90} if fmt == "jpeg" else {}))
+    return buffer.getvalue()
@@ -1,16 +1,39 @@
-from fastapi import FastAPI, File, UploadFile, HTTPException, Depends
+from fastapi import FastAPI, File, UploadFile, HTTPException, Depends, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from pydantic import BaseModel
-from typing import Optional
+from typing import Dict, List, Optional
 import os
+import json
+import asyncio
+import hashlib
+import time
 from dotenv import load_dotenv
 import uuid
 from datetime import datetime
 
 from services.supabase_client import get_supabase_client
+from services.replicas import pin_process_from_env
 from services.inference_pipeline import InferencePipeline
-from services.storage_service import StorageService
+from services.storage_service import StorageService, content_addressed_path
+from services.executor import AdmissionGate, QueueFullError, executor_stats, get_cpu_executor, run_blocking
+from services.document_loader import load_document_pages
+from services.ingest import UploadTooLargeError, spool_upload
+from services.embedding_index import IdentificationUnavailableError
+from services.cleaning import CLEANING_MODES
+from services.job_queue import TERMINAL_STATES, JobQueue
+from services.history import (
+    HISTORY_COLUMNS, HISTORY_STATUSES, keyset_filter, parse_date, split_page
+)
+from services.profile_cache import ProfileCache
+from services.references import (
+    PROFILE_WITH_REFERENCES, encode_embedding, legacy_reference_row, public_reference, reference_set
+)
+from services.verification import (
+    artifact_uploads, fetch_profile, reference_embedding_writer, verification_status
+)
+from services.write_behind import WriteBehindQueue
+from services import metrics
 
 load_dotenv()
 
@@ -26,8 +49,79 @@ app.add_middleware(
 )
 
 # Initialize services
-inference_pipeline = InferencePipeline()
+pin_process_from_env()
 storage_service = StorageService()
+inference_pipeline = InferencePipeline(storage_service)
+
+# "background" starts loading models at startup; "lazy" waits for the first request
+MODEL_LOADING = os.getenv("MODEL_LOADING", "background")
+
+# Audit records and artifact uploads are journaled and written in the background
+write_behind = WriteBehindQueue.from_env(storage_service)
+
+# Profiles read on every /verify are cached briefly; local writes invalidate them
+profile_cache = ProfileCache.from_env()
+
+# Job-mode verifications are queued here for the inference workers (worker.py)
+job_queue = JobQueue.from_env()
+JOB_EVENTS_POLL_SECONDS = float(os.getenv("JOB_EVENTS_POLL_MS", "250")) / 1000.0
+JOB_EVENTS_KEEPALIVE_SECONDS = 15.0
+
+# Verification history pages
+HISTORY_PAGE_SIZE = int(os.getenv("HISTORY_PAGE_SIZE", "50"))
+HISTORY_MAX_PAGE_SIZE = int(os.getenv("HISTORY_MAX_PAGE_SIZE", "200"))
+
+# Most reference signatures kept per profile
+PROFILE_MAX_REFERENCES = int(os.getenv("PROFILE_MAX_REFERENCES", "10"))
+
+# Bulk verification limits
+BATCH_MAX_PAGES = int(os.getenv("BATCH_MAX_PAGES", "500"))
+
+# The identification index is persisted at most this often
+INDEX_SAVE_SECONDS = float(os.getenv("EMBEDDING_INDEX_SAVE_SECONDS", "30"))
+index_sync_status: Dict = {"running": False}
+
+# Reject new verifications with 503 once this many are in flight
+verify_gate = AdmissionGate("verify", int(os.getenv("MAX_INFLIGHT_VERIFICATIONS", "32")))
+
+# Prometheus metrics on /metrics; OpenTelemetry spans if OTEL_TRACING=1
+metrics.register_stats_collector(
+    inference_pipeline, write_behind, {"verify": verify_gate}, executor_stats, {"profile": profile_cache}, job_queue
+)
+metrics.setup_tracing()
+
+
+@app.middleware("http")
+async def observe_request(request: Request, call_next):
+    """Request latency by route template, inside a per-request span"""
+    started = time.perf_counter()
+    status = 500
+    with metrics.span(f"{request.method} {request.url.path}", **{"http.method": request.method}) as span:
+        try:
+            response = await call_next(request)
+            status = response.status_code
+            return response
+        finally:
+            route = request.scope.get("route")
+            route = route.path if route is not None else "unmatched"
+            if span is not None:
+                span.update_name(f"{request.method} {route}")
+                span.set_attribute("http.route", route)
+                span.set_attribute("http.status_code", status)
+            metrics.HTTP_SECONDS.labels(request.method, route, str(status)).observe(time.perf_counter() - started)
+
+
+def check_cleaning(cleaning: Optional[str]):
+    if cleaning is not None and cleaning not in CLEANING_MODES:
+        raise HTTPException(status_code=400, detail=f"cleaning must be one of {', '.join(CLEANING_MODES)}")
+
+
+def overloaded(e: QueueFullError) -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail=f"Server busy ({e.name} queue full), retry later",
+        headers={"Retry-After": str(e.retry_after)}
+    )
 
 
 class VerifyRequest(BaseModel):
@@ -35,6 +129,15 @@ class VerifyRequest(BaseModel):
     local_processing: bool = False
 
 
+class Detection(BaseModel):
+    bbox: Optional[List[int]] = None
+    confidence: float
+    score: float
+    cleaning: Optional[str] = None
+    cleaning_ms: Optional[float] = None
+    verified_by: Optional[str] = None
+
+
 class VerificationResponse(BaseModel):
     verification_id: str
     detected_sig_url: Optional[str] = None
@@ -42,6 +145,37 @@ class VerificationResponse(BaseModel):
     confidence_score: float
     status: str
     timestamp: str
+    detections: List[Detection] = []
+    cached: bool = False
+    early_exit: Optional[str] = None
+
+
+@app.on_event("startup")
+async def startup():
+    await write_behind.start()
+    if MODEL_LOADING != "lazy":
+        inference_pipeline.start_loading()
+        app.state.index_rebuild = asyncio.create_task(rebuild_index_after_model_change())
+    app.state.index_saver = asyncio.create_task(save_index_periodically())
+
+
+async def save_index_periodically():
+    while True:
+        await asyncio.sleep(INDEX_SAVE_SECONDS)
+        if inference_pipeline.embedding_index.dirty:
+            await run_blocking(inference_pipeline.embedding_index.save)
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    app.state.index_saver.cancel()
+    if getattr(app.state, "index_rebuild", None) is not None:
+        app.state.index_rebuild.cancel()
+    if inference_pipeline.embedding_index.dirty:
+        await run_blocking(inference_pipeline.embedding_index.save)
+    await write_behind.stop()
+    await storage_service.close()
+    job_queue.close()
 
 
 @app.get("/")
@@ -54,133 +188,801 @@ async def health():
     return {"status": "healthy"}
 
 
+@app.get("/ready")
+async def ready():
+    """Readiness: 503 while models are still loading (liveness is /health)"""
+    status = inference_pipeline.load_status()
+    if MODEL_LOADING == "lazy" or inference_pipeline.ready:
+        return status
+    return JSONResponse(status_code=503, content=status)
+
+
+@app.get("/metrics")
+async def get_metrics():
+    """Prometheus metrics: stage latencies, batch sizes, queues, caches, fallbacks"""
+    body, content_type = metrics.render()
+    return Response(content=body, media_type=content_type)
+
+
+@app.get("/cache/stats")
+async def cache_stats():
+    """Hit/miss counters for the reference embedding and result caches"""
+    return {
+        "embedding_cache": inference_pipeline.embedding_cache.stats(),
+        "result_cache": inference_pipeline.result_cache.stats(),
+        "profile_cache": profile_cache.stats(),
+    }
+
+
+@app.get("/batching/stats")
+async def batching_stats():
+    """Queue depth and batch size counters for each model stage"""
+    return {"batching": inference_pipeline.batching_stats()}
+
+
+@app.get("/executor/stats")
+async def get_executor_stats():
+    """Pending/rejected counters for the worker pools and the verify admission gate"""
+    return {"executors": executor_stats(), "verify_gate": verify_gate.stats()}
+
+
+@app.get("/cascade/stats")
+async def cascade_stats():
+    """Early exits per cascade stage, the time they saved, and the calibration in use"""
+    return {
+        "mode": inference_pipeline.cascade_mode,
+        "screening": inference_pipeline.cascade_screens,
+        "calibration": inference_pipeline.calibration.to_dict(),
+        **inference_pipeline.cascade_stats.stats(),
+    }
+
+
+@app.get("/queue/stats")
+async def queue_stats():
+    """Depth and drain lag of the write-behind queue"""
+    return {"write_behind": write_behind.stats()}
+
+
 @app.post("/verify", response_model=VerificationResponse)
 async def verify_signature(
     file: UploadFile = File(...),
     user_id: str = None,
-    local_processing: bool = False
+    local_processing: bool = False,
+    cleaning: Optional[str] = None
 ):
     """
     Main verification endpoint that:
     1. Detects signature using YOLOv11
-    2. Cleans signature using CycleGAN
+    2. Cleans signature using CycleGAN or the classical OpenCV path
+       (`cleaning`: auto, gan or classical; defaults to CLEANING_MODE)
     3. Verifies against reference using Siamese Network
     """
+    check_cleaning(cleaning)
+    try:
+        with verify_gate:
+            return await _run_verification(file, user_id, cleaning)
+    except QueueFullError as e:
+        raise overloaded(e)
+
+
+async def _run_verification(file: UploadFile, user_id: Optional[str],
+                            cleaning: Optional[str] = None) -> VerificationResponse:
     try:
         # Validate user_id
         if not user_id:
             raise HTTPException(status_code=400, detail="user_id is required")
 
-        # Get Supabase client
-        supabase = get_supabase_client()
-
         # Get user profile and reference signature
-        profile_response = supabase.table("profiles").select("*").eq("id", user_id).execute()
-        if not profile_response.data:
+        profile = await get_cached_profile(user_id)
+        if profile is None:
             raise HTTPException(status_code=404, detail="User profile not found")
-
-        profile = profile_response.data[0]
         reference_sig_url = profile["reference_sig_url"]
 
-        # Create verification record
+        # Stream the upload to disk, hashing as it is read; the document is
+        # never held in memory whole. Stored documents are content-addressed by
+        # hash alone (no extension), so a cache hit that skips the upload still
+        # points at the object stored for the same bytes under any filename
         verification_id = str(uuid.uuid4())
+        spooled = await spool_upload(file)
+        original_path = content_addressed_path("original_docs", spooled.sha256)
         verification_data = {
             "id": verification_id,
             "user_id": user_id,
+            "original_doc_url": storage_service.public_url(original_path),
             "status": "processing",
             "timestamp": datetime.utcnow().isoformat()
         }
 
-        # Upload original document
-        file_content = await file.read()
-        original_doc_url = await storage_service.upload_file(
-            file_content, f"original_docs/{verification_id}_{file.filename}"
-        )
-        verification_data["original_doc_url"] = original_doc_url
-
-        # Save initial verification record
-        supabase.table("verifications").insert(verification_data).execute()
+        async def run_pipeline() -> Dict:
+            # Journal the original document and the initial record before any work
+            await write_behind.enqueue([
+                {"op": "upload", "path": original_path, "source_path": spooled.path},
+                {"op": "upsert_verification", "row": dict(verification_data)}
+            ])
+
+            # Process the image through the pipeline
+            return await inference_pipeline.process(
+                image=spooled.path,
+                reference_sig_url=reference_sig_url,
+                verification_id=verification_id,
+                profile_id=user_id,
+                reference_version=profile.get("updated_at"),
+                references=reference_set(profile),
+                cleaning=cleaning
+            )
 
-        # Process the image through the pipeline
-        result = await inference_pipeline.process(
-            image_bytes=file_content,
-            reference_sig_url=reference_sig_url,
-            verification_id=verification_id
+        # A resubmitted document skips inference and uploads; it still gets its own audit row
+        cache_key = await inference_pipeline.result_cache_key(
+            spooled.sha256, reference_sig_url, user_id, profile.get("updated_at"), cleaning
         )
+        result, cached = await inference_pipeline.result_cache.get_or_compute(cache_key, run_pipeline)
 
-        # Upload processed images
-        if result.get("detected_sig"):
-            detected_url = await storage_service.upload_file(
-                result["detected_sig"], f"detected/{verification_id}_detected.jpg"
-            )
-        else:
-            detected_url = None
+        # Return as soon as inference finishes; processed images and the final
+        # record are journaled and uploaded/written in the background
+        uploads = artifact_uploads(result)
+        urls = {op["kind"]: storage_service.public_url(op["path"]) for op in uploads}
+        operations = [] if cached else uploads
 
-        if result.get("cleaned_sig"):
-            cleaned_url = await storage_service.upload_file(
-                result["cleaned_sig"], f"cleaned/{verification_id}_cleaned.jpg"
-            )
-        else:
-            cleaned_url = None
-
-        # Update verification record
         confidence_score = result.get("confidence_score", 0.0)
-        status = "success" if confidence_score >= 0.7 else "failed"
+        status = verification_status(confidence_score)
+        detections = result.get("detections", [])
 
-        supabase.table("verifications").update({
-            "cleaned_sig_url": cleaned_url,
+        verification_data.update({
+            "cleaned_sig_url": urls.get("cleaned"),
             "confidence_score": confidence_score,
+            "detections": detections,
             "status": status
-        }).eq("id", verification_id).execute()
+        })
+        operations.append({"op": "upsert_verification", "row": dict(verification_data)})
+        await write_behind.enqueue(operations)
+        metrics.VERIFICATIONS.labels("verify", status, str(cached).lower()).inc()
 
         return VerificationResponse(
             verification_id=verification_id,
-            detected_sig_url=detected_url,
-            cleaned_sig_url=cleaned_url,
+            detected_sig_url=urls.get("detected"),
+            cleaned_sig_url=urls.get("cleaned"),
             confidence_score=confidence_score,
             status=status,
-            timestamp=datetime.utcnow().isoformat()
+            timestamp=datetime.utcnow().isoformat(),
+            detections=detections,
+            cached=cached,
+            early_exit=result.get("early_exit")
         )
 
     except Exception as e:
         # Update verification status to failed
-        if 'verification_id' in locals():
+        if 'verification_data' in locals():
             try:
-                supabase.table("verifications").update({
-                    "status": "failed"
-                }).eq("id", verification_id).execute()
+                verification_data["status"] = "failed"
+                await write_behind.enqueue([
+                    {"op": "upsert_verification", "row": dict(verification_data)}
+                ])
             except:
                 pass
 
+        if isinstance(e, (HTTPException, QueueFullError)):
+            raise
+        if isinstance(e, UploadTooLargeError):
+            raise HTTPException(status_code=413, detail=str(e))
         raise HTTPException(status_code=500, detail=str(e))
 
+    finally:
+        if 'spooled' in locals():
+            spooled.cleanup()
+
+
+def load_hashed_pages(content: bytes, filename: str, max_pages: int):
+    """Expand a document into pages along with the sha256 of each page's image"""
+    pages = load_document_pages(content, filename, max_pages)
+    return pages, [hashlib.sha256(page.image_bytes).hexdigest() for page in pages]
+
+
+@app.post("/jobs/verify", status_code=202)
+async def submit_verification_job(
+    file: UploadFile = File(...),
+    user_id: str = None,
+    cleaning: Optional[str] = None
+):
+    """
+    Job-mode /verify: stores the document, queues it for the inference
+    workers and returns its verification_id at once. Follow the job with
+    GET /jobs/{verification_id} or the SSE stream at /jobs/{verification_id}/events.
+    """
+    if not user_id:
+        raise HTTPException(status_code=400, detail="user_id is required")
+    check_cleaning(cleaning)
+    if await get_cached_profile(user_id) is None:
+        raise HTTPException(status_code=404, detail="User profile not found")
+
+    try:
+        spooled = await spool_upload(file)
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    try:
+        # Workers read the document from storage, so it is stored before the job is queued
+        original_path = content_addressed_path("original_docs", spooled.sha256)
+        content = await run_blocking(spooled.read_bytes)
+        await storage_service.upload_file(content, original_path)
+    finally:
+        spooled.cleanup()
+
+    verification_id = str(uuid.uuid4())
+    row = {
+        "id": verification_id,
+        "user_id": user_id,
+        "original_doc_url": storage_service.public_url(original_path),
+        "status": "processing",
+        "timestamp": datetime.utcnow().isoformat()
+    }
+    # Written directly, not write-behind, so it can never land after the worker's final row
+    supabase = get_supabase_client()
+    try:
+        await run_blocking(supabase.table("verifications").upsert(row).execute)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    try:
+        await run_blocking(job_queue.submit, verification_id, "verify", {
+            "user_id": user_id,
+            "document_path": original_path,
+            "sha256": spooled.sha256,
+            "cleaning": cleaning,
+            "row": row
+        })
+    except QueueFullError as e:
+        await run_blocking(supabase.table("verifications").update({"status": "failed"}).eq("id", verification_id).execute)
+        raise overloaded(e)
+
+    return {
+        "verification_id": verification_id,
+        "status": "queued",
+        "status_url": f"/jobs/{verification_id}",
+        "events_url": f"/jobs/{verification_id}/events"
+    }
+
+
+@app.get("/jobs/stats")
+async def job_stats():
+    """Jobs per state and the age of the oldest queued one"""
+    return {"jobs": await run_blocking(job_queue.stats)}
+
+
+async def load_job(verification_id: str) -> Dict:
+    job = await run_blocking(job_queue.get, verification_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@app.get("/jobs/{verification_id}")
+async def get_job(verification_id: str):
+    """A job's state, its progress steps so far and, once done, the verification result"""
+    job = await load_job(verification_id)
+    job["steps"] = await run_blocking(job_queue.events, verification_id)
+    return {"job": job}
+
+
+@app.get("/jobs/{verification_id}/events")
+async def job_events(verification_id: str, request: Request):
+    """
+    Server-sent events: one `step` event per finished stage (queued, running,
+    detect, clean, verify, upload, then done or failed), then an `end` event
+    with the job. Reconnecting with Last-Event-ID resumes after that step.
+    """
+    await load_job(verification_id)
+    try:
+        after = int(request.headers.get("last-event-id") or 0)
+    except ValueError:
+        after = 0
+
+    async def stream():
+        nonlocal after
+        idle = 0.0
+        while True:
+            for event in await run_blocking(job_queue.events, verification_id, after):
+                after = event["seq"]
+                idle = 0.0
+                yield f"id: {event['seq']}\nevent: step\ndata: {json.dumps(event)}\n\n"
+                if event["step"] in TERMINAL_STATES:
+                    job = await run_blocking(job_queue.get, verification_id)
+                    yield f"event: end\ndata: {json.dumps(job)}\n\n"
+                    return
+            if await request.is_disconnected():
+                return
+            if idle >= JOB_EVENTS_KEEPALIVE_SECONDS:
+                # Keeps proxies and load balancers from closing an idle stream
+                yield ": keepalive\n\n"
+                idle = 0.0
+            await asyncio.sleep(JOB_EVENTS_POLL_SECONDS)
+            idle += JOB_EVENTS_POLL_SECONDS
+
+    return StreamingResponse(
+        stream(), media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.post("/verify/batch")
+async def verify_batch(
+    files: List[UploadFile] = File(...),
+    user_id: str = None,
+    cleaning: Optional[str] = None
+):
+    """
+    Bulk verification endpoint. Accepts many documents (images, multi-page
+    PDFs/TIFFs or zip archives), verifies every page against the user's
+    reference and streams one NDJSON line per page as soon as it finishes.
+    Original documents, crops and verification rows go through the
+    write-behind queue, which uploads and upserts them in bulk.
+    """
+    if not user_id:
+        raise HTTPException(status_code=400, detail="user_id is required")
+    check_cleaning(cleaning)
+
+    profile = await get_cached_profile(user_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="User profile not found")
+
+    # Spooling bounds each upload by MAX_UPLOAD_BYTES and hashes it as it is read
+    uploads = []
+    for upload in files:
+        try:
+            spooled = await spool_upload(upload)
+        except UploadTooLargeError as e:
+            raise HTTPException(status_code=413, detail=f"{upload.filename}: {e}")
+        try:
+            content = await run_blocking(spooled.read_bytes)
+        finally:
+            spooled.cleanup()
+        uploads.append((upload.filename, content, spooled.sha256))
+
+    # Expand every document into pages in parallel on the CPU pool
+    async def expand(filename: str, content: bytes):
+        try:
+            return await get_cpu_executor().run(load_hashed_pages, content, filename, BATCH_MAX_PAGES)
+        except QueueFullError as e:
+            raise overloaded(e)
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=f"Could not read {filename}: {e}")
+
+    expanded = await asyncio.gather(*(expand(filename, content) for filename, content, _ in uploads))
+    documents = [
+        (filename, content, content_hash, pages, page_hashes)
+        for (filename, content, content_hash), (pages, page_hashes) in zip(uploads, expanded)
+    ]
+    total_pages = sum(len(pages) for _, _, _, pages, _ in documents)
+    if total_pages > BATCH_MAX_PAGES:
+        raise HTTPException(status_code=400, detail=f"Request expands to more than {BATCH_MAX_PAGES} pages")
+
+    # Journal each original document once and all verification records together.
+    # Pages already in the result cache skip inference, and a document whose
+    # pages are all cached skips its upload. Identical documents share one path,
+    # so it is uploaded once
+    reference_sig_url = profile["reference_sig_url"]
+    operations = []
+    upload_paths = set()
+    rows: Dict[str, Dict] = {}
+    items = []
+    cached_items = []
+    for filename, content, content_hash, pages, page_hashes in documents:
+        original_path = content_addressed_path("original_docs", content_hash)
+        uncached_pages = 0
+        for page, page_hash in zip(pages, page_hashes):
+            verification_id = str(uuid.uuid4())
+            cache_key = await inference_pipeline.result_cache_key(
+                page_hash, reference_sig_url, user_id, profile.get("updated_at"), cleaning
+            )
+            rows[verification_id] = {
+                "id": verification_id,
+                "user_id": user_id,
+                "original_doc_url": storage_service.public_url(original_path),
+                "status": "processing",
+                "timestamp": datetime.utcnow().isoformat()
+            }
+            item = {
+                "verification_id": verification_id,
+                "document": page.document,
+                "page": page.page,
+                "image_bytes": page.image_bytes,
+                "cache_key": cache_key
+            }
+            cached = inference_pipeline.result_cache.get(cache_key)
+            if cached is not None:
+                cached_items.append((item, cached))
+            else:
+                items.append(item)
+                uncached_pages += 1
+        if uncached_pages and original_path not in upload_paths:
+            upload_paths.add(original_path)
+            operations.append({"op": "upload", "path": original_path, "content": content})
+    operations.extend({"op": "upsert_verification", "row": dict(rows[item["verification_id"]])} for item in items)
+    try:
+        await write_behind.enqueue(operations)
+    except QueueFullError as e:
+        raise overloaded(e)
+
+    async def results():
+        for item, result in cached_items:
+            yield item, result, None, True
+        async for item, result, error in inference_pipeline.process_many(
+            items,
+            reference_sig_url=reference_sig_url,
+            profile_id=user_id,
+            reference_version=profile.get("updated_at"),
+            references=reference_set(profile),
+            cleaning=cleaning
+        ):
+            if error is None:
+                inference_pipeline.result_cache.put(item["cache_key"], result)
+            yield item, result, error, False
+
+    async def stream():
+        async for item, result, error, cached in results():
+            verification_id = item["verification_id"]
+            row = rows[verification_id]
+            line = {
+                "verification_id": verification_id,
+                "document": item["document"],
+                "page": item["page"]
+            }
+
+            operations = []
+            if error is None:
+                uploads = artifact_uploads(result)
+                urls = {op["kind"]: storage_service.public_url(op["path"]) for op in uploads}
+                if not cached:
+                    operations = uploads
+                confidence_score = result.get("confidence_score", 0.0)
+                row.update({
+                    "cleaned_sig_url": urls.get("cleaned"),
+                    "confidence_score": confidence_score,
+                    "detections": result.get("detections", []),
+                    "status": verification_status(confidence_score)
+                })
+                line.update({
+                    "detected_sig_url": urls.get("detected"),
+                    "cleaned_sig_url": urls.get("cleaned"),
+                    "confidence_score": confidence_score,
+                    "detections": row["detections"],
+                    "status": row["status"],
+                    "cached": cached,
+                    "early_exit": result.get("early_exit")
+                })
+            else:
+                row["status"] = "failed"
+                line.update({"status": "failed", "error": str(error)})
+
+            operations.append({"op": "upsert_verification", "row": dict(row)})
+            await write_behind.enqueue(operations)
+            metrics.VERIFICATIONS.labels(
+                "verify_batch", "error" if error is not None else row["status"], str(cached).lower()
+            ).inc()
+
+            line["timestamp"] = datetime.utcnow().isoformat()
+            yield json.dumps(line) + "\n"
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
+@app.post("/identify")
+async def identify_signature(
+    file: UploadFile = File(...),
+    k: int = 5,
+    exclude_user_id: Optional[str] = None
+):
+    """
+    1:N identification: the k profiles whose reference signature is closest
+    to each signature on the page. Pass `exclude_user_id` for a fraud check
+    (does this look like anyone other than the claimed signer?).
+    """
+    if not 1 <= k <= 100:
+        raise HTTPException(status_code=400, detail="k must be between 1 and 100")
+    try:
+        spooled = await spool_upload(file)
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    try:
+        with verify_gate:
+            return await inference_pipeline.identify(
+                spooled.path, k=k, exclude_profile_ids=[exclude_user_id] if exclude_user_id else []
+            )
+    except QueueFullError as e:
+        raise overloaded(e)
+    except IdentificationUnavailableError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    finally:
+        spooled.cleanup()
+
+
+async def fetch_all_profiles(page_size: int = 1000) -> List[Dict]:
+    supabase = get_supabase_client()
+    profiles = []
+    while True:
+        response = await run_blocking(
+            supabase.table("profiles").select(
+                "id,reference_sig_url,updated_at,reference_signatures(sig_url,embedding,embedding_model)"
+            )
+            .order("id").range(len(profiles), len(profiles) + page_size - 1).execute
+        )
+        profiles.extend(response.data)
+        if len(response.data) < page_size:
+            return profiles
+
+
+async def run_index_sync():
+    index_sync_status.update({"running": True, "started_at": datetime.utcnow().isoformat(), "error": None})
+    try:
+        # API workers share the index file: one of them syncs it, the others pick up its saves
+        with inference_pipeline.embedding_index.sync_lock() as acquired:
+            if not acquired:
+                print("Identification index is being synced by another process")
+                index_sync_status["error"] = "Already syncing in another process"
+                return
+            result = await inference_pipeline.sync_index(await fetch_all_profiles())
+            index_sync_status.update(result)
+            await run_blocking(inference_pipeline.embedding_index.save)
+    except Exception as e:
+        print(f"Error syncing identification index: {e}")
+        index_sync_status["error"] = str(e)
+    finally:
+        index_sync_status.update({"running": False, "finished_at": datetime.utcnow().isoformat()})
+
+
+async def rebuild_index_after_model_change():
+    """Re-embed every profile if loading the models dropped an index built with other weights"""
+    try:
+        await inference_pipeline.ensure_loaded()
+    except Exception:
+        return
+    if inference_pipeline.index_reset and not index_sync_status["running"]:
+        print("Rebuilding the identification index for the loaded embedding model")
+        index_sync_status["running"] = True
+        await run_index_sync()
+
+
+@app.post("/index/sync", status_code=202)
+async def sync_index():
+    """Embed new/updated profiles and drop deleted ones, in the background"""
+    if not index_sync_status["running"]:
+        index_sync_status["running"] = True
+        asyncio.create_task(run_index_sync())
+    return {"sync": index_sync_status}
+
+
+@app.put("/index/profiles/{user_id}")
+async def index_profile(user_id: str):
+    """Add or refresh one profile in the identification index"""
+    supabase = get_supabase_client()
+    response = await run_blocking(supabase.table("profiles").select(PROFILE_WITH_REFERENCES).eq("id", user_id).execute)
+    if not response.data:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    profile = response.data[0]
+    try:
+        await inference_pipeline.index_profile(user_id, reference_set(profile), profile.get("updated_at"))
+    except QueueFullError as e:
+        raise overloaded(e)
+    except IdentificationUnavailableError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    # Saved right away, so every API worker answers /identify with it
+    await run_blocking(inference_pipeline.embedding_index.save)
+    return {"index": inference_pipeline.embedding_index.stats()}
+
+
+@app.delete("/index/profiles/{user_id}")
+async def remove_indexed_profile(user_id: str):
+    """Remove a profile from the identification index"""
+    if not inference_pipeline.remove_profile(user_id):
+        raise HTTPException(status_code=404, detail="Profile not indexed")
+    await run_blocking(inference_pipeline.embedding_index.save)
+    return {"index": inference_pipeline.embedding_index.stats()}
+
+
+@app.get("/index/stats")
+async def index_stats():
+    """Size and search mode of the identification index, and the last sync"""
+    return {"index": inference_pipeline.embedding_index.stats(), "sync": index_sync_status}
+
 
 @app.get("/verifications/{user_id}")
-async def get_verifications(user_id: str):
-    """Get all verifications for a user"""
+async def get_verifications(
+    user_id: str,
+    limit: int = HISTORY_PAGE_SIZE,
+    cursor: Optional[str] = None,
+    status: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    include_detections: bool = False
+):
+    """
+    A page of a user's verifications, newest first. Pass the returned
+    `next_cursor` as `cursor` to get the next page; it is null on the last.
+    `status` (comma-separated) and `since`/`until` (ISO dates, `until`
+    exclusive) filter server-side. Per-box detections are left out unless
+    `include_detections` is set.
+    """
+    try:
+        statuses = status.split(",") if status else []
+        unknown = [s for s in statuses if s not in HISTORY_STATUSES]
+        if unknown:
+            raise ValueError(f"Unknown status: {', '.join(unknown)}")
+        since, until = parse_date(since, "since"), parse_date(until, "until")
+        after = keyset_filter(cursor) if cursor else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    limit = max(1, min(limit, HISTORY_MAX_PAGE_SIZE))
+
     try:
         supabase = get_supabase_client()
-        response = supabase.table("verifications").select("*").eq("user_id", user_id).order("timestamp", desc=True).execute()
-        return {"verifications": response.data}
+        query = supabase.table("verifications").select(
+            HISTORY_COLUMNS + (",detections" if include_detections else "")
+        ).eq("user_id", user_id)
+        if statuses:
+            query = query.in_("status", statuses)
+        if since:
+            query = query.gte("timestamp", since)
+        if until:
+            query = query.lt("timestamp", until)
+        if after:
+            query = query.or_(after)
+        # One row past the page tells whether there is a next one
+        with metrics.stage("db_read"):
+            response = await run_blocking(
+                query.order("timestamp", desc=True).order("id", desc=True).limit(limit + 1).execute
+            )
+        verifications, next_cursor = split_page(response.data, limit)
+        return {"verifications": verifications, "next_cursor": next_cursor}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+async def get_cached_profile(user_id: str) -> Optional[Dict]:
+    """A profile with its reference signatures, from the short-TTL cache or the database"""
+    profile = profile_cache.get(user_id)
+    if profile is None:
+        profile = await fetch_profile(user_id)
+        if profile is not None:
+            profile_cache.put(user_id, profile)
+    return profile
+
+
 @app.get("/profile/{user_id}")
 async def get_profile(user_id: str):
     """Get user profile"""
     try:
-        supabase = get_supabase_client()
-        response = supabase.table("profiles").select("*").eq("id", user_id).execute()
-        if not response.data:
+        profile = await get_cached_profile(user_id)
+        if profile is None:
             raise HTTPException(status_code=404, detail="Profile not found")
-        return {"profile": response.data[0]}
+        # The cached row is shared; answer with a copy
+        profile = dict(profile)
+        profile["reference_signatures"] = [public_reference(r) for r in reference_set(profile)]
+        return {"profile": profile}
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+async def load_profile(user_id: str) -> Dict:
+    supabase = get_supabase_client()
+    response = await run_blocking(
+        supabase.table("profiles").select(PROFILE_WITH_REFERENCES).eq("id", user_id).execute
+    )
+    if not response.data:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return response.data[0]
+
+
+async def touch_profile(user_id: str, fields: Optional[Dict] = None):
+    """Bump updated_at so cached embeddings, cached results and the index entry are refreshed"""
+    supabase = get_supabase_client()
+    await run_blocking(
+        supabase.table("profiles")
+        .update({**(fields or {}), "updated_at": datetime.utcnow().isoformat()})
+        .eq("id", user_id).execute
+    )
+    profile_cache.invalidate(user_id)
+    inference_pipeline.embedding_cache.invalidate(user_id)
+
+
+# Recomputed reference embeddings (stale or missing in the DB) are written back
+inference_pipeline.on_reference_embedded = reference_embedding_writer(profile_cache)
+
+
+async def reindex_profile(user_id: str):
+    """Best-effort refresh of a profile's identification index entry"""
+    if inference_pipeline.siamese_model is None:
+        return
+    try:
+        profile = await load_profile(user_id)
+        await inference_pipeline.index_profile(user_id, reference_set(profile), profile.get("updated_at"))
+        await run_blocking(inference_pipeline.embedding_index.save)
+    except Exception as e:
+        print(f"Error indexing profile {user_id}: {e}")
+
+
+@app.post("/profile/{user_id}/references")
+async def add_reference(user_id: str, file: UploadFile = File(...)):
+    """
+    Add a reference signature to a profile. Its embedding is computed once
+    here and stored with it, so verification does not re-embed it.
+    """
+    profile = await load_profile(user_id)
+    # A profile without rows is scored on reference_sig_url, which counts toward the limit
+    references = reference_set(profile)
+    if len(references) >= PROFILE_MAX_REFERENCES:
+        raise HTTPException(
+            status_code=409, detail=f"Profile already has {PROFILE_MAX_REFERENCES} reference signatures"
+        )
+
+    try:
+        spooled = await spool_upload(file)
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    try:
+        content = await run_blocking(spooled.read_bytes)
+        try:
+            embedding = await inference_pipeline.embed_reference(content)
+        except QueueFullError as e:
+            raise overloaded(e)
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=f"Could not read reference signature: {e}")
+        path = content_addressed_path("references", spooled.sha256, os.path.splitext(file.filename or "")[1])
+        sig_url = await storage_service.upload_file(content, path)
+    finally:
+        spooled.cleanup()
+
+    row = {"profile_id": user_id, "sig_url": sig_url}
+    # Tagged with the weights, so a checkpoint change makes verification re-embed (and re-store) it
+    if inference_pipeline.stores_embeddings:
+        row.update({
+            "embedding": encode_embedding(embedding), "embedding_model": inference_pipeline.embedding_model_tag()
+        })
+    try:
+        supabase = get_supabase_client()
+        # Give the legacy reference its own row first, or it would stop being scored
+        # once the profile has any rows. Its embedding is computed on first use
+        legacy = legacy_reference_row(profile)
+        if legacy is not None and legacy["sig_url"] != sig_url:
+            await run_blocking(
+                supabase.table("reference_signatures").upsert(legacy, on_conflict="profile_id,sig_url").execute
+            )
+        inserted = await run_blocking(
+            supabase.table("reference_signatures").upsert(row, on_conflict="profile_id,sig_url").execute
+        )
+        await touch_profile(user_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    await reindex_profile(user_id)
+    return {"reference": public_reference(inserted.data[0] if inserted.data else row)}
+
+
+@app.delete("/profile/{user_id}/references/{reference_id}")
+async def delete_reference(user_id: str, reference_id: str):
+    """Remove a reference signature; a profile always keeps at least one"""
+    profile = await load_profile(user_id)
+    references = profile.get("reference_signatures") or []
+    deleted = next((r for r in references if r["id"] == reference_id), None)
+    if deleted is None:
+        raise HTTPException(status_code=404, detail="Reference signature not found")
+    if len(reference_set(profile)) == 1:
+        raise HTTPException(status_code=409, detail="A profile needs at least one reference signature")
+
+    try:
+        supabase = get_supabase_client()
+        await run_blocking(supabase.table("reference_signatures").delete().eq("id", reference_id).execute)
+        # Keep the primary reference pointing at one that still exists
+        fields = {}
+        if profile["reference_sig_url"] == deleted["sig_url"]:
+            fields["reference_sig_url"] = next(r["sig_url"] for r in references if r["id"] != reference_id)
+        await touch_profile(user_id, fields)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    await reindex_profile(user_id)
+    return {"deleted": reference_id}
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
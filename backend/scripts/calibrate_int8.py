@@ -0,0 +1,86 @@
+"""
+Calibrate static INT8 CycleGAN and Siamese models.
+
+Runs a directory of signature crops (as YOLO would cut them from documents)
+through observer-instrumented copies of the fp32 models, converts them to
+INT8 and saves traced graphs to MODEL_EXPORT_DIR as cyclegan.int8.torchscript
+and siamese.int8.torchscript. The Siamese model is calibrated on the fp32
+CycleGAN's cleaned output, which is what it sees in the pipeline.
+
+Serve them with INFERENCE_PRECISION=int8_static, and check score drift with
+benchmarks/precision_drift.py before rolling out.
+
+Usage:
+    python -m scripts.calibrate_int8 --images calibration_crops/ --max-images 512
+"""
+
+import argparse
+import os
+
+import torch
+from PIL import Image
+from dotenv import load_dotenv
+
+from services import precision as precision_modes
+from services.inference_pipeline import (
+    SiameseEmbedding,
+    load_cyclegan_generator,
+    load_siamese_network,
+    postprocess_cyclegan,
+    preprocess_cyclegan,
+    preprocess_siamese,
+)
+
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".tif", ".tiff", ".bmp")
+
+
+def load_images(directory: str, limit: int):
+    names = sorted(name for name in os.listdir(directory) if name.lower().endswith(IMAGE_EXTENSIONS))[:limit]
+    if not names:
+        raise SystemExit(f"No images found in {directory}")
+    return [Image.open(os.path.join(directory, name)).convert("RGB") for name in names]
+
+
+def chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def main():
+    load_dotenv()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", required=True, help="Directory of signature crops")
+    parser.add_argument("--export-dir", default=os.getenv("MODEL_EXPORT_DIR", "models/exported"))
+    parser.add_argument("--max-images", type=int, default=512)
+    parser.add_argument("--batch-size", type=int, default=16)
+    args = parser.parse_args()
+
+    os.makedirs(args.export_dir, exist_ok=True)
+    device = torch.device("cpu")
+    images = load_images(args.images, args.max_images)
+    print(f"Calibrating on {len(images)} images")
+
+    cyclegan = load_cyclegan_generator(device)
+    siamese = SiameseEmbedding(load_siamese_network(device)).eval()
+
+    # Clean the calibration set once with fp32 CycleGAN for the Siamese calibration
+    cleaned = []
+    with torch.no_grad():
+        for batch in chunks(images, args.batch_size):
+            cleaned.extend(postprocess_cyclegan(cyclegan(preprocess_cyclegan(batch)), batch))
+
+    for name, model, preprocess, data in (
+        ("cyclegan", cyclegan, preprocess_cyclegan, images),
+        ("siamese", siamese, preprocess_siamese, cleaned),
+    ):
+        example = preprocess(data[:1])
+        prepared = precision_modes.prepare_static_int8(model, example)
+        precision_modes.calibrate(prepared, (preprocess(batch) for batch in chunks(data, args.batch_size)))
+        quantized = precision_modes.convert_static_int8(prepared)
+        path = precision_modes.save_static_int8(quantized, example, args.export_dir, name)
+        print(f"Saved {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+"""
+Fit score calibration and the cascade band on labelled signature pairs.
+
+Reads a CSV of `candidate,reference,label` rows (image paths relative to the
+CSV, label 1 for a genuine pair and 0 for a forgery). It embeds every image
+with the full Siamese model and with the cascade's cheap low-resolution
+embedding (CASCADE_FAST_SIZE), and then:
+
+- fits a logistic regression of the label on the embedding distance, per
+  model: the sigmoid that turns distances into match probabilities;
+- picks the success threshold as the lowest full-model probability whose
+  false-accept rate stays within --max-far;
+- picks the cascade band: the cheap-embedding probabilities above/below
+  which its accept/reject agrees with the full model on all but --max-flip
+  of the pairs it would settle. Settled pairs keep their cheap score and are
+  judged against the same threshold, so the band always straddles it.
+
+The result goes to CALIBRATION_PATH (models/calibration.json), which the
+API and workers load at startup. Re-run it whenever the models change.
+
+Usage:
+    python -m scripts.calibrate_scores --pairs pairs.csv --clean --max-far 0.01
+"""
+
+import argparse
+import csv
+import json
+import os
+from datetime import datetime
+
+import numpy as np
+from PIL import Image
+from dotenv import load_dotenv
+from sklearn.linear_model import LogisticRegression
+
+from services.inference_pipeline import InferencePipeline
+
+
+def load_pairs(path: str):
+    root = os.path.dirname(os.path.abspath(path))
+    with open(path, newline="") as f:
+        rows = [row for row in csv.DictReader(f)]
+    if not rows:
+        raise SystemExit(f"No pairs in {path}")
+    return [
+        (os.path.join(root, row["candidate"]), os.path.join(root, row["reference"]), int(row["label"]))
+        for row in rows
+    ]
+
+
+def embed_all(embed_batch, paths, batch_size: int, clean=None) -> dict:
+    embeddings = {}
+    for start in range(0, len(paths), batch_size):
+        chunk = paths[start:start + batch_size]
+        images = [Image.open(path).convert("RGB") for path in chunk]
+        if clean is not None:
+            images = clean(images)
+        embeddings.update(zip(chunk, embed_batch(images)))
+    return embeddings
+
+
+def distances(pairs, candidates: dict, references: dict) -> np.ndarray:
+    return np.array([np.linalg.norm(candidates[c] - references[r]) for c, r, _ in pairs], dtype=np.float64)
+
+
+def fit_sigmoid(distance: np.ndarray, labels: np.ndarray) -> dict:
+    """P(genuine | distance) = sigmoid(slope * distance + intercept)"""
+    model = LogisticRegression(C=1e4).fit(distance.reshape(-1, 1), labels)
+    return {"slope": float(model.coef_[0][0]), "intercept": float(model.intercept_[0])}
+
+
+def probabilities(distance: np.ndarray, scale: dict) -> np.ndarray:
+    return 1.0 / (1.0 + np.exp(-(scale["slope"] * distance + scale["intercept"])))
+
+
+def pick_threshold(scores: np.ndarray, labels: np.ndarray, max_far: float) -> float:
+    forgeries = scores[labels == 0]
+    for threshold in np.unique(scores):
+        if not len(forgeries) or np.mean(forgeries >= threshold) <= max_far:
+            return float(threshold)
+    return 1.0
+
+
+def pick_band(fast: np.ndarray, decisions: np.ndarray, max_flip: float, threshold: float):
+    """
+    Widest (accept_above, reject_below), with reject_below < threshold <= accept_above,
+    whose settled pairs disagree with `decisions` within max_flip
+    """
+    accept_above, reject_below = None, None
+    values = np.unique(fast)
+    for value in values[values >= threshold]:
+        settled = fast >= value
+        if np.mean(~decisions[settled]) <= max_flip:
+            accept_above = float(value)
+            break
+    for value in values[values < threshold][::-1]:
+        settled = fast <= value
+        if np.mean(decisions[settled]) <= max_flip:
+            reject_below = float(value)
+            break
+    if accept_above is None or reject_below is None or reject_below >= accept_above:
+        return None, None
+    return accept_above, reject_below
+
+
+def error_rates(accepted: np.ndarray, labels: np.ndarray) -> dict:
+    return {
+        "far": round(float(np.mean(accepted[labels == 0])), 4) if np.any(labels == 0) else None,
+        "frr": round(float(np.mean(~accepted[labels == 1])), 4) if np.any(labels == 1) else None,
+    }
+
+
+def main():
+    load_dotenv()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pairs", required=True, help="CSV of candidate,reference,label")
+    parser.add_argument("--output", default=os.getenv("CALIBRATION_PATH", "models/calibration.json"))
+    parser.add_argument("--clean", action="store_true", help="Clean candidates as the pipeline would first")
+    parser.add_argument("--max-far", type=float, default=0.01, help="False-accept rate allowed at the threshold")
+    parser.add_argument("--max-flip", type=float, default=0.005,
+                        help="Share of cascade-settled pairs allowed to disagree with the full model")
+    parser.add_argument("--batch-size", type=int, default=16)
+    args = parser.parse_args()
+
+    pairs = load_pairs(args.pairs)
+    labels = np.array([label for _, _, label in pairs])
+    print(f"Calibrating on {len(pairs)} pairs ({int(labels.sum())} genuine)")
+
+    pipeline = InferencePipeline()
+    pipeline._load_models()
+    if pipeline.siamese_model is None:
+        raise SystemExit("Calibration needs the Siamese model")
+
+    candidate_paths = sorted({c for c, _, _ in pairs})
+    reference_paths = sorted({r for _, r, _ in pairs})
+    clean = pipeline._clean_batch if args.clean else None
+    models, scores = {}, {}
+    for tag, embed_batch in (
+        (pipeline.embedding_model_tag(), pipeline._embed_batch),
+        (pipeline.fast_embedding_tag(), pipeline._embed_fast_batch),
+    ):
+        candidates = embed_all(embed_batch, candidate_paths, args.batch_size, clean)
+        references = embed_all(embed_batch, reference_paths, args.batch_size)
+        distance = distances(pairs, candidates, references)
+        models[tag] = fit_sigmoid(distance, labels)
+        scores[tag] = probabilities(distance, models[tag])
+        print(f"{tag}: slope {models[tag]['slope']:.4f}, intercept {models[tag]['intercept']:.4f}")
+
+    full, fast = scores[pipeline.embedding_model_tag()], scores[pipeline.fast_embedding_tag()]
+    threshold = pick_threshold(full, labels, args.max_far)
+    decisions = full >= threshold
+    accept_above, reject_below = pick_band(fast, decisions, args.max_flip, threshold)
+
+    report = {"full": error_rates(decisions, labels)}
+    if accept_above is not None:
+        settled = (fast >= accept_above) | (fast <= reject_below)
+        cascade_decisions = np.where(settled, fast >= accept_above, decisions)
+        report["cascade"] = {
+            **error_rates(cascade_decisions, labels),
+            "early_exit_rate": round(float(np.mean(settled)), 4),
+            "flips": int(np.sum(cascade_decisions != decisions)),
+        }
+    else:
+        print("No cascade band meets --max-flip; the cheap embedding will not end verifications early")
+
+    calibration = {
+        "fitted_at": datetime.utcnow().isoformat(),
+        "pairs": len(pairs),
+        "models": models,
+        "threshold": threshold,
+        "cascade": {"accept_above": accept_above, "reject_below": reject_below},
+        "report": report,
+    }
+    directory = os.path.dirname(os.path.abspath(args.output))
+    os.makedirs(directory, exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(calibration, f, indent=2)
+    print(json.dumps({"threshold": threshold, "cascade": calibration["cascade"], "report": report}, indent=2))
+    print(f"Saved {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+"""
+Convert CycleGAN / Siamese checkpoints (.pt / .pth state dicts) to
+.safetensors, which InferencePipeline memory-maps so every worker on a host
+shares one copy of the weights.
+
+Point CYCLEGAN_MODEL_PATH / SIAMESE_MODEL_PATH at the converted files.
+
+Usage:
+    python -m scripts.convert_weights models/cyclegan.pth models/siamese.pth
+"""
+
+import argparse
+import os
+
+import torch
+from safetensors.torch import save_file
+
+
+def convert(path: str) -> str:
+    state = torch.load(path, map_location="cpu", weights_only=True)
+    # safetensors refuses aliased storage; store each tensor on its own
+    state = {name: tensor.contiguous().clone() for name, tensor in state.items()}
+    target = os.path.splitext(path)[0] + ".safetensors"
+    save_file(state, target)
+    return target
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("checkpoints", nargs="+", help="State dict files to convert")
+    args = parser.parse_args()
+
+    for path in args.checkpoints:
+        print(f"Converted {path} -> {convert(path)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Export YOLO, CycleGAN and the Siamese embedding network to ONNX (and
+optionally TorchScript), then check numerical parity against the eager models.
+
+Weights are read from the same environment variables the API uses
+(YOLO_MODEL_PATH, CYCLEGAN_MODEL_PATH, SIAMESE_MODEL_PATH). The exported
+graphs are written to MODEL_EXPORT_DIR (default models/exported) as
+yolo.onnx, cyclegan.onnx, siamese.onnx (+ *.torchscript), which is where
+InferencePipeline looks for them when INFERENCE_BACKEND=onnx / torchscript.
+
+Usage:
+    python -m scripts.export_models [--torchscript] [--sample-image doc.jpg]
+
+Exits non-zero if any exported model drifts beyond the parity tolerance.
+"""
+
+import argparse
+import os
+import shutil
+import sys
+
+import numpy as np
+import torch
+import torch.nn as nn
+from PIL import Image
+from dotenv import load_dotenv
+from ultralytics import YOLO
+
+from services.inference_pipeline import SiameseEmbedding, load_cyclegan_generator, load_siamese_network
+from services.model_backends import exported_model_path, load_exported_model
+
+
+def export_module(module: nn.Module, example: torch.Tensor, export_dir: str, name: str, torchscript: bool):
+    onnx_path = exported_model_path(export_dir, name, "onnx")
+    torch.onnx.export(
+        module,
+        example,
+        onnx_path,
+        input_names=["input"],
+        output_names=["output"],
+        dynamic_axes={"input": {0: "batch"}, "output": {0: "batch"}},
+        opset_version=17,
+        do_constant_folding=True,
+    )
+    print(f"Exported {onnx_path}")
+
+    if torchscript:
+        ts_path = exported_model_path(export_dir, name, "torchscript")
+        with torch.no_grad():
+            torch.jit.trace(module, example).save(ts_path)
+        print(f"Exported {ts_path}")
+
+
+def export_yolo(export_dir: str, torchscript: bool):
+    model_path = os.getenv("YOLO_MODEL_PATH", "yolov11n.pt")
+    formats = ["onnx"] + (["torchscript"] if torchscript else [])
+    for fmt in formats:
+        exported = YOLO(model_path).export(format=fmt, dynamic=(fmt == "onnx"))
+        target = exported_model_path(export_dir, "yolo", fmt)
+        shutil.copyfile(exported, target)
+        print(f"Exported {target}")
+
+
+def check_tensor_parity(name: str, eager: nn.Module, export_dir: str, backend: str,
+                        example: torch.Tensor, rtol: float, atol: float) -> bool:
+    exported = load_exported_model(export_dir, name, backend, example.device)
+    with torch.no_grad():
+        expected = eager(example).cpu().numpy()
+        actual = exported(example).cpu().numpy()
+    max_diff = float(np.abs(expected - actual).max())
+    ok = np.allclose(actual, expected, rtol=rtol, atol=atol)
+    print(f"[{'OK' if ok else 'FAIL'}] {name} ({backend}): max abs diff {max_diff:.2e}")
+    return ok
+
+
+def check_yolo_parity(export_dir: str, backend: str, sample: np.ndarray, tolerance_px: float) -> bool:
+    def boxes(model) -> np.ndarray:
+        result = model(sample, conf=0.25, verbose=False)[0].boxes
+        xyxy = result.xyxy.cpu().numpy() if result is not None else np.zeros((0, 4))
+        return xyxy[np.lexsort(xyxy.T[::-1])] if len(xyxy) else xyxy
+
+    expected = boxes(YOLO(os.getenv("YOLO_MODEL_PATH", "yolov11n.pt")))
+    actual = boxes(YOLO(exported_model_path(export_dir, "yolo", backend), task="detect"))
+    ok = expected.shape == actual.shape and (len(expected) == 0 or np.abs(expected - actual).max() <= tolerance_px)
+    print(f"[{'OK' if ok else 'FAIL'}] yolo ({backend}): {len(expected)} eager vs {len(actual)} exported boxes")
+    return ok
+
+
+def main():
+    load_dotenv()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--export-dir", default=os.getenv("MODEL_EXPORT_DIR", "models/exported"))
+    parser.add_argument("--torchscript", action="store_true", help="Also export TorchScript")
+    parser.add_argument("--skip-check", action="store_true", help="Skip the parity checks")
+    parser.add_argument("--sample-image", help="Document image for the YOLO parity check (default: random noise)")
+    parser.add_argument("--rtol", type=float, default=1e-3)
+    parser.add_argument("--atol", type=float, default=1e-4)
+    parser.add_argument("--box-tolerance", type=float, default=1.0, help="Max YOLO box drift in pixels")
+    args = parser.parse_args()
+
+    os.makedirs(args.export_dir, exist_ok=True)
+    device = torch.device("cpu")
+    torch.manual_seed(0)
+
+    cyclegan = load_cyclegan_generator(device)
+    siamese = SiameseEmbedding(load_siamese_network(device)).eval()
+    cyclegan_example = torch.randn(2, 3, 256, 256)
+    siamese_example = torch.randn(2, 3, 224, 224)
+
+    export_yolo(args.export_dir, args.torchscript)
+    export_module(cyclegan, cyclegan_example, args.export_dir, "cyclegan", args.torchscript)
+    export_module(siamese, siamese_example, args.export_dir, "siamese", args.torchscript)
+
+    if args.skip_check:
+        return
+
+    if args.sample_image:
+        sample = np.array(Image.open(args.sample_image).convert("RGB"))
+    else:
+        sample = np.random.RandomState(0).randint(0, 256, (640, 640, 3), dtype=np.uint8)
+
+    # Parity is checked on a different batch size than the export example
+    cyclegan_check = torch.randn(3, 3, 256, 256)
+    siamese_check = torch.randn(3, 3, 224, 224)
+    results = []
+    for backend in ["onnx"] + (["torchscript"] if args.torchscript else []):
+        results.append(check_tensor_parity("cyclegan", cyclegan, args.export_dir, backend, cyclegan_check, args.rtol, args.atol))
+        results.append(check_tensor_parity("siamese", siamese, args.export_dir, backend, siamese_check, args.rtol, args.atol))
+        results.append(check_yolo_parity(args.export_dir, backend, sample, args.box_tolerance))
+
+    if not all(results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
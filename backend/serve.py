@@ -0,0 +1,105 @@
+"""
+Multi-worker API server that loads the models once.
+
+The master process loads the models (without running them), binds the
+listening socket and forks API_WORKERS uvicorn workers. Each worker starts
+with the models already in memory, shared copy-on-write with the master,
+instead of loading its own, and is pinned to its own slice of the cores.
+Within a worker, INFERENCE_REPLICAS splits that slice further.
+
+Linux only (fork, sched_setaffinity). Elsewhere, run `python main.py`.
+
+Usage:
+    python serve.py --workers 4 --port 8000
+"""
+
+import argparse
+import os
+import signal
+import socket
+
+from dotenv import load_dotenv
+
+from services.replicas import available_cores, format_cores, split_cores
+
+load_dotenv()
+
+
+def bind(host: str, port: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def run_worker(index: int, cores: str, sock: socket.socket):
+    import uvicorn
+
+    os.environ["PURESIGN_CORES"] = cores
+    # Each process journals its own writes, so restarts replay only their own
+    journal_root = os.getenv("WRITE_BEHIND_DIR", "journal")
+    os.environ["WRITE_BEHIND_DIR"] = os.path.join(journal_root, f"api-{index}")
+    # The identification index is shared instead: workers merge their saves into
+    # one file and reload it when another saves, and one at a time syncs it
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+
+    # main pins the process and builds its pipeline around the preloaded models
+    import main as app_module
+
+    print(f"API worker {index} (pid {os.getpid()}) on cores {cores}")
+    uvicorn.Server(uvicorn.Config(app_module.app, log_level="info")).run(sockets=[sock])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=int(os.getenv("API_WORKERS", "1")))
+    parser.add_argument("--host", default=os.getenv("API_HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("API_PORT", "8000")))
+    args = parser.parse_args()
+
+    core_sets = split_cores(available_cores(), args.workers)
+    # Replicas are sized to a worker's share of the cores, so the copies made here fit every worker
+    os.environ["PURESIGN_CORES"] = format_cores(core_sets[0])
+
+    from services.inference_pipeline import preload_models
+
+    preload_models()
+    os.environ.pop("PURESIGN_CORES")
+    sock = bind(args.host, args.port)
+
+    children = {}
+    for index in range(args.workers):
+        cores = format_cores(core_sets[index % len(core_sets)])
+        pid = os.fork()
+        if pid == 0:
+            try:
+                run_worker(index, cores, sock)
+            finally:
+                os._exit(0)
+        children[pid] = index
+    print(f"Serving on {args.host}:{args.port} with {args.workers} workers")
+
+    def forward(signum, _frame):
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, forward)
+    signal.signal(signal.SIGINT, forward)
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        index = children.pop(pid, None)
+        if index is not None and status != 0:
+            print(f"API worker {index} exited with status {status}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+import asyncio
+import os
+import time
+from typing import Any, Callable, List, Optional, Tuple
+from services import metrics
+from services.executor import BoundedExecutor, QueueFullError
+
+
+class MicroBatcher:
+    """
+    Collects items submitted from concurrent coroutines and runs them through
+    a single batched call.
+
+    A batch is flushed once `max_batch_size` items are waiting or `max_wait_ms`
+    has elapsed since the first item arrived, whichever comes first. `batch_fn`
+    receives the list of items and must return one result per item, in order.
+    It runs on `executor` when one is given, so the event loop is never blocked.
+    Submissions beyond `max_queue` waiting items raise QueueFullError.
+    Up to `max_concurrent_batches` batches run at once (one per model
+    replica); the next batch is collected only once a slot is free, so
+    items keep accumulating while every replica is busy.
+    """
+
+    def __init__(self, name: str, batch_fn: Callable[[List[Any]], List[Any]],
+                 max_batch_size: int = 8, max_wait_ms: float = 5.0, max_queue: int = 256,
+                 executor: Optional[BoundedExecutor] = None, max_concurrent_batches: int = 1):
+        self.name = name
+        self.batch_fn = batch_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait_ms = max(0.0, max_wait_ms)
+        self.max_queue = max(1, max_queue)
+        self.executor = executor
+        self.max_concurrent_batches = max(1, max_concurrent_batches)
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._running: set = set()
+        self.batches_run = 0
+        self.items_processed = 0
+
+    @classmethod
+    def from_env(cls, name: str, batch_fn: Callable[[List[Any]], List[Any]],
+                 default_batch_size: int = 8, default_wait_ms: float = 5.0,
+                 executor: Optional[BoundedExecutor] = None,
+                 default_concurrent_batches: int = 1) -> "MicroBatcher":
+        """
+        Read `{NAME}_BATCH_SIZE`, `{NAME}_BATCH_WAIT_MS`, `{NAME}_MAX_QUEUE` and
+        `{NAME}_CONCURRENT_BATCHES` from the environment
+        """
+        prefix = name.upper()
+        return cls(
+            name,
+            batch_fn,
+            max_batch_size=int(os.getenv(f"{prefix}_BATCH_SIZE", str(default_batch_size))),
+            max_wait_ms=float(os.getenv(f"{prefix}_BATCH_WAIT_MS", str(default_wait_ms))),
+            max_queue=int(os.getenv(f"{prefix}_MAX_QUEUE", "256")),
+            executor=executor,
+            max_concurrent_batches=int(
+                os.getenv(f"{prefix}_CONCURRENT_BATCHES", str(default_concurrent_batches))
+            ),
+        )
+
+    def _ensure_worker(self):
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    async def submit(self, item: Any) -> Any:
+        """Queue an item and wait for its result from the next batch"""
+        if self.max_batch_size == 1:
+            return (await self._run_batch([item]))[0]
+
+        self._ensure_worker()
+        if self._queue.qsize() >= self.max_queue:
+            raise QueueFullError(self.name)
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((item, future))
+        return await future
+
+    async def _collect(self) -> List[Tuple[Any, asyncio.Future]]:
+        batch = [await self._queue.get()]
+        deadline = asyncio.get_running_loop().time() + self.max_wait_ms / 1000.0
+
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - asyncio.get_running_loop().time()
+            if timeout <= 0:
+                # Still take anything that is already waiting
+                while len(batch) < self.max_batch_size and not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+
+        return batch
+
+    async def _run_batch(self, items: List[Any]) -> List[Any]:
+        started = time.perf_counter()
+        if self.executor is not None:
+            results = await self.executor.run(self.batch_fn, items)
+        else:
+            results = self.batch_fn(items)
+        if len(results) != len(items):
+            raise RuntimeError(
+                f"{self.name} batch returned {len(results)} results for {len(items)} items"
+            )
+        self.batches_run += 1
+        self.items_processed += len(items)
+        metrics.record_batch(self.name, len(items), time.perf_counter() - started)
+        return results
+
+    async def _run(self):
+        slots = asyncio.Semaphore(self.max_concurrent_batches)
+        while True:
+            await slots.acquire()
+            try:
+                batch = await self._collect()
+            except BaseException:
+                slots.release()
+                raise
+            task = asyncio.get_running_loop().create_task(self._complete(batch))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+            task.add_done_callback(lambda _: slots.release())
+
+    async def _complete(self, batch: List[Tuple[Any, asyncio.Future]]):
+        items = [item for item, _ in batch]
+        try:
+            results = await self._run_batch(items)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    def stats(self) -> dict:
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait_ms,
+            "max_queue": self.max_queue,
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "running_batches": len(self._running),
+            "batches_run": self.batches_run,
+            "items_processed": self.items_processed,
+            "mean_batch_size": (self.items_processed / self.batches_run) if self.batches_run else 0.0,
+        }
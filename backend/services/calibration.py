@@ -0,0 +1,115 @@
+import hashlib
+import json
+import os
+import threading
+from typing import Dict, Optional, Tuple
+
+
+# The uncalibrated mapping, score = sigmoid(-distance + 5), and acceptance threshold
+DEFAULT_SLOPE = -1.0
+DEFAULT_INTERCEPT = 5.0
+DEFAULT_THRESHOLD = 0.7
+
+
+class Calibration:
+    """
+    Score calibration fitted on labelled pairs by scripts/calibrate_scores.py.
+
+    Each embedding model (by its embedding tag) maps a distance to a
+    probability of a genuine match with its own sigmoid(slope * d + intercept).
+    `threshold` is the probability at which a verification succeeds.
+    `accept_above` / `reject_below` bound the band of scores from the
+    cheap embedding that are decisive on their own; scores between them go
+    on to the full model. Without a band the cascade never stops early
+    after the cheap embedding. A settled score keeps its cheap-embedding
+    value and is compared to `threshold` like any other, so the band must
+    satisfy reject_below < threshold <= accept_above; otherwise it is dropped.
+    """
+
+    def __init__(self, models: Optional[Dict[str, Dict]] = None, threshold: float = DEFAULT_THRESHOLD,
+                 accept_above: Optional[float] = None, reject_below: Optional[float] = None,
+                 source: Optional[str] = None):
+        self.models = models or {}
+        self.threshold = threshold
+        self.accept_above = accept_above
+        self.reject_below = reject_below
+        self.source = source
+
+    @classmethod
+    def from_file(cls, path: str) -> "Calibration":
+        with open(path) as f:
+            data = json.load(f)
+        cascade = data.get("cascade") or {}
+        return cls(
+            models=data.get("models"),
+            threshold=data.get("threshold", DEFAULT_THRESHOLD),
+            accept_above=cascade.get("accept_above"),
+            reject_below=cascade.get("reject_below"),
+            source=path,
+        )
+
+    @classmethod
+    def from_env(cls) -> "Calibration":
+        """
+        Load CALIBRATION_PATH if it exists (defaults otherwise), then apply
+        VERIFY_THRESHOLD, CASCADE_ACCEPT_ABOVE and CASCADE_REJECT_BELOW overrides
+        """
+        path = os.getenv("CALIBRATION_PATH", "models/calibration.json")
+        calibration = cls.from_file(path) if path and os.path.exists(path) else cls()
+        for attribute, name in (("threshold", "VERIFY_THRESHOLD"), ("accept_above", "CASCADE_ACCEPT_ABOVE"),
+                                ("reject_below", "CASCADE_REJECT_BELOW")):
+            value = os.getenv(name)
+            if value:
+                setattr(calibration, attribute, float(value))
+        if calibration.has_cascade_band and not calibration.band_agrees_with_threshold():
+            print(
+                f"Ignoring cascade band (accept_above={calibration.accept_above}, "
+                f"reject_below={calibration.reject_below}): it must satisfy "
+                f"reject_below < threshold ({calibration.threshold}) <= accept_above"
+            )
+            calibration.accept_above = calibration.reject_below = None
+        return calibration
+
+    def scale(self, tag: str) -> Tuple[float, float]:
+        """(slope, intercept) of the distance-to-score sigmoid for an embedding model"""
+        model = self.models.get(tag) or {}
+        return model.get("slope", DEFAULT_SLOPE), model.get("intercept", DEFAULT_INTERCEPT)
+
+    @property
+    def has_cascade_band(self) -> bool:
+        return self.accept_above is not None and self.reject_below is not None
+
+    def band_agrees_with_threshold(self) -> bool:
+        """Whether a cheap-embedding accept always ends in success, and a reject in failure"""
+        return self.reject_below < self.threshold <= self.accept_above
+
+    def decisive(self, score: float) -> bool:
+        """Whether a cheap-embedding score settles the verification without the full model"""
+        return self.has_cascade_band and (score >= self.accept_above or score <= self.reject_below)
+
+    def to_dict(self) -> Dict:
+        return {
+            "models": self.models,
+            "threshold": self.threshold,
+            "cascade": {"accept_above": self.accept_above, "reject_below": self.reject_below},
+            "source": self.source,
+        }
+
+    def fingerprint(self) -> str:
+        payload = {key: value for key, value in self.to_dict().items() if key != "source"}
+        return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()[:12]
+
+
+_calibration: Optional[Calibration] = None
+_calibration_lock = threading.Lock()
+
+
+def get_calibration() -> Calibration:
+    global _calibration
+
+    if _calibration is None:
+        with _calibration_lock:
+            if _calibration is None:
+                _calibration = Calibration.from_env()
+
+    return _calibration
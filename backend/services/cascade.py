@@ -0,0 +1,67 @@
+import threading
+from typing import Dict, Optional
+
+from services import metrics
+
+
+# "off" runs every stage on every page; "detect" ends pages without a
+# signature after detection; "full" also lets the cheap embedding settle
+# clear-cut scores before the full Siamese model runs
+CASCADE_MODES = ("off", "detect", "full")
+
+# Stages a verification can stop after, and the stages each one skips
+EXIT_SKIPS = {
+    "detect": ("clean", "verify"),
+    "verify_fast": ("verify_full",),
+}
+
+
+class CascadeStats:
+    """
+    How often each cascade stage ends a verification early, and the time
+    that saved. The saving of an exit is estimated from the moving average
+    time of the stages it skipped, as measured on verifications that ran them.
+    """
+
+    def __init__(self, smoothing: float = 0.05):
+        self.smoothing = smoothing
+        self._lock = threading.Lock()
+        self._stage_seconds: Dict[str, float] = {}
+        self.verifications = 0
+        self.exits = {stage: 0 for stage in EXIT_SKIPS}
+        self.saved_seconds = {stage: 0.0 for stage in EXIT_SKIPS}
+
+    def observe(self, stage: str, seconds: float):
+        """Record the time a stage took on a verification that ran it"""
+        with self._lock:
+            mean = self._stage_seconds.get(stage)
+            self._stage_seconds[stage] = seconds if mean is None else mean + self.smoothing * (seconds - mean)
+
+    def record(self, exit_stage: Optional[str]):
+        """Count a finished verification, and the stage it exited after (None if it ran to the end)"""
+        with self._lock:
+            self.verifications += 1
+            if exit_stage is None:
+                return
+            saved = sum(self._stage_seconds.get(stage, 0.0) for stage in EXIT_SKIPS[exit_stage])
+            self.exits[exit_stage] += 1
+            self.saved_seconds[exit_stage] += saved
+        metrics.CASCADE_EXITS.labels(exit_stage).inc()
+        metrics.CASCADE_SAVED_SECONDS.labels(exit_stage).inc(saved)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            total = self.verifications
+            return {
+                "verifications": total,
+                "exits": {
+                    stage: {
+                        "count": count,
+                        "rate": round(count / total, 4) if total else 0.0,
+                        "saved_seconds": round(self.saved_seconds[stage], 3),
+                        "mean_saved_ms": round(1000 * self.saved_seconds[stage] / count, 2) if count else 0.0,
+                    }
+                    for stage, count in self.exits.items()
+                },
+                "stage_mean_ms": {stage: round(seconds * 1000, 2) for stage, seconds in self._stage_seconds.items()},
+            }
@@ -0,0 +1,93 @@
+import os
+from typing import Dict
+
+import cv2
+import numpy as np
+
+
+CLEANING_MODES = ("auto", "gan", "classical")
+
+# Routing thresholds: crops that pass all of them are clean enough for the classical path
+CLEAN_MIN_BACKGROUND = float(os.getenv("CLEAN_MIN_BACKGROUND", "170"))
+CLEAN_MAX_NOISE = float(os.getenv("CLEAN_MAX_NOISE", "18"))
+CLEAN_MAX_COLOR = float(os.getenv("CLEAN_MAX_COLOR", "0.12"))
+CLEAN_MAX_LINES = float(os.getenv("CLEAN_MAX_LINES", "0.08"))
+
+_STATS_SIDE = 256
+
+
+def crop_stats(image: np.ndarray) -> Dict[str, float]:
+    """
+    Cheap statistics of a signature crop (RGB uint8), on a copy at most
+    256 px on its long side:
+    - background: 90th percentile brightness (paper colour)
+    - noise: brightness spread over the paper pixels
+    - color: share of saturated, non-dark pixels (stamps, coloured forms)
+    - lines: share of rows/columns that are mostly dark (ruled lines, box edges)
+    """
+    h, w = image.shape[:2]
+    scale = _STATS_SIDE / max(h, w)
+    if scale < 1:
+        image = cv2.resize(image, (max(1, int(w * scale)), max(1, int(h * scale))), interpolation=cv2.INTER_AREA)
+    gray = cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
+    hsv = cv2.cvtColor(image, cv2.COLOR_RGB2HSV)
+
+    background = float(np.percentile(gray, 90))
+    paper = gray[gray >= background - 40]
+    dark = gray < background - 60
+    line_rows = (dark.mean(axis=1) > 0.6).mean()
+    line_cols = (dark.mean(axis=0) > 0.6).mean()
+    return {
+        "background": background,
+        "noise": float(paper.std()) if paper.size else 0.0,
+        "color": float(((hsv[..., 1] > 80) & (hsv[..., 2] > 90)).mean()),
+        "lines": float(max(line_rows, line_cols)),
+    }
+
+
+def is_clean(stats: Dict[str, float]) -> bool:
+    """Whether the classical path is enough for a crop with these statistics"""
+    return (
+        stats["background"] >= CLEAN_MIN_BACKGROUND
+        and stats["noise"] <= CLEAN_MAX_NOISE
+        and stats["color"] <= CLEAN_MAX_COLOR
+        and stats["lines"] <= CLEAN_MAX_LINES
+    )
+
+
+def clean_classical(image: np.ndarray) -> np.ndarray:
+    """
+    Whole-array OpenCV cleaning of a signature crop (RGB uint8 in, RGB uint8
+    out: black ink on white). Red/orange stamp ink is masked out by colour,
+    ink is separated from the paper by adaptive thresholding, ruled lines are
+    found with long morphological openings and subtracted, and specks
+    are dropped by connected-component area.
+    """
+    h, w = image.shape[:2]
+    hsv = cv2.cvtColor(image, cv2.COLOR_RGB2HSV)
+    gray = cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
+
+    # Stamp ink: saturated reds (hue wraps around 0 on OpenCV's 0-180 scale)
+    hue, sat, val = hsv[..., 0], hsv[..., 1], hsv[..., 2]
+    stamp = ((hue < 12) | (hue > 160)) & (sat > 70) & (val > 70)
+    gray = np.where(stamp, 255, gray).astype(np.uint8)
+
+    # Ink mask (ink = 255); the block size follows the crop size so strokes stay whole
+    block = max(15, (min(h, w) // 8) | 1)
+    ink = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY_INV, block, 15)
+
+    # Ruled lines: runs much longer than any pen stroke
+    horizontal = cv2.morphologyEx(ink, cv2.MORPH_OPEN, cv2.getStructuringElement(cv2.MORPH_RECT, (max(25, w // 3), 1)))
+    vertical = cv2.morphologyEx(ink, cv2.MORPH_OPEN, cv2.getStructuringElement(cv2.MORPH_RECT, (1, max(25, h // 2))))
+    ink = cv2.subtract(ink, cv2.bitwise_or(horizontal, vertical))
+    # Re-join strokes that crossed a removed line
+    ink = cv2.morphologyEx(ink, cv2.MORPH_CLOSE, cv2.getStructuringElement(cv2.MORPH_RECT, (1, 3)))
+
+    # Specks: components smaller than a dot of the pen
+    count, labels, stats, _ = cv2.connectedComponentsWithStats(ink, connectivity=8)
+    min_area = max(4, (h * w) // 20000)
+    keep = stats[:, cv2.CC_STAT_AREA] >= min_area
+    keep[0] = False  # Background label
+    ink = np.where(keep[labels], 255, 0).astype(np.uint8)
+
+    return cv2.cvtColor(255 - ink, cv2.COLOR_GRAY2RGB)
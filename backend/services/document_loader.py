@@ -0,0 +1,113 @@
+from PIL import Image, ImageSequence
+from io import BytesIO
+import os
+import zipfile
+from typing import Iterator, List, Optional
+
+
+PDF_RENDER_DPI = int(os.getenv("PDF_RENDER_DPI", "200"))
+
+# Zip bomb limits: the upload size only bounds the compressed archive
+ZIP_MAX_MEMBERS = int(os.getenv("ZIP_MAX_MEMBERS", "1000"))
+ZIP_MAX_MEMBER_BYTES = int(os.getenv("ZIP_MAX_MEMBER_BYTES", str(64 * 1024 * 1024)))
+ZIP_MAX_TOTAL_BYTES = int(os.getenv("ZIP_MAX_TOTAL_BYTES", str(256 * 1024 * 1024)))
+ZIP_MAX_DEPTH = int(os.getenv("ZIP_MAX_DEPTH", "2"))
+
+
+class DocumentPage:
+    """One verifiable page extracted from an uploaded document"""
+
+    def __init__(self, document: str, page: int, image_bytes: bytes):
+        self.document = document
+        self.page = page
+        self.image_bytes = image_bytes
+
+
+def _encode_png(image: Image.Image) -> bytes:
+    buffer = BytesIO()
+    image.convert("RGB").save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def _pdf_pages(content: bytes, name: str) -> Iterator[DocumentPage]:
+    try:
+        import fitz  # PyMuPDF
+    except ImportError:
+        raise Exception("PDF support requires PyMuPDF (pip install pymupdf)")
+
+    with fitz.open(stream=content, filetype="pdf") as pdf:
+        for index, page in enumerate(pdf):
+            pixmap = page.get_pixmap(dpi=PDF_RENDER_DPI)
+            yield DocumentPage(name, index + 1, pixmap.tobytes("png"))
+
+
+def _image_pages(content: bytes, name: str) -> Iterator[DocumentPage]:
+    image = Image.open(BytesIO(content))
+    frames = getattr(image, "n_frames", 1)
+    if frames <= 1:
+        # Single-page images are passed through without re-encoding
+        yield DocumentPage(name, 1, content)
+        return
+
+    # Multi-page TIFF (or animated formats): one item per frame
+    for index, frame in enumerate(ImageSequence.Iterator(image)):
+        yield DocumentPage(name, index + 1, _encode_png(frame))
+
+
+class ZipBudget:
+    """Members and decompressed bytes used so far by an archive and every archive nested in it"""
+
+    def __init__(self):
+        self.members = 0
+        self.bytes = 0
+
+    def take(self, info: zipfile.ZipInfo, name: str):
+        self.members += 1
+        if self.members > ZIP_MAX_MEMBERS:
+            raise ValueError(f"{name} holds more than {ZIP_MAX_MEMBERS} files")
+        if info.file_size > ZIP_MAX_MEMBER_BYTES:
+            raise ValueError(f"{name}/{info.filename} decompresses to more than {ZIP_MAX_MEMBER_BYTES} bytes")
+        self.bytes += info.file_size
+        if self.bytes > ZIP_MAX_TOTAL_BYTES:
+            raise ValueError(f"{name} decompresses to more than {ZIP_MAX_TOTAL_BYTES} bytes")
+
+
+def _zip_pages(content: bytes, name: str, budget: ZipBudget, depth: int) -> Iterator[DocumentPage]:
+    if depth > ZIP_MAX_DEPTH:
+        raise ValueError(f"{name} nests zip archives more than {ZIP_MAX_DEPTH} deep")
+    with zipfile.ZipFile(BytesIO(content)) as archive:
+        for info in archive.infolist():
+            if info.is_dir() or info.filename.startswith("__MACOSX/"):
+                continue
+            if os.path.basename(info.filename).startswith("."):
+                continue
+            # Checked against the declared size before reading; zipfile never
+            # returns more than that size (a lying header fails the CRC check)
+            budget.take(info, name)
+            yield from iter_document_pages(archive.read(info), f"{name}/{info.filename}", budget, depth)
+
+
+def iter_document_pages(content: bytes, filename: str, zip_budget: Optional[ZipBudget] = None,
+                        zip_depth: int = 0) -> Iterator[DocumentPage]:
+    """
+    Expand an uploaded document into pages:
+    images yield one page, multi-page TIFFs and PDFs one page per frame,
+    and zip archives the pages of every document they contain, within the
+    ZIP_MAX_* limits on members, decompressed bytes and nesting.
+    """
+    if content[:4] == b"%PDF":
+        yield from _pdf_pages(content, filename)
+    elif content[:4] == b"PK\x03\x04":
+        yield from _zip_pages(content, filename, zip_budget or ZipBudget(), zip_depth + 1)
+    else:
+        yield from _image_pages(content, filename)
+
+
+def load_document_pages(content: bytes, filename: str, max_pages: int) -> List[DocumentPage]:
+    """Expand a document into pages, refusing to go beyond `max_pages`"""
+    pages = []
+    for page in iter_document_pages(content, filename):
+        if len(pages) >= max_pages:
+            raise ValueError(f"{filename} expands to more than {max_pages} pages")
+        pages.append(page)
+    return pages
@@ -0,0 +1,154 @@
+import numpy as np
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+
+CacheKey = Tuple[str, str, str, str]
+
+
+class EmbeddingCache:
+    """
+    Bounded LRU cache for reference signature embeddings.
+
+    Entries are keyed on (profile_id, reference_sig_url, reference_version, model_tag)
+    so a new reference URL, a profile update (updated_at / ETag) or a different model
+    never reuses a stale embedding. An optional on-disk store keeps embeddings across
+    restarts.
+    """
+
+    def __init__(self, max_entries: int = 1024, disk_dir: Optional[str] = None):
+        self.max_entries = max_entries
+        self.disk_dir = disk_dir
+        self._entries: "OrderedDict[CacheKey, np.ndarray]" = OrderedDict()
+        self._keys_by_profile: Dict[str, CacheKey] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+        self.evictions = 0
+
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+
+    @classmethod
+    def from_env(cls) -> "EmbeddingCache":
+        return cls(
+            max_entries=int(os.getenv("EMBEDDING_CACHE_SIZE", "1024")),
+            disk_dir=os.getenv("EMBEDDING_CACHE_DIR") or None,
+        )
+
+    @staticmethod
+    def make_key(profile_id: Optional[str], reference_sig_url: str,
+                 reference_version: Optional[str], model_tag: str) -> CacheKey:
+        # Without a profile id the URL itself identifies the reference
+        return (profile_id or reference_sig_url, reference_sig_url, reference_version or "", model_tag)
+
+    def _disk_path(self, key: CacheKey) -> str:
+        digest = hashlib.sha256("\x1f".join(key).encode("utf-8")).hexdigest()
+        return os.path.join(self.disk_dir, f"{digest}.npy")
+
+    def get(self, key: CacheKey) -> Optional[np.ndarray]:
+        with self._lock:
+            embedding = self._entries.get(key)
+            if embedding is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return embedding
+
+        if self.disk_dir:
+            path = self._disk_path(key)
+            if os.path.exists(path):
+                try:
+                    embedding = np.load(path)
+                except Exception as e:
+                    print(f"Error reading cached embedding {path}: {e}")
+                else:
+                    self._put_memory(key, embedding)
+                    with self._lock:
+                        self.hits += 1
+                        self.disk_hits += 1
+                    return embedding
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key: CacheKey, embedding: np.ndarray):
+        embedding = np.ascontiguousarray(embedding, dtype=np.float32)
+        self._put_memory(key, embedding)
+
+        if self.disk_dir:
+            path = self._disk_path(key)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            try:
+                with open(tmp_path, "wb") as f:
+                    np.save(f, embedding)
+                os.replace(tmp_path, path)
+            except Exception as e:
+                print(f"Error writing cached embedding {path}: {e}")
+
+    def _put_memory(self, key: CacheKey, embedding: np.ndarray):
+        stale_key = None
+        with self._lock:
+            profile_id = key[0]
+            previous = self._keys_by_profile.get(profile_id)
+            if previous is not None and previous != key and previous[3] == key[3]:
+                # The profile's reference changed: drop the old embedding
+                self._entries.pop(previous, None)
+                stale_key = previous
+
+            self._entries[key] = embedding
+            self._entries.move_to_end(key)
+            self._keys_by_profile[profile_id] = key
+
+            while len(self._entries) > self.max_entries:
+                evicted, _ = self._entries.popitem(last=False)
+                if self._keys_by_profile.get(evicted[0]) == evicted:
+                    del self._keys_by_profile[evicted[0]]
+                self.evictions += 1
+
+        if stale_key is not None:
+            self._remove_from_disk(stale_key)
+
+    def invalidate(self, profile_id: str):
+        """Drop every cached embedding for a profile (e.g. after its reference changes)"""
+        with self._lock:
+            stale = [key for key in self._entries if key[0] == profile_id]
+            for key in stale:
+                del self._entries[key]
+            self._keys_by_profile.pop(profile_id, None)
+
+        for key in stale:
+            self._remove_from_disk(key)
+
+    def _remove_from_disk(self, key: CacheKey):
+        if not self.disk_dir:
+            return
+        try:
+            os.remove(self._disk_path(key))
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"Error removing cached embedding: {e}")
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_profile.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "disk_hits": self.disk_hits,
+                "evictions": self.evictions,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+                "disk_store": self.disk_dir,
+            }
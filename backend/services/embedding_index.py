@@ -0,0 +1,393 @@
+import os
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: a single API process, nothing to coordinate
+    fcntl = None
+
+
+class IdentificationUnavailableError(Exception):
+    """1:N identification needs a loaded Siamese model"""
+
+
+class EmbeddingIndex:
+    """
+    Persistent top-k index over reference signature embeddings (one per profile).
+
+    Vectors live in a preallocated float32 matrix; removing a profile frees its
+    slot for the next insert, so slots (and ANN labels) never move. Search is
+    exact squared-L2 over the matrix in one vectorized pass, or an HNSW graph
+    (hnswlib, optional) once the index holds `ann_threshold` profiles.
+    The index is tied to the embedding model that produced it and is reset
+    when the model changes.
+
+    Several processes (serve.py's API workers) share one index file. Each
+    keeps its unsaved changes aside; `save` merges them into whatever is on
+    disk under a file lock, and every process reloads the file (re-applying
+    its own unsaved changes) when another one has saved.
+    """
+
+    def __init__(self, index_dir: Optional[str] = None, ann: str = "auto", ann_threshold: int = 20000):
+        self.index_dir = index_dir
+        self.ann = ann
+        self.ann_threshold = ann_threshold
+        self.model_tag: Optional[str] = None
+        self._lock = threading.RLock()
+        self._vectors = np.zeros((0, 0), dtype=np.float32)
+        self._sq_norms = np.zeros(0, dtype=np.float32)
+        self._alive = np.zeros(0, dtype=bool)
+        self._ids: List[str] = []
+        self._versions: List[str] = []
+        self._slots: Dict[str, int] = {}
+        self._free: List[int] = []
+        self._ann_index = None
+        self._ann_deleted = set()
+        self._ann_unavailable = False
+        # Changes not yet saved (None for a removal), re-applied on top of a reloaded file
+        self._pending: Dict[str, Optional[Tuple[np.ndarray, str]]] = {}
+        # (mtime, size, inode) of the file as last read or written by this process
+        self._stamp: Optional[Tuple[int, int, int]] = None
+        self.dirty = False
+
+        if self.index_dir:
+            os.makedirs(self.index_dir, exist_ok=True)
+            self._load()
+
+    @classmethod
+    def from_env(cls) -> "EmbeddingIndex":
+        return cls(
+            index_dir=os.getenv("EMBEDDING_INDEX_DIR", "index") or None,
+            ann=os.getenv("EMBEDDING_INDEX_ANN", "auto"),
+            ann_threshold=int(os.getenv("EMBEDDING_INDEX_ANN_THRESHOLD", "20000")),
+        )
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    # Persistence
+
+    @property
+    def _path(self) -> str:
+        return os.path.join(self.index_dir, "embeddings.npz")
+
+    def _file_stamp(self) -> Optional[Tuple[int, int, int]]:
+        try:
+            stat = os.stat(self._path)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+    def _read(self) -> Optional[Dict]:
+        try:
+            with np.load(self._path, allow_pickle=False) as data:
+                return {
+                    "model_tag": str(data["model_tag"]),
+                    "alive": data["alive"].astype(bool),
+                    "vectors": np.ascontiguousarray(data["vectors"], dtype=np.float32),
+                    "ids": [str(i) for i in data["ids"]],
+                    "versions": [str(v) for v in data["versions"]],
+                }
+        except Exception as e:
+            print(f"Error loading embedding index {self._path}: {e}")
+            return None
+
+    def _adopt(self, data: Dict):
+        self.model_tag = data["model_tag"]
+        self._vectors = data["vectors"]
+        self._alive = data["alive"]
+        self._ids = data["ids"]
+        self._versions = data["versions"]
+        self._sq_norms = (self._vectors ** 2).sum(axis=1) if len(self._vectors) else np.zeros(0, np.float32)
+        self._slots = {self._ids[slot]: slot for slot in np.flatnonzero(self._alive)}
+        self._free = [int(slot) for slot in np.flatnonzero(~self._alive)]
+        self._ann_index = None
+        self._ann_deleted = set()
+
+    def _load(self):
+        self._stamp = self._file_stamp()
+        if self._stamp is None:
+            return
+        data = self._read()
+        if data is None:
+            print("Starting with an empty embedding index")
+            return
+        self._adopt(data)
+        print(f"Loaded embedding index: {len(self._slots)} profiles")
+
+    def refresh(self) -> bool:
+        """
+        Reload the file if another process saved it since this one last read or
+        wrote it, keeping this process's unsaved changes; returns whether it did
+        """
+        if not self.index_dir:
+            return False
+        with self._lock:
+            stamp = self._file_stamp()
+            if stamp is None or stamp == self._stamp:
+                return False
+            data = self._read()
+            self._stamp = stamp
+            # An index built with another model is never merged into this one
+            if data is None or data["model_tag"] != (self.model_tag or ""):
+                return False
+            self._adopt(data)
+            for profile_id, change in self._pending.items():
+                if change is None:
+                    self._remove(profile_id)
+                else:
+                    self._upsert(profile_id, *change)
+            return True
+
+    @contextmanager
+    def _file_lock(self, name: str, blocking: bool = True) -> Iterator[bool]:
+        """Exclusive lock on `index_dir/name` across processes; yields False if busy and not blocking"""
+        if fcntl is None:
+            yield True
+            return
+        with open(os.path.join(self.index_dir, name), "a") as f:
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def sync_lock(self) -> Iterator[bool]:
+        """Held by the one process syncing the index; yields False while another holds it"""
+        if not self.index_dir:
+            return _held()
+        return self._file_lock("sync.lock", blocking=False)
+
+    def save(self):
+        """
+        Merge this process's changes into the index file and write it atomically
+        (no-op without an index_dir)
+        """
+        if not self.index_dir:
+            return
+        with self._file_lock("save.lock"):
+            with self._lock:
+                # Pick up what other processes saved, so their changes are not overwritten
+                self.refresh()
+                snapshot = dict(
+                    model_tag=np.array(self.model_tag or ""),
+                    vectors=self._vectors.copy(),
+                    alive=self._alive.copy(),
+                    ids=np.array(self._ids, dtype=str),
+                    versions=np.array(self._versions, dtype=str),
+                )
+                pending, self._pending = self._pending, {}
+                self.dirty = False
+            tmp_path = f"{self._path}.{os.getpid()}.tmp"
+            try:
+                with open(tmp_path, "wb") as f:
+                    np.savez(f, **snapshot)
+                os.replace(tmp_path, self._path)
+                with self._lock:
+                    self._stamp = self._file_stamp()
+            except Exception as e:
+                with self._lock:
+                    # Changes made meanwhile are newer than the ones that failed to save
+                    pending.update(self._pending)
+                    self._pending = pending
+                    self.dirty = True
+                print(f"Error saving embedding index {self._path}: {e}")
+
+    # Maintenance
+
+    def ensure_model(self, model_tag: str) -> bool:
+        """
+        Drop every vector if the index was built with a different embedding
+        model (or other weights); returns whether indexed profiles were dropped
+        """
+        with self._lock:
+            if self.model_tag == model_tag:
+                return False
+            dropped = bool(self._slots)
+            if dropped:
+                print(f"Embedding index was built with {self.model_tag}; resetting for {model_tag}")
+            self.model_tag = model_tag
+            self._vectors = np.zeros((0, 0), dtype=np.float32)
+            self._sq_norms = np.zeros(0, dtype=np.float32)
+            self._alive = np.zeros(0, dtype=bool)
+            self._ids, self._versions, self._slots, self._free = [], [], {}, []
+            self._ann_index = None
+            self._ann_deleted = set()
+            self._pending = {}
+            # Re-read the file next time: another process may already have saved it for this model
+            self._stamp = None
+            self.dirty = True
+            return dropped
+
+    def version_of(self, profile_id: str) -> Optional[str]:
+        with self._lock:
+            slot = self._slots.get(profile_id)
+            return self._versions[slot] if slot is not None else None
+
+    def profile_versions(self) -> Dict[str, str]:
+        with self._lock:
+            self.refresh()
+            return {profile_id: self._versions[slot] for profile_id, slot in self._slots.items()}
+
+    def _grow(self, dim: int):
+        capacity = max(1024, 2 * len(self._vectors))
+        vectors = np.zeros((capacity, dim), dtype=np.float32)
+        if len(self._vectors):
+            vectors[:len(self._vectors)] = self._vectors
+        self._free.extend(range(capacity - 1, len(self._vectors) - 1, -1))
+        self._vectors = vectors
+        self._sq_norms = np.concatenate([self._sq_norms, np.zeros(capacity - len(self._sq_norms), np.float32)])
+        self._alive = np.concatenate([self._alive, np.zeros(capacity - len(self._alive), bool)])
+        self._ids.extend([""] * (capacity - len(self._ids)))
+        self._versions.extend([""] * (capacity - len(self._versions)))
+        if self._ann_index is not None:
+            self._ann_index.resize_index(capacity)
+
+    def upsert(self, profile_id: str, embedding: np.ndarray, version: Optional[str] = None):
+        vector = np.asarray(embedding, dtype=np.float32).reshape(-1)
+        with self._lock:
+            self._upsert(profile_id, vector, version or "")
+            self._pending[profile_id] = (vector, version or "")
+            self.dirty = True
+
+    def _upsert(self, profile_id: str, vector: np.ndarray, version: str):
+        with self._lock:
+            if self._vectors.shape[1:] not in ((0,), vector.shape):
+                raise ValueError(f"Embedding has {vector.size} dims, index has {self._vectors.shape[1]}")
+            slot = self._slots.get(profile_id)
+            if slot is None:
+                if not self._free:
+                    self._grow(vector.size)
+                slot = self._free.pop()
+            self._vectors[slot] = vector
+            self._sq_norms[slot] = float(vector @ vector)
+            self._alive[slot] = True
+            self._ids[slot] = profile_id
+            self._versions[slot] = version
+            self._slots[profile_id] = slot
+            if self._ann_index is not None:
+                self._ann_add(slot)
+
+    def remove(self, profile_id: str) -> bool:
+        with self._lock:
+            # The profile may have been indexed by another process
+            self.refresh()
+            if not self._remove(profile_id):
+                return False
+            self._pending[profile_id] = None
+            self.dirty = True
+            return True
+
+    def _remove(self, profile_id: str) -> bool:
+        with self._lock:
+            slot = self._slots.pop(profile_id, None)
+            if slot is None:
+                return False
+            self._alive[slot] = False
+            self._ids[slot] = ""
+            self._versions[slot] = ""
+            self._free.append(slot)
+            if self._ann_index is not None:
+                self._ann_index.mark_deleted(slot)
+                self._ann_deleted.add(slot)
+            return True
+
+    # Search
+
+    def _use_ann(self) -> bool:
+        if self.ann == "off" or self._ann_unavailable:
+            return False
+        if self.ann == "auto" and len(self._slots) < self.ann_threshold:
+            return False
+        try:
+            import hnswlib  # noqa: F401
+        except ImportError:
+            print("Warning: hnswlib not installed; embedding index search stays exact")
+            self._ann_unavailable = True
+            return False
+        return True
+
+    def _ann_add(self, slot: int):
+        # A freed slot is marked deleted in the graph until it is reused
+        if slot in self._ann_deleted:
+            self._ann_index.unmark_deleted(slot)
+            self._ann_deleted.discard(slot)
+        self._ann_index.add_items(self._vectors[slot:slot + 1], np.array([slot]))
+
+    def _build_ann(self):
+        import hnswlib
+
+        index = hnswlib.Index(space="l2", dim=self._vectors.shape[1])
+        index.init_index(max_elements=len(self._vectors), ef_construction=200, M=16)
+        slots = np.flatnonzero(self._alive)
+        index.add_items(self._vectors[slots], slots)
+        self._ann_index = index
+        self._ann_deleted = set()
+
+    def search(self, queries: np.ndarray, k: int = 5,
+               exclude: Iterable[str] = ()) -> List[List[Tuple[str, float]]]:
+        """Top-k (profile_id, L2 distance) for each query row, nearest first"""
+        queries = np.asarray(queries, dtype=np.float32).reshape(len(queries), -1)
+        exclude = set(exclude)
+        with self._lock:
+            self.refresh()
+            available = len(self._slots) - len(exclude & self._slots.keys())
+            k = min(k, available)
+            if k <= 0:
+                return [[] for _ in queries]
+            fetch = min(k + len(exclude), len(self._slots))
+
+            if self._use_ann():
+                if self._ann_index is None:
+                    self._build_ann()
+                self._ann_index.set_ef(max(64, 2 * fetch))
+                slots, sq_dist = self._ann_index.knn_query(queries, k=fetch)
+            else:
+                slots, sq_dist = self._exact(queries, fetch)
+
+            results = []
+            for row_slots, row_dist in zip(slots, sq_dist):
+                matches = [
+                    (self._ids[slot], float(np.sqrt(max(dist, 0.0))))
+                    for slot, dist in zip(row_slots, row_dist)
+                    if self._ids[slot] not in exclude
+                ]
+                results.append(matches[:k])
+            return results
+
+    def _exact(self, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        # ||q - x||^2 = ||q||^2 - 2 q.x + ||x||^2 over every slot at once
+        sq_dist = (queries ** 2).sum(axis=1, keepdims=True) - 2.0 * queries @ self._vectors.T + self._sq_norms
+        sq_dist[:, ~self._alive] = np.inf
+        nearest = np.argpartition(sq_dist, k - 1, axis=1)[:, :k]
+        nearest_dist = np.take_along_axis(sq_dist, nearest, axis=1)
+        order = np.argsort(nearest_dist, axis=1)
+        return np.take_along_axis(nearest, order, axis=1), np.take_along_axis(nearest_dist, order, axis=1)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            self.refresh()
+            return {
+                "profiles": len(self._slots),
+                "capacity": len(self._vectors),
+                "dim": int(self._vectors.shape[1]) if self._vectors.ndim == 2 else 0,
+                "model_tag": self.model_tag,
+                "search": "ann" if self._ann_index is not None else "exact",
+                "ann_threshold": self.ann_threshold,
+                "dirty": self.dirty,
+                "unsaved": len(self._pending),
+                "store": self._path if self.index_dir else None,
+            }
+
+
+@contextmanager
+def _held() -> Iterator[bool]:
+    yield True
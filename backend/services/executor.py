@@ -0,0 +1,165 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Dict, Optional
+
+
+class QueueFullError(Exception):
+    """Raised when a bounded queue is saturated and new work must be rejected"""
+
+    def __init__(self, name: str, retry_after: int = 1):
+        super().__init__(f"{name} queue is full")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class BoundedExecutor:
+    """
+    Thread pool with a bounded number of pending tasks.
+
+    Work is run off the asyncio event loop; once `max_pending` tasks are queued
+    or running, `run` raises QueueFullError instead of letting latency grow
+    without bound.
+    """
+
+    def __init__(self, name: str, max_workers: int, max_pending: int):
+        self.name = name
+        self.max_workers = max(1, max_workers)
+        self.max_pending = max(self.max_workers, max_pending)
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=name)
+        self._lock = threading.Lock()
+        self._pending = 0
+        self.completed = 0
+        self.rejected = 0
+
+    @classmethod
+    def from_env(cls, name: str, default_workers: int, default_pending: int) -> "BoundedExecutor":
+        """Read `{NAME}_WORKERS` and `{NAME}_MAX_PENDING` from the environment"""
+        prefix = name.upper()
+        return cls(
+            name,
+            max_workers=int(os.getenv(f"{prefix}_WORKERS", str(default_workers))),
+            max_pending=int(os.getenv(f"{prefix}_MAX_PENDING", str(default_pending))),
+        )
+
+    async def run(self, fn: Callable, *args, **kwargs) -> Any:
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.rejected += 1
+                raise QueueFullError(self.name)
+            self._pending += 1
+
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._pool, partial(fn, *args, **kwargs))
+        finally:
+            with self._lock:
+                self._pending -= 1
+                self.completed += 1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "workers": self.max_workers,
+                "max_pending": self.max_pending,
+                "pending": self._pending,
+                "completed": self.completed,
+                "rejected": self.rejected,
+            }
+
+    def shutdown(self, wait: bool = True):
+        self._pool.shutdown(wait=wait)
+
+
+class AdmissionGate:
+    """Non-blocking concurrency limit for request handlers"""
+
+    def __init__(self, name: str, limit: int):
+        self.name = name
+        self.limit = max(1, limit)
+        self.in_flight = 0
+        self.rejected = 0
+
+    def __enter__(self):
+        # Only touched from the event loop thread, so no lock is needed
+        if self.in_flight >= self.limit:
+            self.rejected += 1
+            raise QueueFullError(self.name)
+        self.in_flight += 1
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.in_flight -= 1
+        return False
+
+    def stats(self) -> Dict:
+        return {"limit": self.limit, "in_flight": self.in_flight, "rejected": self.rejected}
+
+
+_inference_executor: Optional[BoundedExecutor] = None
+_cpu_executor: Optional[BoundedExecutor] = None
+_io_executor: Optional[BoundedExecutor] = None
+
+
+def get_inference_executor() -> BoundedExecutor:
+    """Dedicated executor for model forward passes"""
+    global _inference_executor
+
+    if _inference_executor is None:
+        from services.replicas import ReplicaExecutor, replica_count
+
+        replicas = replica_count()
+        if replicas > 1:
+            # One lane per model replica, each pinned to its own cores
+            _inference_executor = ReplicaExecutor.from_env("inference", replicas, 64)
+        else:
+            # A single worker keeps forward passes serialized; torch parallelizes within each one
+            _inference_executor = BoundedExecutor.from_env("inference", 1, 64)
+
+    return _inference_executor
+
+
+def get_cpu_executor() -> BoundedExecutor:
+    """Executor for CPU-bound image decoding, encoding and OpenCV work"""
+    global _cpu_executor
+
+    if _cpu_executor is None:
+        _cpu_executor = BoundedExecutor.from_env("cpu", os.cpu_count() or 4, 256)
+
+    return _cpu_executor
+
+
+def get_io_executor() -> BoundedExecutor:
+    """Executor for blocking network calls (supabase-py, requests)"""
+    global _io_executor
+
+    if _io_executor is None:
+        _io_executor = BoundedExecutor.from_env("io", 16, 512)
+
+    return _io_executor
+
+
+def _reset_after_fork():
+    # Pool threads do not survive fork; a forked worker builds its own pools
+    # (and sizes the replica lanes for its own cores) on first use
+    global _inference_executor, _cpu_executor, _io_executor
+    _inference_executor = _cpu_executor = _io_executor = None
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+async def run_blocking(fn: Callable, *args, **kwargs) -> Any:
+    """Run a blocking I/O call on the shared I/O executor"""
+    return await get_io_executor().run(fn, *args, **kwargs)
+
+
+def executor_stats() -> Dict:
+    return {
+        "inference": get_inference_executor().stats(),
+        "cpu": get_cpu_executor().stats(),
+        "io": get_io_executor().stats(),
+    }
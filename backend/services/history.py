@@ -0,0 +1,57 @@
+import base64
+import json
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+
+# Columns of a history row; detections (JSONB) only on request
+HISTORY_COLUMNS = "id,user_id,original_doc_url,cleaned_sig_url,confidence_score,timestamp,status"
+HISTORY_STATUSES = ("success", "failed", "processing")
+
+
+class InvalidCursorError(ValueError):
+    pass
+
+
+def encode_cursor(row: Dict) -> str:
+    """Opaque cursor pointing just past `row` in (timestamp, id) descending order"""
+    raw = json.dumps([row["timestamp"], row["id"]], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, str]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        timestamp, row_id = json.loads(raw)
+        datetime.fromisoformat(timestamp)
+        return str(timestamp), str(row_id)
+    except (ValueError, TypeError) as e:
+        raise InvalidCursorError(f"Invalid cursor: {cursor}") from e
+
+
+def keyset_filter(cursor: str) -> str:
+    """
+    PostgREST `or` filter for the rows after a cursor: older than it, or as
+    old with a smaller id. With the (user_id, timestamp, id) index this is
+    an index range scan, however deep the page.
+    """
+    timestamp, row_id = decode_cursor(cursor)
+    return f'timestamp.lt."{timestamp}",and(timestamp.eq."{timestamp}",id.lt."{row_id}")'
+
+
+def parse_date(value: Optional[str], name: str) -> Optional[str]:
+    """Validate an ISO date/datetime query parameter"""
+    if value is None:
+        return None
+    try:
+        return datetime.fromisoformat(value).isoformat()
+    except ValueError:
+        raise ValueError(f"{name} must be an ISO date or datetime, got {value}")
+
+
+def split_page(rows: List[Dict], limit: int) -> Tuple[List[Dict], Optional[str]]:
+    """Rows were fetched with limit + 1; the extra row only says there is a next page"""
+    if len(rows) <= limit:
+        return rows, None
+    page = rows[:limit]
+    return page, encode_cursor(page[-1])
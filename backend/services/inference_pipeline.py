@@ -1,23 +1,47 @@
+import asyncio
+import copy
+import hashlib
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
 import numpy as np
 from PIL import Image
-import cv2
 from io import BytesIO
-from typing import Dict, Optional, Tuple
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
 import torch
 import torch.nn as nn
+from torchvision.ops import nms
 from ultralytics import YOLO
 import os
 from services.storage_service import StorageService
+from services.embedding_cache import EmbeddingCache
+from services.result_cache import ResultCache
+from services.embedding_index import EmbeddingIndex, IdentificationUnavailableError
+from services.references import SUPPORTED_AGGREGATIONS, decode_embedding, reference_set
+from services.batching import MicroBatcher
+from services.executor import QueueFullError, get_cpu_executor, get_inference_executor
+from services.model_backends import SUPPORTED_BACKENDS, exported_model_path, load_exported_model
+from services import metrics
+from services import precision as precision_modes
+from services.process_info import memory_usage, process_uptime
+from services.ingest import INGEST_MAX_SIDE, DecodedPage, ImageSource, decode_page
+from services.tiling import DETECTION_MODES, Window, merge_tile_detections, tile_windows
+from services.cleaning import CLEANING_MODES, clean_classical, crop_stats, is_clean
+from services import cleaning as cleaning_config
+from services.replicas import current_replica
+from services.calibration import get_calibration
+from services.cascade import CASCADE_MODES, CascadeStats
 
 
 class SiameseNetwork(nn.Module):
     """Siamese Network for signature verification using VGG16 backbone"""
     
-    def __init__(self):
+    def __init__(self, pretrained: bool = True):
         super(SiameseNetwork, self).__init__()
-        # Use VGG16 as backbone
+        # Use VGG16 as backbone; ImageNet weights are only needed without a trained checkpoint
         from torchvision.models import vgg16
-        vgg = vgg16(pretrained=True)
+        vgg = vgg16(weights="IMAGENET1K_V1" if pretrained else None)
         # Remove the classifier
         self.features = nn.Sequential(*list(vgg.features.children())[:-1])
         # Add custom layers
@@ -41,6 +65,20 @@ class SiameseNetwork(nn.Module):
         return output1, output2
 
 
+class SiameseEmbedding(nn.Module):
+    """`SiameseNetwork.forward_one` as a single-input module, for export and quantization"""
+    
+    def __init__(self, siamese: nn.Module):
+        super(SiameseEmbedding, self).__init__()
+        self.siamese = siamese
+    
+    def forward(self, x):
+        return self.siamese.forward_one(x)
+    
+    def forward_one(self, x):
+        return self.forward(x)
+
+
 class CycleGANGenerator(nn.Module):
     """Simplified CycleGAN generator for signature cleaning"""
     
@@ -92,46 +130,385 @@ class CycleGANGenerator(nn.Module):
         return self.model(x)
 
 
+def load_weights(path: str) -> Dict[str, torch.Tensor]:
+    """
+    Load a state dict from .safetensors or a torch checkpoint. Both are
+    memory-mapped (unless MODEL_WEIGHTS_MMAP=0), so workers on one host share
+    the page-cache copy of the weights instead of each holding its own.
+    """
+    mmap = os.getenv("MODEL_WEIGHTS_MMAP", "1") != "0"
+    if path.endswith(".safetensors"):
+        from safetensors.torch import load_file
+        state = load_file(path, device="cpu")
+        return state if mmap else {name: tensor.clone() for name, tensor in state.items()}
+    return torch.load(path, map_location="cpu", mmap=mmap, weights_only=True)
+
+
+def _load_module(build, path: Optional[str], device: torch.device, label: str) -> nn.Module:
+    if not path or not os.path.exists(path):
+        print(f"Warning: {label} model not found. Using placeholder.")
+        return build(False).to(device)
+    # Build on the meta device so no random init is computed, then adopt the
+    # mapped tensors as the parameters (no copy on CPU)
+    with torch.device("meta"):
+        model = build(True)
+    model.load_state_dict(load_weights(path), assign=True)
+    print(f"Loaded {label} model: {path}")
+    return model.to(device)
+
+
+def load_cyclegan_generator(device: torch.device) -> CycleGANGenerator:
+    """Initialize CycleGAN generator (will need trained weights)"""
+    model = _load_module(lambda _: CycleGANGenerator(), os.getenv("CYCLEGAN_MODEL_PATH"), device, "CycleGAN")
+    return model.eval()
+
+
+def load_siamese_network(device: torch.device) -> SiameseNetwork:
+    """Initialize Siamese Network (will need trained weights)"""
+    # With a trained checkpoint the ImageNet backbone would be overwritten, so don't download it
+    model = _load_module(
+        lambda has_weights: SiameseNetwork(pretrained=not has_weights),
+        os.getenv("SIAMESE_MODEL_PATH"), device, "Siamese"
+    )
+    # Cached reference embeddings must be deterministic (no dropout)
+    return model.eval()
+
+
+def weights_digest(paths: List[str]) -> str:
+    """Short content hash of weight files"""
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+    return digest.hexdigest()[:12]
+
+
+# ImageNet normalization, (x / 255 - mean) / std, folded into one scale and shift per channel
+_IMAGENET_MEAN = np.array([0.485, 0.456, 0.406], dtype=np.float32)
+_IMAGENET_STD = np.array([0.229, 0.224, 0.225], dtype=np.float32)
+_SIAMESE_SCALE = torch.from_numpy(1.0 / (255.0 * _IMAGENET_STD)).view(1, 3, 1, 1)
+_SIAMESE_SHIFT = torch.from_numpy(_IMAGENET_MEAN / _IMAGENET_STD).view(1, 3, 1, 1)
+
+
+def _stack_resized(images: List[Image.Image], size: Tuple[int, int]) -> torch.Tensor:
+    """Resize every image straight into one preallocated uint8 batch, returned as an NCHW view"""
+    batch = np.empty((len(images), size[1], size[0], 3), dtype=np.uint8)
+    for i, image in enumerate(images):
+        batch[i] = np.asarray(image.resize(size))
+    return torch.from_numpy(batch).permute(0, 3, 1, 2)
+
+
+def preprocess_cyclegan(images: List[Image.Image]) -> torch.Tensor:
+    """Resize to the CycleGAN input size and normalize to [-1, 1]"""
+    return _stack_resized(images, (256, 256)).float().div_(127.5).sub_(1.0)
+
+
+def postprocess_cyclegan(output: torch.Tensor, images: List[Image.Image]) -> List[Image.Image]:
+    """Denormalize CycleGAN output and resize each image back to its crop's size"""
+    output = (output.detach().float() + 1).mul_(127.5).clamp_(0, 255).to(torch.uint8)
+    output = output.permute(0, 2, 3, 1).cpu().numpy()
+    # Resize back to original size
+    return [Image.fromarray(out).resize(image.size) for out, image in zip(output, images)]
+
+
+def preprocess_siamese(images: List[Image.Image], size: Tuple[int, int] = (224, 224)) -> torch.Tensor:
+    """Resize and normalize a batch of images for the Siamese Network"""
+    return _stack_resized(images, size).float().mul_(_SIAMESE_SCALE).sub_(_SIAMESE_SHIFT)
+
+
+# Models loaded once in a parent process (see preload_models), adopted by pipelines created after fork
+_preloaded: Optional["InferencePipeline"] = None
+
+
+def preload_models() -> "InferencePipeline":
+    """
+    Load the models in this process, without running them, so that worker
+    processes forked afterwards start with them already in memory (shared
+    copy-on-write) instead of each loading its own.
+    """
+    global _preloaded
+
+    if _preloaded is None:
+        pipeline = InferencePipeline()
+        pipeline._load_models()
+        _preloaded = pipeline
+    return _preloaded
+
+
 class InferencePipeline:
-    def __init__(self):
+    def __init__(self, storage_service: Optional[StorageService] = None):
         self.yolo_model = None
+        # One YOLO per inference replica; CycleGAN and Siamese weights are shared read-only
+        self.yolo_replicas: List = []
         self.cyclegan_model = None
         self.siamese_model = None
-        self.storage_service = StorageService()
+        # Identifies the Siamese weights in embedding tags (see embedding_model_tag)
+        self.siamese_weights = ""
+        # Share the app's pooled client rather than opening a second one
+        self.storage_service = storage_service or StorageService()
+        self.embedding_cache = EmbeddingCache.from_env()
+        self.result_cache = ResultCache.from_env()
+        self.embedding_index = EmbeddingIndex.from_env()
+        # Set when loading the models dropped a persisted index built with other weights
+        self.index_reset = False
+        # Awaited as on_reference_embedded(reference, embedding, tag) when a stored reference
+        # embedding was missing or from other weights and has been recomputed
+        self.on_reference_embedded: Optional[Callable[[Dict, np.ndarray, str], Awaitable[None]]] = None
         self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-        self._load_models()
+        self.detection_conf = float(os.getenv("DETECTION_CONF", "0.25"))
+        self.detection_iou = float(os.getenv("DETECTION_IOU", "0.5"))
+        self.max_detections = int(os.getenv("MAX_DETECTIONS", "10"))
+        # "tiled" runs YOLO over overlapping windows of the page at 1:1 scale instead
+        # of one downscaled frame; "adaptive" tiles only pages above DETECTION_TILE_ABOVE
+        self.detection_mode = os.getenv("DETECTION_MODE", "adaptive")
+        if self.detection_mode not in DETECTION_MODES:
+            raise ValueError(f"DETECTION_MODE must be one of {DETECTION_MODES}, got {self.detection_mode}")
+        self.detection_tile_size = int(os.getenv("DETECTION_TILE_SIZE", "640"))
+        self.detection_tile_overlap = float(os.getenv("DETECTION_TILE_OVERLAP", "0.2"))
+        self.detection_tile_above = int(os.getenv("DETECTION_TILE_ABOVE", "3000"))
+        self.detection_tile_contain = float(os.getenv("DETECTION_TILE_CONTAIN", "0.7"))
+        self.detection_tile_batch = int(os.getenv("DETECTION_TILE_BATCH", "16"))
+        # "auto" sends crops that look clean already to the OpenCV path and the rest to CycleGAN
+        self.cleaning_mode = os.getenv("CLEANING_MODE", "auto")
+        if self.cleaning_mode not in CLEANING_MODES:
+            raise ValueError(f"CLEANING_MODE must be one of {CLEANING_MODES}, got {self.cleaning_mode}")
+        self.ingest_max_side = INGEST_MAX_SIDE
+        self.full_resolution_artifacts = os.getenv("ARTIFACT_FULL_RESOLUTION", "1") == "1"
+        self.reference_aggregation = os.getenv("REFERENCE_AGGREGATION", "max")
+        if self.reference_aggregation not in SUPPORTED_AGGREGATIONS:
+            raise ValueError(
+                f"REFERENCE_AGGREGATION must be one of {SUPPORTED_AGGREGATIONS}, got {self.reference_aggregation}"
+            )
+        self.backend = os.getenv("INFERENCE_BACKEND", "torch")
+        self.export_dir = os.getenv("MODEL_EXPORT_DIR", "models/exported")
+        if self.backend not in SUPPORTED_BACKENDS:
+            raise ValueError(f"INFERENCE_BACKEND must be one of {SUPPORTED_BACKENDS}, got {self.backend}")
+        self.precision = os.getenv("INFERENCE_PRECISION", "fp32")
+        if self.precision not in precision_modes.SUPPORTED_PRECISIONS:
+            raise ValueError(
+                f"INFERENCE_PRECISION must be one of {precision_modes.SUPPORTED_PRECISIONS}, got {self.precision}"
+            )
+        if self.precision != "fp32" and self.backend != "torch":
+            print(f"Warning: INFERENCE_PRECISION={self.precision} only applies to the torch backend; using fp32")
+            self.precision = "fp32"
+        # "full" ends pages without a detection early and screens crops with a cheap
+        # low-resolution embedding, running the full Siamese only on borderline scores
+        self.cascade_mode = os.getenv("CASCADE_MODE", "full")
+        if self.cascade_mode not in CASCADE_MODES:
+            raise ValueError(f"CASCADE_MODE must be one of {CASCADE_MODES}, got {self.cascade_mode}")
+        self.cascade_fast_size = int(os.getenv("CASCADE_FAST_SIZE", "112"))
+        self.calibration = get_calibration()
+        self.cascade_stats = CascadeStats()
+        
+        # Models load in the background (start_loading) or on first use (ensure_loaded),
+        # so constructing the pipeline is cheap and the app can start serving /health
+        self.load_report: Dict = {}
+        self.model_version: Optional[str] = None
+        self._created_at = time.perf_counter()
+        self._load_future: Optional[Future] = None
+        self._load_lock = threading.Lock()
+        
+        # Forward passes run on the dedicated inference executor, image
+        # decoding/encoding on the CPU pool, so the event loop stays free
+        self.inference_executor = get_inference_executor()
+        self.cpu_executor = get_cpu_executor()
+        
+        # Micro-batchers coalesce concurrent requests into one forward pass per stage
+        # With several replicas each stage keeps one batch in flight per replica
+        replicas = getattr(self.inference_executor, "replicas", 1)
+        self.detect_batcher = MicroBatcher.from_env(
+            "yolo", self._detect_batch, executor=self.inference_executor, default_concurrent_batches=replicas
+        )
+        self.clean_batcher = MicroBatcher.from_env(
+            "cyclegan", self._clean_batch, executor=self.inference_executor, default_concurrent_batches=replicas
+        )
+        self.embed_batcher = MicroBatcher.from_env(
+            "siamese", self._embed_batch, executor=self.inference_executor, default_concurrent_batches=replicas
+        )
+        self.fast_embed_batcher = MicroBatcher.from_env(
+            "siamese_fast", self._embed_fast_batch, executor=self.inference_executor,
+            default_concurrent_batches=replicas
+        )
+        
+        if _preloaded is not None:
+            self._adopt_models(_preloaded)
+    
+    def _adopt_models(self, loaded: "InferencePipeline"):
+        """Take over the models of a pipeline loaded before fork; nothing is loaded again"""
+        for name in ("yolo_model", "cyclegan_model", "siamese_model", "siamese_weights", "device", "precision"):
+            setattr(self, name, getattr(loaded, name))
+        self.yolo_replicas = list(loaded.yolo_replicas)
+        self._replicate_detector()
+        self.load_report = {**loaded.load_report, "preloaded": True}
+        self.model_version = loaded.model_version
+        if self.siamese_model is not None:
+            self.index_reset = self.embedding_index.ensure_model(self.embedding_model_tag())
+        self._load_future = Future()
+        self._load_future.set_result(None)
+    
+    def start_loading(self) -> Future:
+        """Start loading the models on a background thread (idempotent)"""
+        with self._load_lock:
+            if self._load_future is None:
+                loader = ThreadPoolExecutor(max_workers=1, thread_name_prefix="model-loader")
+                self._load_future = loader.submit(self._load_models)
+                loader.shutdown(wait=False)
+        return self._load_future
+    
+    async def ensure_loaded(self):
+        """Wait for the models, starting the load if nothing has yet"""
+        future = self.start_loading()
+        if not future.done():
+            await asyncio.wrap_future(future)
+    
+    @property
+    def ready(self) -> bool:
+        return self._load_future is not None and self._load_future.done()
+    
+    def load_status(self) -> Dict:
+        return {
+            "loading": self._load_future is not None and not self._load_future.done(),
+            "ready": self.ready,
+            "backend": self.backend,
+            "precision": self.precision,
+            **self.load_report,
+        }
     
     def _load_models(self):
         """Load all AI models"""
+        started = time.perf_counter()
+        self.load_report = {"models": {}, "errors": {}}
         try:
-            # Load YOLOv11 model for signature detection
-            model_path = os.getenv("YOLO_MODEL_PATH", "yolov11n.pt")
-            self.yolo_model = YOLO(model_path)
-            print(f"Loaded YOLO model: {model_path}")
-            
-            # Initialize CycleGAN generator (will need trained weights)
-            self.cyclegan_model = CycleGANGenerator().to(self.device)
-            cyclegan_path = os.getenv("CYCLEGAN_MODEL_PATH")
-            if cyclegan_path and os.path.exists(cyclegan_path):
-                self.cyclegan_model.load_state_dict(torch.load(cyclegan_path, map_location=self.device))
-                self.cyclegan_model.eval()
-                print(f"Loaded CycleGAN model: {cyclegan_path}")
+            if self.backend == "torch":
+                self._load_eager_models()
             else:
-                print("Warning: CycleGAN model not found. Using placeholder.")
-            
-            # Initialize Siamese Network (will need trained weights)
-            self.siamese_model = SiameseNetwork().to(self.device)
-            siamese_path = os.getenv("SIAMESE_MODEL_PATH")
-            if siamese_path and os.path.exists(siamese_path):
-                self.siamese_model.load_state_dict(torch.load(siamese_path, map_location=self.device))
-                self.siamese_model.eval()
-                print(f"Loaded Siamese model: {siamese_path}")
-            else:
-                print("Warning: Siamese model not found. Using placeholder.")
+                self._load_exported_models()
                 
         except Exception as e:
             print(f"Error loading models: {e}")
             print("Continuing with placeholder models...")
+            self.load_report["errors"]["pipeline"] = str(e)
+        
+        self._replicate_detector()
+        if self.siamese_model is not None:
+            self.siamese_weights = self._siamese_weights_id()
+        self.load_report["load_seconds"] = round(time.perf_counter() - started, 2)
+        self.load_report["cold_start_seconds"] = round(time.perf_counter() - self._created_at, 2)
+        self.load_report["process_uptime_seconds"] = process_uptime()
+        self.load_report["memory"] = memory_usage()
+        self.model_version = self._fingerprint_models()
+        if self.siamese_model is not None:
+            self.index_reset = self.embedding_index.ensure_model(self.embedding_model_tag())
+        self.load_report["model_version"] = self.model_version
+        print(
+            f"Models ready in {self.load_report['load_seconds']}s "
+            f"(RSS {self.load_report['memory'].get('rss_mb', '?')} MiB)"
+        )
+    
+    def _replicate_detector(self):
+        """YOLO keeps per-call predictor state, so each inference replica gets its own copy"""
+        replicas = getattr(self.inference_executor, "replicas", 1)
+        if self.yolo_model is None or replicas <= 1:
+            return
+        existing = self.yolo_replicas or [self.yolo_model]
+        self.yolo_replicas = existing[:replicas] + [
+            copy.deepcopy(self.yolo_model) for _ in range(replicas - len(existing))
+        ]
+        self.load_report["replicas"] = replicas
+    
+    def _detector(self):
+        replica = current_replica()
+        if replica is None or replica >= len(self.yolo_replicas):
+            return self.yolo_model
+        return self.yolo_replicas[replica]
+    
+    def _load_parallel(self, loaders: Dict):
+        """Run independent model loaders concurrently; a failed one leaves its placeholder"""
+        def timed(loader):
+            started = time.perf_counter()
+            model = loader()
+            return model, round(time.perf_counter() - started, 2)
+        
+        with ThreadPoolExecutor(max_workers=len(loaders), thread_name_prefix="model-loader") as pool:
+            futures = {name: pool.submit(timed, loader) for name, loader in loaders.items()}
+            for name, future in futures.items():
+                try:
+                    model, seconds = future.result()
+                except Exception as e:
+                    print(f"Error loading {name} model: {e}")
+                    self.load_report["errors"][name] = str(e)
+                    continue
+                setattr(self, f"{name}_model", model)
+                self.load_report["models"][name] = seconds
+    
+    def _load_exported_models(self):
+        """Load ONNX / TorchScript graphs produced by scripts/export_models.py"""
+        def load_yolo():
+            yolo_path = exported_model_path(self.export_dir, "yolo", self.backend)
+            if not os.path.exists(yolo_path):
+                raise FileNotFoundError(f"{yolo_path} not found; run scripts/export_models.py first")
+            model = YOLO(yolo_path, task="detect")
+            print(f"Loaded YOLO model: {yolo_path}")
+            return model
+        
+        def load_graph(name):
+            model = load_exported_model(self.export_dir, name, self.backend, self.device)
+            if model is None:
+                raise FileNotFoundError(
+                    f"{exported_model_path(self.export_dir, name, self.backend)} not found; "
+                    "run scripts/export_models.py first"
+                )
+            print(f"Loaded {self.backend} model: {model.name}")
+            return model
+        
+        self._load_parallel({
+            "yolo": load_yolo,
+            "cyclegan": lambda: load_graph("cyclegan"),
+            "siamese": lambda: load_graph("siamese"),
+        })
+    
+    def _load_eager_models(self):
+        """Load the eager PyTorch models"""
+        def load_yolo():
+            # Load YOLOv11 model for signature detection
+            model_path = os.getenv("YOLO_MODEL_PATH", "yolov11n.pt")
+            model = YOLO(model_path)
+            print(f"Loaded YOLO model: {model_path}")
+            return model
+        
+        self._load_parallel({
+            "yolo": load_yolo,
+            "cyclegan": lambda: load_cyclegan_generator(self.device),
+            "siamese": lambda: load_siamese_network(self.device),
+        })
+        self._apply_precision()
+    
+    def _apply_precision(self):
+        """Swap the eager CycleGAN/Siamese models for their reduced-precision variants"""
+        if self.precision.startswith("int8"):
+            # Quantized kernels are CPU only
+            self.device = torch.device("cpu")
+            if self.cyclegan_model is not None:
+                self.cyclegan_model = self.cyclegan_model.cpu()
+            if self.siamese_model is not None:
+                self.siamese_model = self.siamese_model.cpu()
+        
+        if self.precision == "int8_dynamic":
+            # The Siamese head's Linear layers hold most of its weights; CycleGAN has none
+            self.siamese_model = precision_modes.quantize_dynamic_linear(self.siamese_model)
+            print("Quantized Siamese Linear layers to dynamic INT8")
+        elif self.precision == "int8_static":
+            for name in ("cyclegan", "siamese"):
+                model = precision_modes.load_static_int8(self.export_dir, name)
+                if model is None:
+                    print(
+                        f"Warning: {precision_modes.static_int8_path(self.export_dir, name)} not found; "
+                        f"run scripts/calibrate_int8.py. Using fp32 {name}."
+                    )
+                    continue
+                setattr(self, f"{name}_model", model)
+                print(f"Loaded static INT8 model: {model.name}")
     
     def _bytes_to_image(self, image_bytes: bytes) -> Image.Image:
         """Convert bytes to PIL Image"""
@@ -143,162 +520,695 @@ class InferencePipeline:
         image.save(buffer, format=format)
         return buffer.getvalue()
     
-    async def _detect_signature(self, image_bytes: bytes) -> Tuple[Optional[Image.Image], Optional[Dict]]:
+    def _filter_boxes(self, boxes) -> List[Tuple[Tuple[int, int, int, int], float]]:
+        """Confidence filter and class-agnostic NMS on the box tensors, best first"""
+        if boxes is None or len(boxes) == 0:
+            return []
+        
+        xyxy = boxes.xyxy.float()
+        conf = boxes.conf.float()
+        keep = conf >= self.detection_conf
+        xyxy, conf = xyxy[keep], conf[keep]
+        
+        # nms returns the kept indices sorted by decreasing confidence
+        keep = nms(xyxy, conf, self.detection_iou)[:self.max_detections]
+        xyxy = xyxy[keep].round().int().cpu().numpy()
+        conf = conf[keep].cpu().numpy()
+        return [(tuple(int(v) for v in box), float(c)) for box, c in zip(xyxy, conf)]
+    
+    def _detect_batch(
+        self, pages: List[List[np.ndarray]]
+    ) -> List[List[List[Tuple[Tuple[int, int, int, int], float]]]]:
         """
-        Step A: Detect signature using YOLOv11
-        Returns: (cropped_signature_image, detection_info)
+        Run YOLO over the windows of a batch of pages (one window per page in
+        full-frame mode) and return every (bbox, confidence) per window.
+        All windows go through YOLO together, DETECTION_TILE_BATCH at a time.
+        """
+        windows = [window for page in pages for window in page]
+        detections = []
+        chunk = max(1, self.detection_tile_batch)
+        for start in range(0, len(windows), chunk):
+            results = self._detector()(windows[start:start + chunk], conf=self.detection_conf, verbose=False)
+            detections.extend(self._filter_boxes(result.boxes) for result in results)
+        
+        per_page, offset = [], 0
+        for page in pages:
+            per_page.append(detections[offset:offset + len(page)])
+            offset += len(page)
+        return per_page
+    
+    def _detection_windows(self, page: DecodedPage) -> List[Window]:
+        """Windows of the working buffer YOLO runs on: the whole frame, or overlapping tiles"""
+        height, width = page.pixels.shape[:2]
+        tiled = self.detection_mode == "tiled" or (
+            self.detection_mode == "adaptive" and max(page.full_size) > self.detection_tile_above
+        )
+        if not tiled or max(width, height) <= self.detection_tile_size:
+            return [(0, 0, width, height)]
+        return tile_windows(width, height, self.detection_tile_size, self.detection_tile_overlap)
+    
+    async def _detect_signature(
+        self, page: DecodedPage, fallbacks: Optional[List[str]] = None, allow_empty: bool = False
+    ) -> Tuple[List[Image.Image], List[Dict]]:
+        """
+        Step A: Detect signatures using YOLOv11
+        Returns: (cropped_signature_images, detection_infos), one entry per box, best first
+        Boxes are in full-resolution page coordinates; crops come from the working buffer.
+        With nothing detected this is a center crop, or nothing at all if `allow_empty`.
+        Appends "detect" to `fallbacks` if detection failed.
         """
         try:
-            image = self._bytes_to_image(image_bytes)
-            image_np = np.array(image)
-            
-            # Run YOLO detection
-            results = self.yolo_model(image_np, conf=0.25)
-            
-            # Find signature bounding box (assuming class 0 or highest confidence)
-            best_box = None
-            best_conf = 0
-            
-            for result in results:
-                boxes = result.boxes
-                if boxes is not None and len(boxes) > 0:
-                    for box in boxes:
-                        conf = float(box.conf[0])
-                        if conf > best_conf:
-                            best_conf = conf
-                            x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
-                            best_box = (int(x1), int(y1), int(x2), int(y2))
+            # Run YOLO detection (batched with concurrent requests). YOLO letterboxes
+            # to its own input size, so the working-resolution buffer loses nothing.
+            # Large pages are cut into overlapping windows (views, not copies) so
+            # small signatures are not lost to that downscale
+            windows = self._detection_windows(page)
+            per_window = await self.detect_batcher.submit(
+                [page.pixels[y:y + h, x:x + w] for x, y, w, h in windows]
+            )
+            if len(windows) == 1:
+                metrics.DETECTION_MODE.labels("full").inc()
+                detections = per_window[0]
+            else:
+                metrics.DETECTION_MODE.labels("tiled").inc()
+                detections = merge_tile_detections(
+                    per_window, windows, self.detection_iou, self.detection_tile_contain, self.max_detections
+                )
+            detections = [(page.to_full(bbox), conf) for bbox, conf in detections]
             
-            if best_box is None:
+            if not detections and allow_empty:
+                return [], []
+            if not detections:
                 # Fallback: use center crop if no detection
-                w, h = image.size
+                metrics.record_fallback(metrics.DETECT_CENTER_CROP)
+                w, h = page.full_size
                 margin = min(w, h) // 4
-                best_box = (margin, margin, w - margin, h - margin)
+                detections = [((margin, margin, w - margin, h - margin), 0.0)]
             
-            # Crop signature
-            x1, y1, x2, y2 = best_box
-            cropped = image.crop((x1, y1, x2, y2))
+            # Crop signatures
+            crops = await self.cpu_executor.run(
+                lambda: [page.crop(bbox) for bbox, _ in detections]
+            )
             
-            detection_info = {
-                "bbox": best_box,
-                "confidence": best_conf
-            }
+            detection_infos = [
+                {"bbox": bbox, "confidence": conf}
+                for bbox, conf in detections
+            ]
             
-            return cropped, detection_info
+            return crops, detection_infos
             
+        except QueueFullError:
+            raise
         except Exception as e:
             print(f"Error in signature detection: {e}")
+            metrics.record_fallback(metrics.DETECT_ERROR)
+            if fallbacks is not None:
+                fallbacks.append("detect")
             # Fallback: return original image
-            return self._bytes_to_image(image_bytes), None
+            return [page.image()], [{"bbox": None, "confidence": 0.0}]
+    
+    def _clean_batch(self, images: List[Image.Image]) -> List[Image.Image]:
+        """Run a batch of signature crops through the CycleGAN generator"""
+        if self.cyclegan_model is None:
+            # Placeholder: the classical OpenCV cleaner
+            metrics.record_fallback(metrics.CLEAN_PLACEHOLDER, len(images))
+            return [Image.fromarray(clean_classical(np.asarray(image))) for image in images]
+        
+        # Resize to model input size
+        batch_tensor = preprocess_cyclegan(images).to(self.device)
+        
+        with torch.no_grad(), precision_modes.autocast(self.precision, self.device):
+            output = self.cyclegan_model(batch_tensor)
+        
+        return postprocess_cyclegan(output, images)
     
-    async def _clean_signature(self, signature_image: Image.Image) -> Image.Image:
+    def _route_clean(self, signature_image: Image.Image, mode: str) -> Tuple[Optional[Image.Image], str]:
+        """
+        Clean a crop on the classical path if `mode` (or, for "auto", the crop's
+        statistics) calls for it; otherwise return None to send it to CycleGAN.
         """
-        Step B: Clean signature using CycleGAN
+        pixels = np.asarray(signature_image)
+        if mode == "auto":
+            mode = "classical" if self.cyclegan_model is None or is_clean(crop_stats(pixels)) else "gan"
+        if mode == "classical":
+            return Image.fromarray(clean_classical(pixels)), "classical"
+        return None, "gan"
+    
+    async def _clean_signature(
+        self, signature_image: Image.Image, fallbacks: Optional[List[str]] = None,
+        cleaning: Optional[str] = None
+    ) -> Tuple[Image.Image, Dict]:
+        """
+        Step B: Clean signature using CycleGAN, or the classical OpenCV path
         Removes background artifacts, stamps, lines, etc.
+        Returns the cleaned crop and the path taken with its time.
         """
+        mode = cleaning or self.cleaning_mode
+        started = time.perf_counter()
         try:
-            if self.cyclegan_model is None:
-                # Placeholder: convert to grayscale and enhance contrast
-                img = np.array(signature_image)
-                gray = cv2.cvtColor(img, cv2.COLOR_RGB2GRAY)
-                # Apply thresholding
-                _, thresh = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-                # Convert back to RGB
-                cleaned = cv2.cvtColor(thresh, cv2.COLOR_GRAY2RGB)
-                return Image.fromarray(cleaned)
-            
-            # Resize to model input size
-            input_size = (256, 256)
-            img_resized = signature_image.resize(input_size)
-            img_tensor = torch.from_numpy(np.array(img_resized)).float()
-            img_tensor = img_tensor.permute(2, 0, 1).unsqueeze(0) / 255.0
-            img_tensor = (img_tensor - 0.5) / 0.5  # Normalize to [-1, 1]
-            img_tensor = img_tensor.to(self.device)
-            
-            with torch.no_grad():
-                output = self.cyclegan_model(img_tensor)
-                output = (output + 1) / 2  # Denormalize
-                output = output.squeeze(0).permute(1, 2, 0).cpu().numpy()
-                output = np.clip(output * 255, 0, 255).astype(np.uint8)
-                cleaned = Image.fromarray(output)
-                # Resize back to original size
-                cleaned = cleaned.resize(signature_image.size)
-            
-            return cleaned
+            cleaned, path = None, mode
+            if mode != "gan":
+                cleaned, path = await self.cpu_executor.run(self._route_clean, signature_image, mode)
+            if cleaned is None:
+                path = "gan" if self.cyclegan_model is not None else "placeholder"
+                cleaned = await self.clean_batcher.submit(signature_image)
             
+        except QueueFullError:
+            raise
         except Exception as e:
             print(f"Error in signature cleaning: {e}")
-            return signature_image
+            metrics.record_fallback(metrics.CLEAN_ERROR)
+            if fallbacks is not None:
+                fallbacks.append("clean")
+            cleaned, path = signature_image, "none"
+        
+        seconds = time.perf_counter() - started
+        metrics.CLEANING_PATH.labels(path).inc()
+        metrics.observe_stage(f"clean_{path}", seconds)
+        return cleaned, {"path": path, "ms": round(seconds * 1000, 2)}
+    
+    async def _clean_signatures(
+        self, signature_images: List[Image.Image], fallbacks: Optional[List[str]] = None,
+        cleaning: Optional[str] = None
+    ) -> Tuple[List[Image.Image], List[Dict]]:
+        """Clean several crops; concurrent submissions share one CycleGAN batch"""
+        results = await asyncio.gather(*(
+            self._clean_signature(img, fallbacks, cleaning) for img in signature_images
+        ))
+        return [cleaned for cleaned, _ in results], [info for _, info in results]
+    
+    def _embed_batch(self, images: List[Image.Image]) -> List[np.ndarray]:
+        """
+        Compute comparison embeddings for a batch of signature images.
+        With the Siamese model these are the 256-d forward_one outputs; the
+        placeholder uses the resized pixel arrays instead.
+        """
+        if self.siamese_model is None:
+            return [np.array(img.resize((224, 224))).astype(np.float32) for img in images]
+        
+        with torch.no_grad(), precision_modes.autocast(self.precision, self.device):
+            embeddings = self.siamese_model.forward_one(preprocess_siamese(images).to(self.device))
+        return list(embeddings.float().cpu().numpy())
+    
+    async def _embed(self, img: Image.Image) -> np.ndarray:
+        return await self.embed_batcher.submit(img)
+    
+    def _embed_fast_batch(self, images: List[Image.Image]) -> List[np.ndarray]:
+        """Embeddings of the cascade's first stage: the Siamese model at CASCADE_FAST_SIZE"""
+        size = (self.cascade_fast_size, self.cascade_fast_size)
+        with torch.no_grad(), precision_modes.autocast(self.precision, self.device):
+            embeddings = self.siamese_model.forward_one(preprocess_siamese(images, size).to(self.device))
+        return list(embeddings.float().cpu().numpy())
+    
+    async def _embed_fast(self, img: Image.Image) -> np.ndarray:
+        return await self.fast_embed_batcher.submit(img)
+    
+    @property
+    def cascade_screens(self) -> bool:
+        """
+        Whether crops go through the cheap embedding first. Exported graphs are
+        traced at 224x224 and INT8 calibrated at it, so only eager fp32/bf16/
+        dynamic-INT8 models run at the lower resolution.
+        """
+        return (
+            self.cascade_mode == "full" and self.siamese_model is not None and self.backend == "torch"
+            and self.precision != "int8_static" and self.calibration.has_cascade_band
+        )
+    
+    def _fingerprint_models(self) -> str:
+        """Hash of everything besides the inputs that determines process() output"""
+        if self.backend == "torch":
+            weights = [
+                os.getenv("YOLO_MODEL_PATH", "yolov11n.pt"),
+                os.getenv("CYCLEGAN_MODEL_PATH") or "",
+                os.getenv("SIAMESE_MODEL_PATH") or "",
+            ]
+            if self.precision == "int8_static":
+                weights += [precision_modes.static_int8_path(self.export_dir, name) for name in ("cyclegan", "siamese")]
+        else:
+            weights = [exported_model_path(self.export_dir, name, self.backend) for name in ("yolo", "cyclegan", "siamese")]
+        
+        parts = [
+            self.backend, self.precision, self.embedding_model_tag(),
+            f"{self.cascade_mode}:{self.cascade_fast_size}:{self.calibration.fingerprint()}",
+            "cyclegan" if self.cyclegan_model is not None else "classical",
+            f"{self.detection_conf}:{self.detection_iou}:{self.max_detections}",
+            f"{self.detection_mode}:{self.detection_tile_size}:{self.detection_tile_overlap}:"
+            f"{self.detection_tile_above}:{self.detection_tile_contain}",
+            f"{self.cleaning_mode}:{cleaning_config.CLEAN_MIN_BACKGROUND}:{cleaning_config.CLEAN_MAX_NOISE}:"
+            f"{cleaning_config.CLEAN_MAX_COLOR}:{cleaning_config.CLEAN_MAX_LINES}",
+            f"{self.ingest_max_side}:{self.full_resolution_artifacts}:{self.reference_aggregation}",
+        ]
+        for path in weights:
+            try:
+                stat = os.stat(path)
+                parts.append(f"{path}:{stat.st_size}:{stat.st_mtime_ns}")
+            except OSError:
+                parts.append(f"{path}:missing")
+        return hashlib.sha256("|".join(parts).encode("utf-8")).hexdigest()[:16]
+    
+    def _siamese_weights_id(self) -> str:
+        """
+        Content hash of the loaded Siamese weights. Without a checkpoint the
+        head is randomly initialized on every load, so it gets a new id each time.
+        """
+        if self.backend != "torch":
+            paths = [exported_model_path(self.export_dir, "siamese", self.backend)]
+        elif self.precision == "int8_static":
+            paths = [precision_modes.static_int8_path(self.export_dir, "siamese")]
+        else:
+            paths = [os.getenv("SIAMESE_MODEL_PATH") or ""]
+        if not all(os.path.exists(path) for path in paths):
+            return f"random{uuid.uuid4().hex[:6]}"
+        return weights_digest(paths)
+    
+    def embedding_model_tag(self) -> str:
+        """
+        Identifies the embedding space: stored, cached and indexed embeddings
+        are only reused under the same tag, so it covers the weights too
+        """
+        if self.siamese_model is None:
+            return "pixel"
+        return f"siamese-{self.backend}-{self.precision}-{self.siamese_weights}"
     
-    async def _verify_signature(self, cleaned_sig: Image.Image, reference_sig_url: str) -> float:
+    @property
+    def stores_embeddings(self) -> bool:
         """
-        Step C: Verify signature using Siamese Network
-        Returns: confidence score (0-1)
+        Whether embeddings are worth storing with references: placeholder (pixel)
+        embeddings depend on the image size, and a random head changes every load
+        """
+        return self.siamese_model is not None and not self.siamese_weights.startswith("random")
+    
+    def fast_embedding_tag(self) -> str:
+        return f"{self.embedding_model_tag()}-{self.cascade_fast_size}px"
+    
+    async def _get_reference_embeddings(
+        self,
+        references: List[Dict],
+        profile_id: Optional[str] = None,
+        reference_version: Optional[str] = None,
+        fast: bool = False
+    ) -> np.ndarray:
+        """
+        Stacked embeddings of a profile's reference signatures. Embeddings stored
+        with a reference are used when they come from the current model; the
+        rest are downloaded and embedded in one batch. The stack is cached.
+        `fast` gives the cascade's cheap embeddings instead.
+        """
+        tag = self.fast_embedding_tag() if fast else self.embedding_model_tag()
+        urls = "\x1e".join(reference["sig_url"] for reference in references)
+        key = EmbeddingCache.make_key(profile_id, urls, reference_version, tag)
+        embeddings = self.embedding_cache.get(key)
+        if embeddings is None:
+            embeddings = np.stack(await asyncio.gather(
+                *(self._reference_embedding(reference, tag, fast) for reference in references)
+            ))
+            self.embedding_cache.put(key, embeddings)
+        if not fast:
+            # The identification index holds one template (mean) embedding per profile
+            self._index_reference(profile_id, embeddings.mean(axis=0), reference_version)
+        return embeddings
+    
+    async def _reference_embedding(self, reference: Dict, tag: str, fast: bool = False) -> np.ndarray:
+        if reference.get("embedding") and reference.get("embedding_model") == tag:
+            return decode_embedding(reference["embedding"])
+        reference_bytes = await self.storage_service.download_file(reference["sig_url"])
+        reference_image = await self.cpu_executor.run(self._bytes_to_image, reference_bytes)
+        if fast:
+            return await self._embed_fast(reference_image)
+        embedding = await self._embed(reference_image)
+        if reference.get("id") and self.stores_embeddings and self.on_reference_embedded is not None:
+            # Replace the stale stored embedding so it is not recomputed on every cache miss
+            try:
+                await self.on_reference_embedded(reference, embedding, tag)
+            except Exception as e:
+                print(f"Error storing embedding of reference {reference['id']}: {e}")
+        return embedding
+    
+    async def embed_reference(self, image_bytes: bytes) -> np.ndarray:
+        """Embedding of a new reference signature, to store alongside it"""
+        await self.ensure_loaded()
+        image = await self.cpu_executor.run(self._bytes_to_image, image_bytes)
+        return await self._embed(image)
+    
+    def _index_reference(self, profile_id: Optional[str], embedding: np.ndarray, reference_version: Optional[str]):
+        """Keep the identification index current with every reference embedding seen"""
+        if not profile_id or self.siamese_model is None:
+            return
+        if self.embedding_index.version_of(profile_id) != (reference_version or ""):
+            self.embedding_index.upsert(profile_id, embedding, reference_version)
+    
+    def _scores_from_distances(self, distance: torch.Tensor, tag: Optional[str] = None) -> torch.Tensor:
+        # Convert distance to a match probability (0-1) with the sigmoid
+        # calibrated for this embedding model (scripts/calibrate_scores.py)
+        slope, intercept = self.calibration.scale(tag or self.embedding_model_tag())
+        return torch.sigmoid(distance * slope + intercept)
+    
+    def _score_embeddings(self, candidates: np.ndarray, references: np.ndarray,
+                          tag: Optional[str] = None) -> List[float]:
+        """
+        Similarity (0-1) of each candidate embedding to a set of references, from
+        one batched computation over every (candidate, reference) pair, aggregated
+        per REFERENCE_AGGREGATION: best reference (max), average score (mean), or
+        distance to the references' mean embedding (template).
+        """
+        if references.ndim == candidates.ndim - 1:
+            references = references[np.newaxis]
+        if self.reference_aggregation == "template":
+            references = references.mean(axis=0, keepdims=True)
+        
+        if self.siamese_model is None:
+            # Placeholder: simple pixel difference
+            metrics.record_fallback(metrics.VERIFY_PLACEHOLDER, len(candidates))
+            diff = np.abs(candidates[:, np.newaxis] - references[np.newaxis])
+            diff = diff.reshape(len(candidates), len(references), -1).mean(axis=2)
+            scores = torch.from_numpy(1.0 - np.minimum(diff / 255.0, 1.0))
+        else:
+            # Euclidean distance of every candidate to every reference
+            distance = torch.cdist(torch.from_numpy(candidates), torch.from_numpy(references))
+            scores = self._scores_from_distances(distance, tag)
+        
+        if self.reference_aggregation == "mean":
+            return scores.mean(dim=1).tolist()
+        return scores.max(dim=1).values.tolist()
+    
+    async def _verify_signatures(
+        self,
+        cleaned_sigs: List[Image.Image],
+        references: List[Dict],
+        profile_id: Optional[str] = None,
+        reference_version: Optional[str] = None,
+        fallbacks: Optional[List[str]] = None
+    ) -> Tuple[List[float], List[str]]:
+        """
+        Step C: Verify signatures using Siamese Network
+        Returns: one confidence score (0-1) per cleaned signature, and the
+        stage that settled it: "fast" (the cheap embedding was decisive),
+        "full" or "default" (verification failed)
         """
         try:
-            # Download reference signature
-            reference_bytes = await self.storage_service.download_file(reference_sig_url)
-            reference_image = self._bytes_to_image(reference_bytes)
+            scores: List[Optional[float]] = [None] * len(cleaned_sigs)
+            verified_by = ["full"] * len(cleaned_sigs)
+            if self.cascade_screens:
+                fast_references = await self._get_reference_embeddings(
+                    references, profile_id, reference_version, fast=True
+                )
+                fast_candidates = np.stack(await asyncio.gather(*(self._embed_fast(sig) for sig in cleaned_sigs)))
+                fast_scores = self._score_embeddings(fast_candidates, fast_references, self.fast_embedding_tag())
+                for i, score in enumerate(fast_scores):
+                    if self.calibration.decisive(score):
+                        scores[i], verified_by[i] = score, "fast"
             
-            # Preprocess images
-            def preprocess(img: Image.Image) -> torch.Tensor:
-                img = img.resize((224, 224))
-                img_tensor = torch.from_numpy(np.array(img)).float()
-                img_tensor = img_tensor.permute(2, 0, 1).unsqueeze(0) / 255.0
-                # Normalize with ImageNet stats
-                mean = torch.tensor([0.485, 0.456, 0.406]).view(1, 3, 1, 1)
-                std = torch.tensor([0.229, 0.224, 0.225]).view(1, 3, 1, 1)
-                img_tensor = (img_tensor - mean) / std
-                return img_tensor.to(self.device)
-            
-            cleaned_tensor = preprocess(cleaned_sig)
-            reference_tensor = preprocess(reference_image)
-            
-            if self.siamese_model is None:
-                # Placeholder: simple pixel difference
-                cleaned_np = np.array(cleaned_sig.resize((224, 224))).astype(float)
-                ref_np = np.array(reference_image.resize((224, 224))).astype(float)
-                diff = np.abs(cleaned_np - ref_np).mean()
-                similarity = 1.0 - min(diff / 255.0, 1.0)
-                return float(similarity)
-            
-            # Get embeddings from Siamese Network
-            with torch.no_grad():
-                emb1, emb2 = self.siamese_model(cleaned_tensor, reference_tensor)
-                # Calculate Euclidean distance
-                distance = torch.nn.functional.pairwise_distance(emb1, emb2)
-                # Convert distance to similarity score (0-1)
-                # Using sigmoid to map distance to [0, 1]
-                similarity = torch.sigmoid(-distance + 5.0).item()
-            
-            return float(similarity)
+            pending = [i for i, score in enumerate(scores) if score is None]
+            if pending:
+                started = time.perf_counter()
+                reference_embeddings = await self._get_reference_embeddings(
+                    references, profile_id, reference_version
+                )
+                # Concurrent submissions share one Siamese batch
+                candidates = np.stack(await asyncio.gather(*(self._embed(cleaned_sigs[i]) for i in pending)))
+                for i, score in zip(pending, self._score_embeddings(candidates, reference_embeddings)):
+                    scores[i] = score
+                self.cascade_stats.observe("verify_full", time.perf_counter() - started)
+            return scores, verified_by
             
+        except QueueFullError:
+            raise
         except Exception as e:
             print(f"Error in signature verification: {e}")
-            return 0.5  # Default neutral score
+            metrics.record_fallback(metrics.VERIFY_DEFAULT_SCORE, len(cleaned_sigs))
+            if fallbacks is not None:
+                fallbacks.append("verify")
+            # Default neutral score
+            return [0.5] * len(cleaned_sigs), ["default"] * len(cleaned_sigs)
+    
+    async def result_cache_key(
+        self,
+        content_hash: str,
+        reference_sig_url: str,
+        profile_id: Optional[str] = None,
+        reference_version: Optional[str] = None,
+        cleaning: Optional[str] = None
+    ) -> str:
+        """Result cache key for a document hash against a reference under the loaded models"""
+        await self.ensure_loaded()
+        model_version = self.model_version
+        if cleaning is not None and cleaning != self.cleaning_mode:
+            # A per-request cleaning override can change the result
+            model_version = f"{model_version}:clean-{cleaning}"
+        return ResultCache.make_key(content_hash, profile_id, reference_sig_url, reference_version, model_version)
     
-    async def process(self, image_bytes: bytes, reference_sig_url: str, verification_id: str) -> Dict:
+    async def index_profile(
+        self,
+        profile_id: str,
+        references: List[Dict],
+        reference_version: Optional[str] = None
+    ):
+        """Add or refresh a profile in the identification index"""
+        await self.ensure_loaded()
+        if self.siamese_model is None:
+            raise IdentificationUnavailableError("Identification requires the Siamese model")
+        await self._get_reference_embeddings(references, profile_id, reference_version)
+    
+    def remove_profile(self, profile_id: str) -> bool:
+        """Drop a profile's cached embedding and index entry"""
+        self.embedding_cache.invalidate(profile_id)
+        return self.embedding_index.remove(profile_id)
+    
+    async def sync_index(self, profiles: List[Dict], max_concurrency: int = 8) -> Dict:
+        """
+        Bring the index in line with `profiles` (id, references, updated_at):
+        new or updated profiles are embedded, profiles that no longer exist removed.
+        """
+        await self.ensure_loaded()
+        if self.siamese_model is None:
+            raise IdentificationUnavailableError("Identification requires the Siamese model")
+        
+        indexed = self.embedding_index.profile_versions()
+        current = {profile["id"] for profile in profiles}
+        removed = [profile_id for profile_id in indexed if profile_id not in current]
+        for profile_id in removed:
+            self.embedding_index.remove(profile_id)
+        
+        stale = [p for p in profiles if indexed.get(p["id"]) != (p.get("updated_at") or "")]
+        semaphore = asyncio.Semaphore(max(1, max_concurrency))
+        failed = []
+        
+        async def index_one(profile: Dict):
+            async with semaphore:
+                try:
+                    await self._get_reference_embeddings(
+                        reference_set(profile), profile["id"], profile.get("updated_at")
+                    )
+                except Exception as e:
+                    print(f"Error indexing profile {profile['id']}: {e}")
+                    failed.append(profile["id"])
+        
+        await asyncio.gather(*(index_one(profile) for profile in stale))
+        return {"indexed": len(stale) - len(failed), "removed": len(removed), "failed": len(failed)}
+    
+    async def identify(self, image: ImageSource, k: int = 5, exclude_profile_ids=()) -> Dict:
+        """
+        1:N identification: detect and clean every signature on the page and
+        return, for each, the k nearest profiles in the embedding index.
+        """
+        await self.ensure_loaded()
+        if self.siamese_model is None:
+            raise IdentificationUnavailableError("Identification requires the Siamese model")
+        
+        fallbacks: List[str] = []
+        with metrics.stage("decode"):
+            page = await self.cpu_executor.run(decode_page, image, self.ingest_max_side)
+        with metrics.stage("detect"):
+            detected_sigs, detection_infos = await self._detect_signature(page, fallbacks)
+        with metrics.stage("clean"):
+            cleaned_sigs, _ = await self._clean_signatures(detected_sigs, fallbacks)
+        with metrics.stage("embed"):
+            candidates = np.stack(await asyncio.gather(*(self._embed(sig) for sig in cleaned_sigs)))
+        
+        with metrics.stage("search"):
+            neighbours = await self.cpu_executor.run(
+                self.embedding_index.search, candidates, k, exclude_profile_ids
+            )
+        detections = []
+        for info, matches in zip(detection_infos, neighbours):
+            scores = self._scores_from_distances(torch.tensor([d for _, d in matches])).tolist() if matches else []
+            detections.append({
+                **info,
+                "matches": [
+                    {"profile_id": profile_id, "distance": distance, "score": score}
+                    for (profile_id, distance), score in zip(matches, scores)
+                ]
+            })
+        return {
+            "detections": detections,
+            "index_size": len(self.embedding_index),
+            "fallbacks": sorted(set(fallbacks))
+        }
+    
+    def batching_stats(self) -> Dict:
+        return {
+            "yolo": self.detect_batcher.stats(),
+            "cyclegan": self.clean_batcher.stats(),
+            "siamese": self.embed_batcher.stats(),
+            "siamese_fast": self.fast_embed_batcher.stats(),
+        }
+    
+    def _artifact_crop(self, page: DecodedPage, bbox: Optional[Tuple[int, int, int, int]],
+                       working_crop: Image.Image) -> Image.Image:
+        """The stored detected signature: re-read at full resolution, for the chosen box only"""
+        if not self.full_resolution_artifacts or bbox is None:
+            return working_crop
+        return page.crop_full_resolution(bbox)
+    
+    async def process(
+        self,
+        image: ImageSource,
+        reference_sig_url: str,
+        verification_id: str,
+        profile_id: Optional[str] = None,
+        reference_version: Optional[str] = None,
+        references: Optional[List[Dict]] = None,
+        cleaning: Optional[str] = None,
+        on_progress: Optional[Callable[[str, Dict], Awaitable[None]]] = None
+    ) -> Dict:
         """
         Main processing pipeline:
-        1. Detect signature
-        2. Clean signature
-        3. Verify signature
+        1. Detect signatures
+        2. Clean signatures
+        3. Verify signatures
+        The overall confidence score and uploaded crops are those of the
+        best-scoring signature; per-box scores are in `detections`.
+        `fallbacks` lists the stages that failed and used a placeholder.
+        `image` is the encoded image or a path to it; it is decoded once, at
+        working resolution, and that buffer is shared by every stage.
+        `references` is the profile's reference set (defaults to reference_sig_url alone).
+        `cleaning` overrides CLEANING_MODE for this request; each detection
+        records the cleaning path it took and its time.
+        `on_progress(step, data)` is awaited as detect, clean and verify finish.
+        Per CASCADE_MODE, a page without a detection ends after detection
+        with a score of 0, and `early_exit` names the stage a result stopped
+        after ("detect" or "verify_fast"), if any.
         """
-        # Step A: Detection
-        detected_sig, detection_info = await self._detect_signature(image_bytes)
-        detected_bytes = self._image_to_bytes(detected_sig) if detected_sig else None
+        await self.ensure_loaded()
+        if cleaning is not None and cleaning not in CLEANING_MODES:
+            raise ValueError(f"cleaning must be one of {CLEANING_MODES}, got {cleaning}")
+        references = references or [{"sig_url": reference_sig_url}]
+        fallbacks: List[str] = []
+        with metrics.stage("decode"):
+            page = await self.cpu_executor.run(decode_page, image, self.ingest_max_side)
+        
+        # Step A: Detection (every signature on the page)
+        with metrics.stage("detect"):
+            detected_sigs, detection_infos = await self._detect_signature(
+                page, fallbacks, allow_empty=self.cascade_mode != "off"
+            )
+        if on_progress is not None:
+            await on_progress("detect", {"boxes": [info["bbox"] for info in detection_infos]})
+        if not detected_sigs:
+            # Nothing to clean or verify
+            self.cascade_stats.record("detect")
+            if on_progress is not None:
+                await on_progress("verify", {"confidence_score": 0.0, "scores": [], "early_exit": "detect"})
+            return {
+                "detected_sig": None,
+                "cleaned_sig": None,
+                "confidence_score": 0.0,
+                "detection_info": None,
+                "detections": [],
+                "fallbacks": sorted(set(fallbacks)),
+                "early_exit": "detect"
+            }
         
         # Step B: Cleaning
-        cleaned_sig = await self._clean_signature(detected_sig)
-        cleaned_bytes = self._image_to_bytes(cleaned_sig)
+        started = time.perf_counter()
+        with metrics.stage("clean"):
+            cleaned_sigs, cleaning_infos = await self._clean_signatures(detected_sigs, fallbacks, cleaning)
+        self.cascade_stats.observe("clean", time.perf_counter() - started)
+        detection_infos = [
+            {**info, "cleaning": clean_info["path"], "cleaning_ms": clean_info["ms"]}
+            for info, clean_info in zip(detection_infos, cleaning_infos)
+        ]
+        if on_progress is not None:
+            await on_progress("clean", {"paths": [info["path"] for info in cleaning_infos]})
         
         # Step C: Verification
-        confidence_score = await self._verify_signature(cleaned_sig, reference_sig_url)
+        started = time.perf_counter()
+        with metrics.stage("verify"):
+            scores, verified_by = await self._verify_signatures(
+                cleaned_sigs, references, profile_id, reference_version, fallbacks
+            )
+        self.cascade_stats.observe("verify", time.perf_counter() - started)
+        early_exit = "verify_fast" if all(stage == "fast" for stage in verified_by) else None
+        self.cascade_stats.record(early_exit)
+        
+        detections = [
+            {**info, "score": score, "verified_by": stage}
+            for info, score, stage in zip(detection_infos, scores, verified_by)
+        ]
+        best = int(np.argmax(scores))
+        if on_progress is not None:
+            await on_progress(
+                "verify", {"confidence_score": scores[best], "scores": scores, "early_exit": early_exit}
+            )
+        with metrics.stage("encode"):
+            detected_sig = await self.cpu_executor.run(
+                self._artifact_crop, page, detection_infos[best]["bbox"], detected_sigs[best]
+            )
+            detected_bytes = await self.cpu_executor.run(self._image_to_bytes, detected_sig)
+            cleaned_bytes = await self.cpu_executor.run(self._image_to_bytes, cleaned_sigs[best])
         
         return {
             "detected_sig": detected_bytes,
             "cleaned_sig": cleaned_bytes,
-            "confidence_score": confidence_score,
-            "detection_info": detection_info
+            "confidence_score": scores[best],
+            "detection_info": detection_infos[best],
+            "detections": detections,
+            "fallbacks": sorted(set(fallbacks)),
+            "early_exit": early_exit
         }
-
+    
+    async def process_many(
+        self,
+        items: List[Dict],
+        reference_sig_url: str,
+        profile_id: Optional[str] = None,
+        reference_version: Optional[str] = None,
+        max_concurrency: Optional[int] = None,
+        references: Optional[List[Dict]] = None,
+        cleaning: Optional[str] = None
+    ) -> AsyncIterator[Tuple[Dict, Optional[Dict], Optional[Exception]]]:
+        """
+        Run many images through the pipeline with bounded concurrency.
+        Each item needs `image_bytes` and `verification_id`; yields
+        (item, result, error) as soon as each item finishes, in completion order.
+        Concurrent items share micro-batches in every stage.
+        """
+        if max_concurrency is None:
+            max_concurrency = int(os.getenv("BATCH_MAX_CONCURRENCY", "8"))
+        semaphore = asyncio.Semaphore(max(1, max_concurrency))
+        
+        async def run_one(item: Dict):
+            async with semaphore:
+                try:
+                    result = await self.process(
+                        image=item["image_bytes"],
+                        reference_sig_url=reference_sig_url,
+                        verification_id=item["verification_id"],
+                        profile_id=profile_id,
+                        reference_version=reference_version,
+                        references=references,
+                        cleaning=cleaning
+                    )
+                    return item, result, None
+                except Exception as e:
+                    return item, None, e
+        
+        tasks = [asyncio.ensure_future(run_one(item)) for item in items]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            # Client went away or caller stopped iterating
+            for task in tasks:
+                task.cancel()
@@ -0,0 +1,132 @@
+import hashlib
+import os
+import tempfile
+from io import BytesIO
+from typing import Optional, Tuple, Union
+
+import numpy as np
+from PIL import Image
+
+
+# Largest upload accepted by /verify, in bytes
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(64 * 1024 * 1024)))
+# Largest decoded page, in pixels (600 dpi A3 is about 70 MP)
+MAX_IMAGE_PIXELS = int(os.getenv("MAX_IMAGE_PIXELS", "200000000"))
+# Long side of the working-resolution decode shared by every stage; 0 decodes at full resolution
+INGEST_MAX_SIDE = int(os.getenv("INGEST_MAX_SIDE", "2048"))
+INGEST_CHUNK_SIZE = int(os.getenv("INGEST_CHUNK_SIZE", str(1024 * 1024)))
+
+# Let PIL's own decompression-bomb check follow the configured limit
+Image.MAX_IMAGE_PIXELS = MAX_IMAGE_PIXELS
+
+ImageSource = Union[bytes, str]
+
+
+class UploadTooLargeError(Exception):
+    """The upload or its decoded image exceeds the configured limits"""
+
+
+class SpooledUpload:
+    """An upload written to a temporary file, with its size and sha256"""
+
+    def __init__(self, path: str, size: int, sha256: str):
+        self.path = path
+        self.size = size
+        self.sha256 = sha256
+
+    def read_bytes(self) -> bytes:
+        with open(self.path, "rb") as f:
+            return f.read()
+
+    def cleanup(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+async def spool_upload(upload, max_bytes: int = MAX_UPLOAD_BYTES) -> SpooledUpload:
+    """
+    Stream an UploadFile to disk in chunks, hashing as it goes, so the
+    document is never held in memory as a whole.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    fd, path = tempfile.mkstemp(prefix="upload-", dir=os.getenv("INGEST_SPOOL_DIR") or None)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            while True:
+                chunk = await upload.read(INGEST_CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLargeError(f"Upload exceeds {max_bytes} bytes")
+                digest.update(chunk)
+                f.write(chunk)
+    except BaseException:
+        os.remove(path)
+        raise
+    return SpooledUpload(path, size, digest.hexdigest())
+
+
+def _open(source: ImageSource) -> Image.Image:
+    try:
+        return Image.open(BytesIO(source) if isinstance(source, (bytes, bytearray)) else source)
+    except Image.DecompressionBombError as e:
+        raise UploadTooLargeError(str(e))
+
+
+class DecodedPage:
+    """
+    A page decoded once at working resolution and shared by every stage.
+    Boxes are in full-resolution coordinates; `scale` maps them onto `pixels`.
+    """
+
+    def __init__(self, source: ImageSource, pixels: np.ndarray, full_size: Tuple[int, int]):
+        self.source = source
+        self.pixels = pixels
+        self.full_size = full_size
+        self.scale = full_size[0] / pixels.shape[1]
+
+    def to_full(self, bbox: Tuple[int, int, int, int]) -> Tuple[int, int, int, int]:
+        """Map a box on the working buffer to full-resolution coordinates"""
+        w, h = self.full_size
+        x1, y1, x2, y2 = (int(round(v * self.scale)) for v in bbox)
+        return max(0, x1), max(0, y1), min(w, x2), min(h, y2)
+
+    def crop(self, bbox: Tuple[int, int, int, int]) -> Image.Image:
+        """Crop a full-resolution box out of the working buffer (copies only the crop)"""
+        x1, y1, x2, y2 = (int(v / self.scale) for v in bbox)
+        return Image.fromarray(self.pixels[y1:max(y2, y1 + 1), x1:max(x2, x1 + 1)])
+
+    def image(self) -> Image.Image:
+        return Image.fromarray(self.pixels)
+
+    def crop_full_resolution(self, bbox: Optional[Tuple[int, int, int, int]]) -> Image.Image:
+        """Re-read the source at full resolution for one box (the whole page if None)"""
+        if self.scale == 1:
+            return self.crop(bbox) if bbox is not None else self.image()
+        with _open(self.source) as image:
+            region = image.crop(bbox) if bbox is not None else image
+            return region.convert("RGB")
+
+
+def decode_page(source: ImageSource, max_side: int = INGEST_MAX_SIDE) -> DecodedPage:
+    """
+    Decode an image once, reduced so its long side is at most `max_side`.
+    For JPEGs the full-resolution bitmap is never materialized.
+    """
+    with _open(source) as image:
+        full_size = image.size
+        if full_size[0] * full_size[1] > MAX_IMAGE_PIXELS:
+            raise UploadTooLargeError(f"Image is {full_size[0]}x{full_size[1]}, above {MAX_IMAGE_PIXELS} pixels")
+
+        if max_side and max(full_size) > max_side:
+            # With reducing_gap=1 JPEGs are decoded straight at the smallest DCT
+            # scale (Image.draft) still above max_side, then resampled down
+            image.thumbnail((max_side, max_side), Image.BILINEAR, reducing_gap=1.0)
+        working = image.convert("RGB") if image.mode != "RGB" else image
+        # The array owns its data, so the PIL image can be released
+        pixels = np.asarray(working)
+    return DecodedPage(source, pixels, full_size)
@@ -0,0 +1,223 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional
+
+from services.executor import QueueFullError
+
+
+JOB_STATES = ("queued", "running", "done", "failed")
+TERMINAL_STATES = ("done", "failed")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    result TEXT,
+    error TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    lease_until REAL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status_created ON jobs(status, created_at);
+CREATE TABLE IF NOT EXISTS job_events (
+    job_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    step TEXT NOT NULL,
+    data TEXT NOT NULL,
+    at REAL NOT NULL,
+    PRIMARY KEY (job_id, seq)
+);
+"""
+
+
+class JobQueue:
+    """
+    Durable job queue shared by the API (which submits and reads jobs) and
+    out-of-process inference workers (which claim and run them).
+
+    This is a local stand-in backed by one SQLite file in WAL mode, so API
+    and worker processes on the same host share it. A claimed job holds a
+    lease that every progress event renews; a job whose worker died is
+    handed out again once its lease runs out, up to `max_attempts` times.
+    Progress events are numbered per job, so readers can resume after the
+    last one they saw.
+    """
+
+    def __init__(self, path: str = "jobs.db", max_queued: int = 1000,
+                 lease_seconds: float = 300.0, max_attempts: int = 3):
+        self.path = path
+        self.max_queued = max_queued
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max(1, max_attempts)
+        self._lock = threading.Lock()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30.0, isolation_level=None, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    @classmethod
+    def from_env(cls) -> "JobQueue":
+        return cls(
+            path=os.getenv("JOB_QUEUE_PATH", "jobs.db"),
+            max_queued=int(os.getenv("JOB_QUEUE_MAX", "1000")),
+            lease_seconds=float(os.getenv("JOB_LEASE_SECONDS", "300")),
+            max_attempts=int(os.getenv("JOB_MAX_ATTEMPTS", "3")),
+        )
+
+    def _transaction(self):
+        # BEGIN IMMEDIATE takes the write lock up front, so two claimers never pick the same job
+        return _Transaction(self._conn, self._lock)
+
+    def submit(self, job_id: str, kind: str, payload: Dict):
+        """Queue a job; raises QueueFullError once `max_queued` jobs are waiting"""
+        now = time.time()
+        with self._transaction() as conn:
+            queued = conn.execute("SELECT COUNT(*) FROM jobs WHERE status = 'queued'").fetchone()[0]
+            if queued >= self.max_queued:
+                raise QueueFullError("job")
+            conn.execute(
+                "INSERT INTO jobs (id, kind, payload, status, created_at, updated_at) VALUES (?, ?, ?, 'queued', ?, ?)",
+                (job_id, kind, json.dumps(payload), now, now),
+            )
+            self._add_event(conn, job_id, "queued", {}, now)
+
+    def claim(self, worker: str) -> Optional[Dict]:
+        """The oldest queued job (or one whose worker's lease ran out), now leased to `worker`"""
+        now = time.time()
+        with self._transaction() as conn:
+            # Jobs that already used up their attempts on dead workers are failed, not retried
+            expired = conn.execute(
+                "SELECT id FROM jobs WHERE status = 'running' AND lease_until < ? AND attempts >= ?",
+                (now, self.max_attempts),
+            ).fetchall()
+            for row in expired:
+                self._finish(conn, row["id"], "failed", None, "Worker lost too many times", now)
+
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE status = 'queued' OR (status = 'running' AND lease_until < ?) "
+                "ORDER BY created_at LIMIT 1",
+                (now,),
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = 'running', worker = ?, attempts = attempts + 1, lease_until = ?, "
+                "updated_at = ? WHERE id = ?",
+                (worker, now + self.lease_seconds, now, row["id"]),
+            )
+            self._add_event(conn, row["id"], "running", {"worker": worker, "attempt": row["attempts"] + 1}, now)
+            return {"id": row["id"], "kind": row["kind"], "payload": json.loads(row["payload"])}
+
+    def progress(self, job_id: str, step: str, data: Optional[Dict] = None):
+        """Record a finished step and renew the job's lease"""
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE jobs SET lease_until = ?, updated_at = ? WHERE id = ? AND status = 'running'",
+                (now + self.lease_seconds, now, job_id),
+            )
+            self._add_event(conn, job_id, step, data or {}, now)
+
+    def complete(self, job_id: str, result: Dict):
+        with self._transaction() as conn:
+            self._finish(conn, job_id, "done", result, None, time.time())
+
+    def fail(self, job_id: str, error: str):
+        with self._transaction() as conn:
+            self._finish(conn, job_id, "failed", None, error, time.time())
+
+    def _finish(self, conn, job_id: str, status: str, result: Optional[Dict], error: Optional[str], now: float):
+        conn.execute(
+            "UPDATE jobs SET status = ?, result = ?, error = ?, lease_until = NULL, updated_at = ? WHERE id = ?",
+            (status, json.dumps(result) if result is not None else None, error, now, job_id),
+        )
+        self._add_event(conn, job_id, status, {"error": error} if error else {}, now)
+
+    def _add_event(self, conn, job_id: str, step: str, data: Dict, now: float):
+        conn.execute(
+            "INSERT INTO job_events (job_id, seq, step, data, at) "
+            "SELECT ?, COALESCE(MAX(seq), 0) + 1, ?, ?, ? FROM job_events WHERE job_id = ?",
+            (job_id, step, json.dumps(data), now, job_id),
+        )
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        return {
+            "id": row["id"],
+            "kind": row["kind"],
+            "status": row["status"],
+            "attempts": row["attempts"],
+            "result": json.loads(row["result"]) if row["result"] else None,
+            "error": row["error"],
+            "created_at": row["created_at"],
+            "updated_at": row["updated_at"],
+        }
+
+    def events(self, job_id: str, after: int = 0) -> List[Dict]:
+        """Progress events of a job with a sequence number above `after`, in order"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT seq, step, data, at FROM job_events WHERE job_id = ? AND seq > ? ORDER BY seq",
+                (job_id, after),
+            ).fetchall()
+        return [{"seq": r["seq"], "step": r["step"], "data": json.loads(r["data"]), "at": r["at"]} for r in rows]
+
+    def purge(self, older_than_seconds: float) -> int:
+        """Drop finished jobs and their events older than the given age"""
+        cutoff = time.time() - older_than_seconds
+        with self._transaction() as conn:
+            ids = [r["id"] for r in conn.execute(
+                "SELECT id FROM jobs WHERE status IN ('done', 'failed') AND updated_at < ?", (cutoff,)
+            ).fetchall()]
+            for job_id in ids:
+                conn.execute("DELETE FROM job_events WHERE job_id = ?", (job_id,))
+                conn.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+            return len(ids)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            counts = dict(self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+            oldest = self._conn.execute("SELECT MIN(created_at) FROM jobs WHERE status = 'queued'").fetchone()[0]
+        return {
+            **{state: counts.get(state, 0) for state in JOB_STATES},
+            "max_queued": self.max_queued,
+            "oldest_queued_age_seconds": round(time.time() - oldest, 3) if oldest else 0.0,
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class _Transaction:
+    def __init__(self, conn: sqlite3.Connection, lock: threading.Lock):
+        self.conn = conn
+        self.lock = lock
+
+    def __enter__(self) -> sqlite3.Connection:
+        self.lock.acquire()
+        try:
+            self.conn.execute("BEGIN IMMEDIATE")
+        except BaseException:
+            self.lock.release()
+            raise
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        finally:
+            self.lock.release()
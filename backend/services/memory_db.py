@@ -0,0 +1,223 @@
+import operator
+import re
+import threading
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+
+# Embedded resources (`table(col,...)` in a select) and the column that links them to the parent row
+FOREIGN_KEYS = {
+    ("profiles", "reference_signatures"): "profile_id",
+    ("profiles", "verifications"): "user_id",
+}
+
+_EMBED = re.compile(r"(\w+)\(([^)]*)\)")
+
+_OPERATORS = {
+    "eq": operator.eq, "neq": operator.ne,
+    "lt": operator.lt, "lte": operator.le, "gt": operator.gt, "gte": operator.ge,
+}
+
+
+class MemoryResponse:
+    def __init__(self, data: List[Dict]):
+        self.data = data
+
+
+class MemoryQuery:
+    """The subset of the supabase-py/PostgREST query builder the API uses"""
+
+    def __init__(self, db: "MemoryDatabase", table: str):
+        self.db = db
+        self.table = table
+        self._action = "select"
+        self._columns = "*"
+        self._payload: Any = None
+        self._on_conflict: Optional[str] = None
+        self._filters: List = []
+        self._order: List = []
+        self._offset = 0
+        self._limit: Optional[int] = None
+
+    def select(self, columns: str = "*"):
+        self._columns = columns
+        return self
+
+    def insert(self, rows):
+        self._action, self._payload = "insert", rows
+        return self
+
+    def upsert(self, rows, on_conflict: Optional[str] = None):
+        self._action, self._payload, self._on_conflict = "upsert", rows, on_conflict
+        return self
+
+    def update(self, fields: Dict):
+        self._action, self._payload = "update", fields
+        return self
+
+    def delete(self):
+        self._action = "delete"
+        return self
+
+    def _filter(self, column: str, test):
+        self._filters.append(lambda row: test(row.get(column)))
+        return self
+
+    def eq(self, column: str, value):
+        return self._filter(column, lambda v: v == value)
+
+    def neq(self, column: str, value):
+        return self._filter(column, lambda v: v != value)
+
+    def lt(self, column: str, value):
+        return self._filter(column, lambda v: v is not None and v < value)
+
+    def lte(self, column: str, value):
+        return self._filter(column, lambda v: v is not None and v <= value)
+
+    def gt(self, column: str, value):
+        return self._filter(column, lambda v: v is not None and v > value)
+
+    def gte(self, column: str, value):
+        return self._filter(column, lambda v: v is not None and v >= value)
+
+    def in_(self, column: str, values):
+        values = list(values)
+        return self._filter(column, lambda v: v in values)
+
+    def or_(self, filters: str):
+        """PostgREST logic tree, e.g. `a.lt.1,and(a.eq.1,b.lt."x")`; values compare as stored"""
+        self._filters.append(_logic_tree(any, filters))
+        return self
+
+    def order(self, column: str, desc: bool = False):
+        self._order.append((column, desc))
+        return self
+
+    def limit(self, count: int):
+        self._limit = count
+        return self
+
+    def range(self, start: int, end: int):
+        self._offset, self._limit = start, end - start + 1
+        return self
+
+    def _matches(self, row: Dict) -> bool:
+        return all(test(row) for test in self._filters)
+
+    def execute(self) -> MemoryResponse:
+        with self.db.lock:
+            return MemoryResponse(getattr(self, f"_{self._action}")())
+
+    def _select(self) -> List[Dict]:
+        rows = [row for row in self.db.rows(self.table) if self._matches(row)]
+        for column, desc in reversed(self._order):
+            rows.sort(key=lambda row: (row.get(column) is None, row.get(column)), reverse=desc)
+        end = None if self._limit is None else self._offset + self._limit
+        return [self._project(row) for row in rows[self._offset:end]]
+
+    def _project(self, row: Dict) -> Dict:
+        embeds = {name: columns for name, columns in _EMBED.findall(self._columns)}
+        columns = [c.strip() for c in _EMBED.sub("", self._columns).split(",") if c.strip()]
+        projected = dict(row) if "*" in columns else {c: row.get(c) for c in columns}
+        for name, embed_columns in embeds.items():
+            key = FOREIGN_KEYS[(self.table, name)]
+            wanted = [c.strip() for c in embed_columns.split(",") if c.strip()]
+            projected[name] = [
+                {c: child.get(c) for c in wanted} if wanted and "*" not in wanted else dict(child)
+                for child in self.db.rows(name) if child.get(key) == row["id"]
+            ]
+        return projected
+
+    def _new_row(self, row: Dict) -> Dict:
+        now = datetime.utcnow().isoformat()
+        return {"id": str(uuid.uuid4()), "created_at": now, **row}
+
+    def _insert(self) -> List[Dict]:
+        rows = [self._new_row(row) for row in _as_list(self._payload)]
+        self.db.rows(self.table).extend(rows)
+        return [dict(row) for row in rows]
+
+    def _upsert(self) -> List[Dict]:
+        keys = (self._on_conflict or "id").split(",")
+        table = self.db.rows(self.table)
+        written = []
+        for row in _as_list(self._payload):
+            existing = next(
+                (r for r in table if all(k in row and r.get(k) == row[k] for k in keys)), None
+            )
+            if existing is None:
+                existing = self._new_row(row)
+                table.append(existing)
+            else:
+                existing.update(row)
+            written.append(dict(existing))
+        return written
+
+    def _update(self) -> List[Dict]:
+        updated = []
+        for row in self.db.rows(self.table):
+            if self._matches(row):
+                row.update(self._payload)
+                updated.append(dict(row))
+        return updated
+
+    def _delete(self) -> List[Dict]:
+        table = self.db.rows(self.table)
+        deleted = [row for row in table if self._matches(row)]
+        table[:] = [row for row in table if not self._matches(row)]
+        return deleted
+
+
+def _split_terms(text: str) -> List[str]:
+    """Split on commas outside parentheses and double quotes"""
+    terms, current, depth, quoted = [], "", 0, False
+    for ch in text:
+        if ch == '"':
+            quoted = not quoted
+        elif not quoted and ch in "()":
+            depth += 1 if ch == "(" else -1
+        elif ch == "," and not quoted and depth == 0:
+            terms.append(current)
+            current = ""
+            continue
+        current += ch
+    terms.append(current)
+    return terms
+
+
+def _condition(term: str):
+    term = term.strip()
+    for name, combine in (("and", all), ("or", any)):
+        if term.startswith(name + "(") and term.endswith(")"):
+            return _logic_tree(combine, term[len(name) + 1:-1])
+    column, op, value = term.split(".", 2)
+    compare, value = _OPERATORS[op], value.strip('"')
+    return lambda row: row.get(column) is not None and compare(row.get(column), value)
+
+
+def _logic_tree(combine, text: str):
+    tests = [_condition(term) for term in _split_terms(text)]
+    return lambda row: combine(test(row) for test in tests)
+
+
+def _as_list(rows) -> List[Dict]:
+    return [dict(row) for row in (rows if isinstance(rows, list) else [rows])]
+
+
+class MemoryDatabase:
+    """
+    In-process stand-in for the Supabase client (SUPABASE_BACKEND=memory),
+    for offline development and benchmarks. Tables are plain lists of dicts.
+    """
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self._tables: Dict[str, List[Dict]] = {}
+
+    def rows(self, table: str) -> List[Dict]:
+        return self._tables.setdefault(table, [])
+
+    def table(self, name: str) -> MemoryQuery:
+        return MemoryQuery(self, name)
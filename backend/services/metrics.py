@@ -0,0 +1,260 @@
+import os
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, Counter, Histogram, generate_latest
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily, InfoMetricFamily
+
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+STAGE_SECONDS = Histogram(
+    "puresign_stage_seconds",
+    "Time spent in each pipeline stage (decode, detect, clean, verify, encode, upload, db_*)",
+    ["stage"],
+    buckets=LATENCY_BUCKETS,
+)
+BATCH_SIZE = Histogram(
+    "puresign_batch_size",
+    "Items per micro-batch, by model stage",
+    ["stage"],
+    buckets=(1, 2, 4, 8, 16, 32, 64),
+)
+BATCH_SECONDS = Histogram(
+    "puresign_batch_seconds",
+    "Time to run one micro-batch (model forward pass), by model stage",
+    ["stage"],
+    buckets=LATENCY_BUCKETS,
+)
+FALLBACKS = Counter(
+    "puresign_fallbacks_total",
+    "Pipeline fallbacks to placeholder outputs, by kind",
+    ["kind"],
+)
+HTTP_SECONDS = Histogram(
+    "puresign_http_request_seconds",
+    "HTTP request latency",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+DETECTION_MODE = Counter(
+    "puresign_detection_pages_total",
+    "Pages run through detection, by mode (full frame or tiled)",
+    ["mode"],
+)
+CLEANING_PATH = Counter(
+    "puresign_cleaning_total",
+    "Signature crops cleaned, by path (classical, gan, placeholder, none)",
+    ["path"],
+)
+VERIFICATIONS = Counter(
+    "puresign_verifications_total",
+    "Verified pages, by endpoint, outcome and whether the result came from the result cache",
+    ["endpoint", "status", "cached"],
+)
+CASCADE_EXITS = Counter(
+    "puresign_cascade_exits_total",
+    "Verifications ended early by the cascade, by the stage they exited after (detect, verify_fast)",
+    ["stage"],
+)
+CASCADE_SAVED_SECONDS = Counter(
+    "puresign_cascade_saved_seconds_total",
+    "Estimated time saved by cascade early exits, by exit stage",
+    ["stage"],
+)
+
+# Fallback kinds
+DETECT_ERROR = "detect_error"            # Detection failed; the whole page is used
+DETECT_CENTER_CROP = "detect_center_crop"  # Nothing detected; a center crop is used
+CLEAN_ERROR = "clean_error"              # Cleaning failed; the raw crop is used
+CLEAN_PLACEHOLDER = "clean_placeholder"  # No CycleGAN model; Otsu thresholding is used
+VERIFY_DEFAULT_SCORE = "verify_default_score"  # Verification failed; the 0.5 default score is used
+VERIFY_PLACEHOLDER = "verify_placeholder"      # No Siamese model; pixel difference is used
+
+_tracer = None
+_stage_observers: List[Callable[[str, float], None]] = []
+
+
+def setup_tracing():
+    """
+    Enable OpenTelemetry spans (OTEL_TRACING=1): one per request and one per
+    stage. Spans are exported over OTLP when the SDK and exporter are installed;
+    with only the API installed they go to whatever provider is configured.
+    """
+    global _tracer
+
+    if os.getenv("OTEL_TRACING", "0") != "1":
+        return
+    try:
+        from opentelemetry import trace
+    except ImportError:
+        print("Warning: opentelemetry-api not installed; tracing disabled")
+        return
+
+    try:
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+
+        provider = TracerProvider(resource=Resource.create({
+            "service.name": os.getenv("OTEL_SERVICE_NAME", "puresign-api")
+        }))
+        # The exporter reads OTEL_EXPORTER_OTLP_ENDPOINT and friends
+        provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+        trace.set_tracer_provider(provider)
+    except ImportError:
+        print("Warning: opentelemetry-sdk / OTLP exporter not installed; using the global tracer provider")
+    _tracer = trace.get_tracer("puresign")
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """An OpenTelemetry span, or nothing when tracing is off"""
+    if _tracer is None:
+        yield None
+        return
+    with _tracer.start_as_current_span(name, attributes=attributes) as current:
+        yield current
+
+
+@contextmanager
+def stage(name: str):
+    """Time a pipeline stage into puresign_stage_seconds (and a span when tracing)"""
+    started = time.perf_counter()
+    try:
+        with span(name):
+            yield
+    finally:
+        observe_stage(name, time.perf_counter() - started)
+
+
+def observe_stage(name: str, seconds: float):
+    STAGE_SECONDS.labels(name).observe(seconds)
+    for observer in _stage_observers:
+        observer(name, seconds)
+
+
+def add_stage_observer(observer: Callable[[str, float], None]):
+    """Also pass every stage timing to `observer` (benchmarks keep raw samples for exact percentiles)"""
+    _stage_observers.append(observer)
+
+
+def record_fallback(kind: str, count: int = 1):
+    FALLBACKS.labels(kind).inc(count)
+
+
+def record_batch(stage_name: str, size: int, seconds: float):
+    BATCH_SIZE.labels(stage_name).observe(size)
+    BATCH_SECONDS.labels(stage_name).observe(seconds)
+
+
+class StatsCollector:
+    """
+    Exposes the existing stats() counters (queues, executors, caches, index,
+    loaded models) at scrape time, so they are not counted twice.
+    """
+
+    def __init__(self, pipeline, write_behind, gates: Dict, executor_stats: Callable[[], Dict],
+                 caches: Optional[Dict] = None, job_queue=None):
+        self.pipeline = pipeline
+        self.write_behind = write_behind
+        self.gates = gates
+        self.executor_stats = executor_stats
+        self.caches = caches or {}
+        self.job_queue = job_queue
+
+    def describe(self):
+        # Collected lazily; nothing to check at registration
+        return []
+
+    def collect(self):
+        status = self.pipeline.load_status()
+        model = InfoMetricFamily("puresign_model", "Loaded model backend and precision")
+        model.add_metric([], {
+            "backend": status["backend"],
+            "precision": status["precision"],
+            "model_version": str(status.get("model_version") or ""),
+            "embedding_model": self.pipeline.embedding_model_tag(),
+        })
+        yield model
+        yield GaugeMetricFamily("puresign_models_ready", "1 once models are loaded", value=int(status["ready"]))
+
+        queue_depth = GaugeMetricFamily("puresign_batch_queue_depth", "Items waiting for a micro-batch", labels=["stage"])
+        for name, stats in self.pipeline.batching_stats().items():
+            queue_depth.add_metric([name], stats["queue_depth"])
+        yield queue_depth
+
+        pending = GaugeMetricFamily("puresign_executor_pending", "Tasks queued or running per pool", labels=["pool"])
+        rejected = CounterMetricFamily("puresign_executor_rejected", "Tasks rejected with 503", labels=["pool"])
+        replica_pending = GaugeMetricFamily(
+            "puresign_replica_pending", "Forward passes queued or running per model replica", labels=["replica", "cores"]
+        )
+        for name, stats in self.executor_stats().items():
+            pending.add_metric([name], stats["pending"])
+            rejected.add_metric([name], stats["rejected"])
+            for index, replica in enumerate(stats.get("replicas", [])):
+                replica_pending.add_metric([str(index), replica["cores"]], replica["pending"])
+        for name, gate in self.gates.items():
+            stats = gate.stats()
+            pending.add_metric([f"{name}_gate"], stats["in_flight"])
+            rejected.add_metric([f"{name}_gate"], stats["rejected"])
+        yield pending
+        yield rejected
+        yield replica_pending
+
+        queue = self.write_behind.stats()
+        yield GaugeMetricFamily("puresign_write_behind_depth", "Unwritten write-behind operations", value=queue["depth"])
+        yield GaugeMetricFamily(
+            "puresign_write_behind_lag_seconds", "Age of the oldest unwritten operation", value=queue["drain_lag_seconds"]
+        )
+        yield CounterMetricFamily("puresign_write_behind_retries", "Failed drain rounds", value=queue["retries"])
+        yield CounterMetricFamily(
+            "puresign_write_behind_dead_letters", "Rejected entries moved to the dead-letter file",
+            value=queue["dead_lettered"]
+        )
+
+        lookups = CounterMetricFamily("puresign_cache_lookups", "Cache lookups by result", labels=["cache", "result"])
+        entries = GaugeMetricFamily("puresign_cache_entries", "Entries held per cache", labels=["cache"])
+        caches = {"embedding": self.pipeline.embedding_cache, "result": self.pipeline.result_cache, **self.caches}
+        for name, cache in caches.items():
+            stats = cache.stats()
+            lookups.add_metric([name, "hit"], stats["hits"])
+            lookups.add_metric([name, "miss"], stats["misses"])
+            entries.add_metric([name], stats["entries"])
+        yield lookups
+        yield entries
+
+        if self.job_queue is not None:
+            # Queue depth is what inference workers scale on
+            jobs = GaugeMetricFamily("puresign_jobs", "Verification jobs per state", labels=["state"])
+            stats = self.job_queue.stats()
+            for state in ("queued", "running", "done", "failed"):
+                jobs.add_metric([state], stats[state])
+            yield jobs
+            yield GaugeMetricFamily(
+                "puresign_job_oldest_queued_seconds", "Age of the oldest queued job",
+                value=stats["oldest_queued_age_seconds"]
+            )
+
+        yield GaugeMetricFamily(
+            "puresign_index_profiles", "Profiles in the identification index", value=len(self.pipeline.embedding_index)
+        )
+
+
+_collector: Optional[StatsCollector] = None
+
+
+def register_stats_collector(pipeline, write_behind, gates: Dict, executor_stats: Callable[[], Dict],
+                             caches: Optional[Dict] = None, job_queue=None):
+    global _collector
+
+    if _collector is None:
+        _collector = StatsCollector(pipeline, write_behind, gates, executor_stats, caches, job_queue)
+        REGISTRY.register(_collector)
+
+
+def render() -> tuple:
+    """(body, content type) for the /metrics endpoint"""
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
@@ -0,0 +1,90 @@
+import os
+import numpy as np
+import torch
+from typing import Callable, Optional
+
+from services.replicas import replica_count
+
+
+SUPPORTED_BACKENDS = ("torch", "onnx", "torchscript")
+
+
+class ExportedModel:
+    """
+    Adapter giving an exported graph the same call surface the pipeline uses
+    for the eager models: `model(x)` and, for the Siamese embedding, `model.forward_one(x)`.
+    Inputs and outputs are torch tensors.
+    """
+
+    def __init__(self, name: str, run: Callable[[torch.Tensor], torch.Tensor]):
+        self.name = name
+        self._run = run
+
+    def __call__(self, x: torch.Tensor) -> torch.Tensor:
+        return self._run(x)
+
+    def forward_one(self, x: torch.Tensor) -> torch.Tensor:
+        return self._run(x)
+
+    def eval(self) -> "ExportedModel":
+        return self
+
+
+def onnx_session_options():
+    import onnxruntime as ort
+
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+    # 0 lets onnxruntime pick (one thread per physical core). With several
+    # inference replicas the default is 1: each run then stays on the calling
+    # replica's pinned thread instead of a pool shared by all replicas
+    default_intra = "1" if replica_count() > 1 else "0"
+    options.intra_op_num_threads = int(os.getenv("ONNX_INTRA_OP_THREADS", default_intra))
+    options.inter_op_num_threads = int(os.getenv("ONNX_INTER_OP_THREADS", "1"))
+    return options
+
+
+def load_onnx_model(path: str, device: torch.device) -> ExportedModel:
+    import onnxruntime as ort
+
+    providers = ["CPUExecutionProvider"]
+    if device.type == "cuda" and "CUDAExecutionProvider" in ort.get_available_providers():
+        providers.insert(0, "CUDAExecutionProvider")
+
+    session = ort.InferenceSession(path, sess_options=onnx_session_options(), providers=providers)
+    input_name = session.get_inputs()[0].name
+
+    def run(x: torch.Tensor) -> torch.Tensor:
+        inputs = np.ascontiguousarray(x.detach().cpu().numpy(), dtype=np.float32)
+        output = session.run(None, {input_name: inputs})[0]
+        return torch.from_numpy(output).to(device)
+
+    return ExportedModel(os.path.basename(path), run)
+
+
+def load_torchscript_model(path: str, device: torch.device, optimize: bool = True) -> ExportedModel:
+    module = torch.jit.load(path, map_location=device)
+    module.eval()
+    if optimize:
+        module = torch.jit.optimize_for_inference(module)
+
+    def run(x: torch.Tensor) -> torch.Tensor:
+        return module(x.to(device))
+
+    return ExportedModel(os.path.basename(path), run)
+
+
+def exported_model_path(export_dir: str, name: str, backend: str) -> str:
+    extension = "onnx" if backend == "onnx" else "torchscript"
+    return os.path.join(export_dir, f"{name}.{extension}")
+
+
+def load_exported_model(export_dir: str, name: str, backend: str, device: torch.device) -> Optional[ExportedModel]:
+    """Load `{name}.onnx` / `{name}.torchscript` from the export directory, or None if missing"""
+    path = exported_model_path(export_dir, name, backend)
+    if not os.path.exists(path):
+        return None
+    if backend == "onnx":
+        return load_onnx_model(path, device)
+    return load_torchscript_model(path, device)
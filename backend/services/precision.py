@@ -0,0 +1,72 @@
+import contextlib
+import copy
+import os
+import torch
+import torch.nn as nn
+from typing import Iterable, Optional
+
+from services.model_backends import ExportedModel, load_torchscript_model
+
+
+SUPPORTED_PRECISIONS = ("fp32", "int8_dynamic", "int8_static", "bf16")
+
+
+def quantize_dynamic_linear(model: nn.Module) -> nn.Module:
+    """Dynamic INT8 quantization of every nn.Linear (weights int8, activations quantized per batch)"""
+    return torch.ao.quantization.quantize_dynamic(copy.deepcopy(model), {nn.Linear}, dtype=torch.qint8)
+
+
+def _quantized_engine() -> str:
+    engines = torch.backends.quantized.supported_engines
+    return "x86" if "x86" in engines else ("fbgemm" if "fbgemm" in engines else "qnnpack")
+
+
+def prepare_static_int8(model: nn.Module, example: torch.Tensor) -> nn.Module:
+    """Insert observers for static INT8 quantization (FX graph mode); calibrate by running data through it"""
+    from torch.ao.quantization import get_default_qconfig_mapping
+    from torch.ao.quantization.quantize_fx import prepare_fx
+
+    engine = _quantized_engine()
+    torch.backends.quantized.engine = engine
+    model = copy.deepcopy(model).eval()
+    return prepare_fx(model, get_default_qconfig_mapping(engine), example_inputs=(example,))
+
+
+def convert_static_int8(prepared: nn.Module) -> nn.Module:
+    from torch.ao.quantization.quantize_fx import convert_fx
+
+    return convert_fx(prepared)
+
+
+def calibrate(prepared: nn.Module, batches: Iterable[torch.Tensor]):
+    with torch.no_grad():
+        for batch in batches:
+            prepared(batch)
+
+
+def static_int8_path(export_dir: str, name: str) -> str:
+    return os.path.join(export_dir, f"{name}.int8.torchscript")
+
+
+def save_static_int8(model: nn.Module, example: torch.Tensor, export_dir: str, name: str) -> str:
+    path = static_int8_path(export_dir, name)
+    with torch.no_grad():
+        torch.jit.save(torch.jit.trace(model, example), path)
+    return path
+
+
+def load_static_int8(export_dir: str, name: str) -> Optional[ExportedModel]:
+    """Load a calibrated INT8 graph from scripts/calibrate_int8.py, or None if missing"""
+    path = static_int8_path(export_dir, name)
+    if not os.path.exists(path):
+        return None
+    torch.backends.quantized.engine = _quantized_engine()
+    # Quantized kernels are CPU only; the graph is already frozen by tracing
+    return load_torchscript_model(path, torch.device("cpu"), optimize=False)
+
+
+def autocast(precision: str, device: torch.device):
+    """Context manager for the forward pass of the given precision mode"""
+    if precision == "bf16":
+        return torch.autocast(device_type=device.type, dtype=torch.bfloat16)
+    return contextlib.nullcontext()
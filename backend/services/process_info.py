@@ -0,0 +1,58 @@
+import os
+import resource
+import sys
+from typing import Dict, Optional
+
+
+def _read_proc_kb(path: str, fields) -> Dict[str, float]:
+    values = {}
+    try:
+        with open(path) as f:
+            for line in f:
+                key, _, rest = line.partition(":")
+                if key in fields:
+                    values[key] = float(rest.split()[0])
+    except OSError:
+        pass
+    return values
+
+
+def memory_usage() -> Dict[str, float]:
+    """
+    Memory of this process in MiB. On Linux, RSS is split into anonymous
+    (private to this worker) and file-backed pages; memory-mapped weights
+    count as file-backed and are shared with other workers on the host.
+    PSS divides shared pages between the processes mapping them, so summing
+    PSS over workers gives their real footprint.
+    """
+    status = _read_proc_kb("/proc/self/status", ("VmRSS", "VmHWM", "RssAnon", "RssFile", "RssShmem"))
+    if not status:
+        # ru_maxrss is KiB on Linux, bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return {"peak_rss_mb": round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)}
+
+    usage = {
+        "rss_mb": status.get("VmRSS", 0.0),
+        "peak_rss_mb": status.get("VmHWM", 0.0),
+        "rss_anon_mb": status.get("RssAnon", 0.0),
+        "rss_file_mb": status.get("RssFile", 0.0),
+        "rss_shmem_mb": status.get("RssShmem", 0.0),
+    }
+    pss = _read_proc_kb("/proc/self/smaps_rollup", ("Pss",))
+    if pss:
+        usage["pss_mb"] = pss["Pss"]
+    return {key: round(value / 1024, 1) for key, value in usage.items()}
+
+
+def process_uptime() -> Optional[float]:
+    """Seconds since this process started (Linux only)"""
+    try:
+        with open("/proc/self/stat") as f:
+            # The command name may contain spaces; fields resume after its ')'
+            fields = f.read().rsplit(")", 1)[1].split()
+        with open("/proc/uptime") as f:
+            system_uptime = float(f.read().split()[0])
+    except (OSError, IndexError, ValueError):
+        return None
+    started_ticks = int(fields[19])
+    return round(system_uptime - started_ticks / os.sysconf("SC_CLK_TCK"), 2)
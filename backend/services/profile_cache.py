@@ -0,0 +1,74 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+
+class ProfileCache:
+    """
+    Short-TTL LRU cache of profile rows (with their reference signatures),
+    so /verify and the dashboard do not hit the database for the same
+    profile on every request. Writes through this process invalidate the
+    entry; writes elsewhere are picked up once it expires.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 30.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[float, Dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @classmethod
+    def from_env(cls) -> "ProfileCache":
+        return cls(
+            max_entries=int(os.getenv("PROFILE_CACHE_SIZE", "1024")),
+            ttl_seconds=float(os.getenv("PROFILE_CACHE_TTL", "30")),
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.ttl_seconds > 0
+
+    def get(self, profile_id: str) -> Optional[Dict]:
+        with self._lock:
+            entry = self._entries.get(profile_id)
+            if entry is not None:
+                stored_at, profile = entry
+                if time.monotonic() - stored_at <= self.ttl_seconds:
+                    self._entries.move_to_end(profile_id)
+                    self.hits += 1
+                    return profile
+                del self._entries[profile_id]
+            self.misses += 1
+            return None
+
+    def put(self, profile_id: str, profile: Dict):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._entries[profile_id] = (time.monotonic(), profile)
+            self._entries.move_to_end(profile_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, profile_id: str):
+        with self._lock:
+            if self._entries.pop(profile_id, None) is not None:
+                self.invalidations += 1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+            }
@@ -0,0 +1,47 @@
+import numpy as np
+from typing import Dict, List, Optional
+
+
+SUPPORTED_AGGREGATIONS = ("max", "mean", "template")
+
+# Columns of reference_signatures loaded together with a profile
+PROFILE_WITH_REFERENCES = "*, reference_signatures(id,profile_id,sig_url,embedding,embedding_model,created_at)"
+
+
+def reference_set(profile: Dict) -> List[Dict]:
+    """A profile's reference signatures; profiles from before multi-reference have only reference_sig_url"""
+    references = profile.get("reference_signatures") or []
+    return references or [{"sig_url": profile["reference_sig_url"]}]
+
+
+def legacy_reference_row(profile: Dict) -> Optional[Dict]:
+    """
+    A reference_signatures row for the profile's reference_sig_url, if the
+    profile has no rows yet (created before multi-reference, or outside the API)
+    """
+    if profile.get("reference_signatures") or not profile.get("reference_sig_url"):
+        return None
+    return {"profile_id": profile["id"], "sig_url": profile["reference_sig_url"]}
+
+
+def encode_embedding(embedding: np.ndarray) -> str:
+    """Compact bytea literal for a stored embedding (float16, little-endian)"""
+    return "\\x" + np.asarray(embedding, dtype="<f2").reshape(-1).tobytes().hex()
+
+
+def decode_embedding(value: Optional[str]) -> Optional[np.ndarray]:
+    if not value:
+        return None
+    # PostgREST returns bytea as a \x-prefixed hex string
+    data = bytes.fromhex(value[2:] if value.startswith("\\x") else value)
+    return np.frombuffer(data, dtype="<f2").astype(np.float32)
+
+
+def public_reference(reference: Dict) -> Dict:
+    """A reference as returned by the API (without the embedding bytes)"""
+    return {
+        "id": reference.get("id"),
+        "sig_url": reference["sig_url"],
+        "created_at": reference.get("created_at"),
+        "embedding_model": reference.get("embedding_model"),
+    }
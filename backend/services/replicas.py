@@ -0,0 +1,189 @@
+import asyncio
+import itertools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Dict, List, Optional
+
+from services.executor import QueueFullError
+
+
+_local = threading.local()
+
+
+def parse_cores(spec: str) -> List[int]:
+    """CPU list in the taskset/cpuset format, e.g. "0-3,8,10-11\""""
+    cores = []
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "-" in part:
+            first, last = part.split("-", 1)
+            cores.extend(range(int(first), int(last) + 1))
+        else:
+            cores.append(int(part))
+    return sorted(set(cores))
+
+
+def format_cores(cores: List[int]) -> str:
+    return ",".join(str(core) for core in cores)
+
+
+def available_cores() -> List[int]:
+    """Cores this process may run on: PURESIGN_CORES if set, else its affinity"""
+    spec = os.getenv("PURESIGN_CORES")
+    if spec:
+        return parse_cores(spec)
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def pin_process_from_env():
+    """
+    Restrict the whole process to PURESIGN_CORES, if set (Linux), with as
+    many torch threads as it has cores
+    """
+    spec = os.getenv("PURESIGN_CORES")
+    if not spec:
+        return
+    import torch
+
+    cores = parse_cores(spec)
+    if hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cores)
+    torch.set_num_threads(len(cores))
+
+
+def split_cores(cores: List[int], parts: int) -> List[List[int]]:
+    """Split cores into `parts` contiguous sets of near-equal size"""
+    parts = max(1, min(parts, len(cores)))
+    size, extra = divmod(len(cores), parts)
+    sets, start = [], 0
+    for i in range(parts):
+        end = start + size + (1 if i < extra else 0)
+        sets.append(cores[start:end])
+        start = end
+    return sets
+
+
+def replica_count() -> int:
+    """INFERENCE_REPLICAS: a number, or "auto" for one per available core"""
+    value = os.getenv("INFERENCE_REPLICAS", "1")
+    if value == "auto":
+        return len(available_cores())
+    return max(1, int(value))
+
+
+def current_replica() -> Optional[int]:
+    """Index of the replica whose thread is running this code, or None off the replica lanes"""
+    return getattr(_local, "replica", None)
+
+
+def _init_lane(index: int, cores: List[int], threads: int):
+    import torch
+
+    _local.replica = index
+    # On Linux, pid 0 is the calling thread: the lane and the OpenMP
+    # workers it starts stay on the replica's cores
+    if hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cores)
+    torch.set_num_threads(threads)
+
+
+class ReplicaExecutor:
+    """
+    Inference executor with one lane per model replica, for spreading
+    forward passes across all cores.
+
+    Each lane is a single thread pinned to its own core set, running torch
+    with as many intra-op threads as it has cores, so replicas never compete
+    for a core (or with the event loop, when cores are left for it). Work
+    goes to the lane with the fewest pending calls. Same interface as
+    BoundedExecutor: once `max_pending` calls are waiting, `run` raises
+    QueueFullError.
+    """
+
+    def __init__(self, name: str, core_sets: List[List[int]], max_pending: int,
+                 threads_per_replica: Optional[int] = None):
+        self.name = name
+        self.core_sets = core_sets
+        self.max_pending = max(len(core_sets), max_pending)
+        self._lanes = [
+            ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix=f"{name}-{i}", initializer=_init_lane,
+                initargs=(i, cores, threads_per_replica or len(cores)),
+            )
+            for i, cores in enumerate(core_sets)
+        ]
+        self.threads_per_replica = threads_per_replica
+        self._lock = threading.Lock()
+        self._pending = [0] * len(self._lanes)
+        self._completed = [0] * len(self._lanes)
+        self._round_robin = itertools.count()
+        self.rejected = 0
+
+    @classmethod
+    def from_env(cls, name: str, replicas: int, default_pending: int) -> "ReplicaExecutor":
+        """
+        Split the process's cores (PURESIGN_CORES, or its affinity) across
+        `replicas`, keeping INFERENCE_RESERVED_CORES for the event loop and
+        CPU pool when there are enough to spare
+        """
+        cores = available_cores()
+        reserved = int(os.getenv("INFERENCE_RESERVED_CORES", "0"))
+        if 0 < reserved <= len(cores) - replicas:
+            cores = cores[reserved:]
+        threads = os.getenv("INFERENCE_THREADS_PER_REPLICA")
+        return cls(
+            name,
+            split_cores(cores, replicas),
+            max_pending=int(os.getenv(f"{name.upper()}_MAX_PENDING", str(default_pending))),
+            threads_per_replica=int(threads) if threads else None,
+        )
+
+    @property
+    def replicas(self) -> int:
+        return len(self._lanes)
+
+    def _pick_lane(self) -> int:
+        least = min(self._pending)
+        candidates = [i for i, pending in enumerate(self._pending) if pending == least]
+        # Spread ties so idle replicas all get used
+        return candidates[next(self._round_robin) % len(candidates)]
+
+    async def run(self, fn: Callable, *args, **kwargs) -> Any:
+        with self._lock:
+            if sum(self._pending) >= self.max_pending:
+                self.rejected += 1
+                raise QueueFullError(self.name)
+            lane = self._pick_lane()
+            self._pending[lane] += 1
+
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._lanes[lane], partial(fn, *args, **kwargs))
+        finally:
+            with self._lock:
+                self._pending[lane] -= 1
+                self._completed[lane] += 1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "workers": len(self._lanes),
+                "max_pending": self.max_pending,
+                "pending": sum(self._pending),
+                "completed": sum(self._completed),
+                "rejected": self.rejected,
+                "replicas": [
+                    {"cores": format_cores(cores), "pending": pending, "completed": completed}
+                    for cores, pending, completed in zip(self.core_sets, self._pending, self._completed)
+                ],
+            }
+
+    def shutdown(self, wait: bool = True):
+        for lane in self._lanes:
+            lane.shutdown(wait=wait)
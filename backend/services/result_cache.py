@@ -0,0 +1,128 @@
+import asyncio
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+
+class ResultCache:
+    """
+    Bounded LRU + TTL cache of pipeline results for repeated documents.
+
+    Entries are keyed on a hash of the document bytes, the reference signature
+    (profile id, URL, version) and the model version, and hold everything needed
+    to answer again without inference: detection boxes, scores and the encoded
+    detected/cleaned crops. Concurrent requests for the same key share one
+    computation.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 3600.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[float, Dict]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @classmethod
+    def from_env(cls) -> "ResultCache":
+        return cls(
+            max_entries=int(os.getenv("RESULT_CACHE_SIZE", "1024")),
+            ttl_seconds=float(os.getenv("RESULT_CACHE_TTL", "3600")),
+        )
+
+    @staticmethod
+    def make_key(content_hash: str, profile_id: Optional[str], reference_sig_url: str,
+                 reference_version: Optional[str], model_version: str) -> str:
+        parts = (content_hash, profile_id or "", reference_sig_url, reference_version or "", model_version)
+        return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.ttl_seconds > 0
+
+    def get(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                stored_at, result = entry
+                if time.monotonic() - stored_at <= self.ttl_seconds:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return result
+                del self._entries[key]
+                self.expirations += 1
+            self.misses += 1
+            return None
+
+    def put(self, key: str, result: Dict) -> bool:
+        # Results where a stage failed and used a placeholder are not reused
+        if not self.enabled or result.get("fallbacks"):
+            return False
+        with self._lock:
+            self._entries[key] = (time.monotonic(), result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return True
+
+    async def get_or_compute(self, key: str, compute: Callable[[], Awaitable[Dict]]) -> Tuple[Dict, bool]:
+        """
+        Return (result, cached). On a miss, `compute` runs once even if several
+        requests for the same key arrive together; the others wait for it and
+        count as cached. If it fails (or its result is not cacheable), each
+        waiter computes on its own.
+        """
+        cached = self.get(key)
+        if cached is not None:
+            return cached, True
+
+        pending = self._inflight.get(key)
+        if pending is not None:
+            result = await asyncio.shield(pending)
+            if result is not None:
+                with self._lock:
+                    self.coalesced += 1
+                return result, True
+            return await compute(), False
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await compute()
+        except BaseException:
+            # Waiters fall back to computing themselves
+            future.set_result(None)
+            raise
+        else:
+            future.set_result(result if self.put(key, result) else None)
+            return result, False
+        finally:
+            self._inflight.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "inflight": len(self._inflight),
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+            }
@@ -1,44 +1,210 @@
-from supabase import Client
-from services.supabase_client import get_supabase_client
-from io import BytesIO
+import aiofiles
+import aiofiles.os
+import asyncio
+import httpx
+import mimetypes
 import os
-import requests
-from typing import Optional
+import random
+import uuid
+from typing import List, Optional, Tuple
+from urllib.parse import quote, unquote
+
+from services import metrics
+
+
+def guess_content_type(file_content: bytes, file_path: str) -> str:
+    """Content type from the file's magic bytes, falling back to its extension"""
+    if file_content[:3] == b"\xff\xd8\xff":
+        return "image/jpeg"
+    if file_content[:8] == b"\x89PNG\r\n\x1a\n":
+        return "image/png"
+    if file_content[:4] in (b"II*\x00", b"MM\x00*"):
+        return "image/tiff"
+    if file_content[:4] == b"%PDF":
+        return "application/pdf"
+    if file_content[:4] == b"PK\x03\x04":
+        return "application/zip"
+    if file_content[:4] == b"RIFF" and file_content[8:12] == b"WEBP":
+        return "image/webp"
+    guessed, _ = mimetypes.guess_type(file_path)
+    return guessed or "application/octet-stream"
+
+
+def content_addressed_path(prefix: str, content_hash: str, extension: str = "") -> str:
+    """`{prefix}/{sha256}{extension}`: identical files map to one object"""
+    return f"{prefix}/{content_hash}{extension.lower()}"
+
+
+class RetryableStorageError(Exception):
+    """Transient storage failure (connection error, 429 or 5xx)"""
+
+
+class SupabaseStorageBackend:
+    """Supabase Storage over its REST API with a pooled keep-alive HTTP client"""
+
+    def __init__(self, client: httpx.AsyncClient, supabase_url: str, supabase_key: str, bucket_name: str):
+        self.client = client
+        self.base_url = f"{supabase_url.rstrip('/')}/storage/v1"
+        self.bucket_name = bucket_name
+        self.headers = {"apikey": supabase_key, "Authorization": f"Bearer {supabase_key}"}
+
+    def public_url(self, file_path: str) -> str:
+        return f"{self.base_url}/object/public/{self.bucket_name}/{quote(file_path)}"
+
+    async def upload(self, file_content: bytes, file_path: str, content_type: str):
+        response = await self.client.post(
+            f"{self.base_url}/object/{self.bucket_name}/{quote(file_path)}",
+            content=file_content,
+            headers={**self.headers, "content-type": content_type, "x-upsert": "true"},
+        )
+        _raise_for_status(response)
+
+    async def download(self, file_path: str) -> bytes:
+        response = await self.client.get(
+            f"{self.base_url}/object/{self.bucket_name}/{quote(file_path)}",
+            headers=self.headers,
+        )
+        _raise_for_status(response)
+        return response.content
+
+
+class LocalStorageBackend:
+    """Filesystem stand-in for Supabase Storage, for offline development and benchmarks"""
+
+    def __init__(self, root_dir: str, public_base_url: Optional[str] = None):
+        self.root_dir = os.path.abspath(root_dir)
+        self.public_base_url = (public_base_url or f"file://{self.root_dir}").rstrip("/")
+        os.makedirs(self.root_dir, exist_ok=True)
+
+    def _local_path(self, file_path: str) -> str:
+        path = os.path.abspath(os.path.join(self.root_dir, file_path))
+        if not path.startswith(self.root_dir + os.sep):
+            raise ValueError(f"Invalid storage path: {file_path}")
+        return path
+
+    def public_url(self, file_path: str) -> str:
+        return f"{self.public_base_url}/{quote(file_path)}"
+
+    def path_from_url(self, file_url: str) -> Optional[str]:
+        prefix = f"{self.public_base_url}/"
+        return unquote(file_url[len(prefix):]) if file_url.startswith(prefix) else None
+
+    async def upload(self, file_content: bytes, file_path: str, content_type: str):
+        path = self._local_path(file_path)
+        await aiofiles.os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Unique per upload: concurrent uploads of one path must not share a temp file
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        try:
+            async with aiofiles.open(tmp_path, "wb") as f:
+                await f.write(file_content)
+            await aiofiles.os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                await aiofiles.os.remove(tmp_path)
+            except FileNotFoundError:
+                pass
+            raise
+
+    async def download(self, file_path: str) -> bytes:
+        async with aiofiles.open(self._local_path(file_path), "rb") as f:
+            return await f.read()
+
+
+def _raise_for_status(response: httpx.Response):
+    if response.status_code == 429 or response.status_code >= 500:
+        raise RetryableStorageError(f"HTTP {response.status_code}: {response.text[:200]}")
+    response.raise_for_status()
 
 
 class StorageService:
     def __init__(self):
-        self.supabase: Client = get_supabase_client()
         self.bucket_name = os.getenv("SUPABASE_STORAGE_BUCKET", "puresign-storage")
+        self.max_retries = int(os.getenv("STORAGE_MAX_RETRIES", "3"))
+        self.retry_base_delay = float(os.getenv("STORAGE_RETRY_BASE_DELAY", "0.2"))
 
-    async def upload_file(self, file_content: bytes, file_path: str) -> str:
-        """Upload file to Supabase Storage and return public URL"""
-        try:
-            # Upload to Supabase Storage
-            response = self.supabase.storage.from_(self.bucket_name).upload(
-                file_path,
-                file_content,
-                file_options={"content-type": "image/jpeg", "upsert": "true"}
+        # One pooled keep-alive client for all storage and reference downloads
+        self.client = httpx.AsyncClient(
+            timeout=float(os.getenv("STORAGE_TIMEOUT", "30")),
+            limits=httpx.Limits(
+                max_connections=int(os.getenv("STORAGE_MAX_CONNECTIONS", "64")),
+                max_keepalive_connections=int(os.getenv("STORAGE_MAX_KEEPALIVE", "16")),
+            ),
+            follow_redirects=True,
+        )
+
+        backend = os.getenv("STORAGE_BACKEND", "supabase")
+        if backend == "local":
+            self.backend = LocalStorageBackend(
+                os.getenv("LOCAL_STORAGE_DIR", "storage"),
+                os.getenv("LOCAL_STORAGE_PUBLIC_URL"),
             )
-            
-            # Get public URL
-            public_url = self.supabase.storage.from_(self.bucket_name).get_public_url(file_path)
-            return public_url
+        elif backend == "supabase":
+            supabase_url = os.getenv("SUPABASE_URL")
+            supabase_key = os.getenv("SUPABASE_ANON_KEY")
+            if not supabase_url or not supabase_key:
+                raise ValueError("SUPABASE_URL and SUPABASE_ANON_KEY must be set in environment variables")
+            self.backend = SupabaseStorageBackend(self.client, supabase_url, supabase_key, self.bucket_name)
+        else:
+            raise ValueError(f"Unknown STORAGE_BACKEND: {backend}")
+
+    async def _with_retries(self, operation, *args):
+        """Retry transient failures with exponential backoff and full jitter"""
+        for attempt in range(self.max_retries + 1):
+            try:
+                return await operation(*args)
+            except (RetryableStorageError, httpx.TransportError):
+                if attempt == self.max_retries:
+                    raise
+                await asyncio.sleep(random.uniform(0, self.retry_base_delay * (2 ** attempt)))
+
+    def public_url(self, file_path: str) -> str:
+        """Public URL a file will have once uploaded (no network call)"""
+        return self.backend.public_url(file_path)
+
+    async def upload_file(self, file_content: bytes, file_path: str, content_type: Optional[str] = None) -> str:
+        """Upload file to storage and return public URL"""
+        try:
+            content_type = content_type or guess_content_type(file_content, file_path)
+            with metrics.stage("upload"):
+                await self._with_retries(self.backend.upload, file_content, file_path, content_type)
+            return self.backend.public_url(file_path)
         except Exception as e:
-            raise Exception(f"Failed to upload file: {str(e)}")
+            raise Exception(f"Failed to upload file: {str(e)}") from e
+
+    async def upload_many(self, files: List[Tuple[bytes, str]], max_concurrency: int = 8) -> List[str]:
+        """Upload several (content, path) pairs concurrently and return their public URLs in order"""
+        semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+        async def upload_one(file_content: bytes, file_path: str) -> str:
+            async with semaphore:
+                return await self.upload_file(file_content, file_path)
+
+        return await asyncio.gather(*(upload_one(content, path) for content, path in files))
 
     async def download_file(self, file_url: str) -> bytes:
-        """Download file from URL (handles both Supabase Storage URLs and external URLs)"""
+        """Download file from URL (handles both storage URLs/paths and external URLs)"""
+        with metrics.stage("download"):
+            return await self._download(file_url)
+
+    async def _download(self, file_url: str) -> bytes:
         try:
+            if isinstance(self.backend, LocalStorageBackend):
+                local_path = self.backend.path_from_url(file_url)
+                if local_path is not None:
+                    return await self.backend.download(local_path)
+
             # If it's already a full URL, download directly
             if file_url.startswith('http://') or file_url.startswith('https://'):
-                response = requests.get(file_url)
-                response.raise_for_status()
-                return response.content
-            
-            # Otherwise, treat as Supabase Storage path
-            response = self.supabase.storage.from_(self.bucket_name).download(file_url)
-            return response
+                async def fetch() -> bytes:
+                    response = await self.client.get(file_url)
+                    _raise_for_status(response)
+                    return response.content
+                return await self._with_retries(fetch)
+
+            # Otherwise, treat as a storage path
+            return await self._with_retries(self.backend.download, file_url)
         except Exception as e:
-            raise Exception(f"Failed to download file: {str(e)}")
+            raise Exception(f"Failed to download file: {str(e)}") from e
 
+    async def close(self):
+        await self.client.aclose()
@@ -10,6 +10,12 @@ def get_supabase_client() -> Client:
     global _supabase_client
     
     if _supabase_client is None:
+        if os.getenv("SUPABASE_BACKEND", "supabase") == "memory":
+            # In-process stand-in for offline development and benchmarks
+            from services.memory_db import MemoryDatabase
+            _supabase_client = MemoryDatabase()
+            return _supabase_client
+
         supabase_url = os.getenv("SUPABASE_URL")
         supabase_key = os.getenv("SUPABASE_ANON_KEY")
         
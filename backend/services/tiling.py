@@ -0,0 +1,78 @@
+from typing import List, Sequence, Tuple
+
+import torch
+from torchvision.ops import box_iou, nms
+
+
+DETECTION_MODES = ("full", "tiled", "adaptive")
+
+Box = Tuple[int, int, int, int]
+Window = Tuple[int, int, int, int]  # x, y, width, height
+Detection = Tuple[Box, float]
+
+
+def _starts(length: int, tile: int, stride: int) -> List[int]:
+    if length <= tile:
+        return [0]
+    starts = list(range(0, length - tile, stride))
+    # The last window sits flush with the edge rather than running past it
+    starts.append(length - tile)
+    return starts
+
+
+def tile_windows(width: int, height: int, tile: int, overlap: float) -> List[Window]:
+    """Overlapping square windows covering a width x height image, row by row"""
+    stride = max(1, int(tile * (1.0 - overlap)))
+    return [
+        (x, y, min(tile, width), min(tile, height))
+        for y in _starts(height, tile, stride)
+        for x in _starts(width, tile, stride)
+    ]
+
+
+def merge_tile_detections(per_window: Sequence[List[Detection]], windows: Sequence[Window],
+                          iou_threshold: float, contain_threshold: float,
+                          max_detections: int) -> List[Detection]:
+    """
+    Shift each window's boxes into page coordinates and merge them across
+    windows: class-agnostic NMS, then drop boxes that lie mostly inside a
+    stronger box (a signature cut by a window edge leaves such fragments,
+    whose IoU with the whole box is too low for NMS to catch). Best first.
+    """
+    boxes, scores = [], []
+    for detections, (x, y, _, _) in zip(per_window, windows):
+        for (x1, y1, x2, y2), conf in detections:
+            boxes.append((x1 + x, y1 + y, x2 + x, y2 + y))
+            scores.append(conf)
+    if not boxes:
+        return []
+
+    xyxy = torch.tensor(boxes, dtype=torch.float32)
+    conf = torch.tensor(scores, dtype=torch.float32)
+    keep = nms(xyxy, conf, iou_threshold)
+    xyxy, conf = xyxy[keep], conf[keep]
+
+    if len(xyxy) > 1:
+        # Intersection over each box's own area, against every stronger box
+        areas = ((xyxy[:, 2] - xyxy[:, 0]) * (xyxy[:, 3] - xyxy[:, 1])).clamp(min=1.0)
+        lt = torch.max(xyxy[:, None, :2], xyxy[None, :, :2])
+        rb = torch.min(xyxy[:, None, 2:], xyxy[None, :, 2:])
+        inter = (rb - lt).clamp(min=0).prod(dim=2)
+        # Rows are sorted by confidence, so "stronger" is "earlier"
+        index = torch.arange(len(xyxy))
+        stronger = index[None, :] < index[:, None]
+        contained = (((inter / areas[:, None]) >= contain_threshold) & stronger).any(dim=1)
+        xyxy, conf = xyxy[~contained], conf[~contained]
+
+    xyxy = xyxy[:max_detections].round().int().tolist()
+    return [(tuple(box), float(c)) for box, c in zip(xyxy, conf[:max_detections].tolist())]
+
+
+def detection_recall(predicted: Sequence[Box], truth: Sequence[Box], iou_threshold: float = 0.5) -> float:
+    """Share of ground-truth boxes matched by a prediction with IoU >= iou_threshold"""
+    if not truth:
+        return 1.0
+    if not predicted:
+        return 0.0
+    iou = box_iou(torch.tensor(truth, dtype=torch.float32), torch.tensor(predicted, dtype=torch.float32))
+    return float((iou.max(dim=1).values >= iou_threshold).float().mean())
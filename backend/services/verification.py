@@ -0,0 +1,59 @@
+import hashlib
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import numpy as np
+
+from services import metrics
+from services.calibration import get_calibration
+from services.executor import run_blocking
+from services.profile_cache import ProfileCache
+from services.references import PROFILE_WITH_REFERENCES, encode_embedding
+from services.storage_service import content_addressed_path
+from services.supabase_client import get_supabase_client
+
+
+def verification_status(confidence_score: float) -> str:
+    # The minimum score for a success is calibrated (VERIFY_THRESHOLD / CALIBRATION_PATH)
+    return "success" if confidence_score >= get_calibration().threshold else "failed"
+
+
+def artifact_uploads(result: Dict) -> List[Dict]:
+    """Upload operations for the detected and cleaned crops of a result"""
+    operations = []
+    for kind, key in (("detected", "detected_sig"), ("cleaned", "cleaned_sig")):
+        if result.get(key):
+            operations.append({
+                "op": "upload",
+                "kind": kind,
+                "path": content_addressed_path(kind, hashlib.sha256(result[key]).hexdigest(), ".jpg"),
+                "content": result[key],
+                "content_type": "image/jpeg"
+            })
+    return operations
+
+
+async def fetch_profile(user_id: str) -> Optional[Dict]:
+    """A profile with its reference signatures, straight from the database"""
+    supabase = get_supabase_client()
+    with metrics.stage("db_read"):
+        response = await run_blocking(
+            supabase.table("profiles").select(PROFILE_WITH_REFERENCES).eq("id", user_id).execute
+        )
+    return response.data[0] if response.data else None
+
+
+def reference_embedding_writer(profile_cache: ProfileCache) -> Callable[[Dict, np.ndarray, str], Awaitable[None]]:
+    """Callback that stores a recomputed reference embedding with its row (InferencePipeline.on_reference_embedded)"""
+    async def write(reference: Dict, embedding: np.ndarray, model_tag: str):
+        supabase = get_supabase_client()
+        with metrics.stage("db_write"):
+            await run_blocking(
+                supabase.table("reference_signatures")
+                .update({"embedding": encode_embedding(embedding), "embedding_model": model_tag})
+                .eq("id", reference["id"]).execute
+            )
+        # Cached profiles still carry the old embedding
+        if reference.get("profile_id"):
+            profile_cache.invalidate(reference["profile_id"])
+
+    return write
@@ -0,0 +1,367 @@
+import asyncio
+import json
+import os
+import random
+import shutil
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional
+
+import httpx
+from postgrest.exceptions import APIError
+
+from services import metrics
+from services.executor import run_blocking
+from services.storage_service import RetryableStorageError, StorageService
+from services.supabase_client import get_supabase_client
+
+
+class WriteBehindQueue:
+    """
+    Durable, ordered write-behind queue for verification records and artifact uploads.
+
+    Every operation is appended (and fsynced) to a local journal before `enqueue`
+    returns, with artifact bytes spooled next to it, so nothing is lost if the
+    process dies. A background task drains operations strictly in journal order,
+    coalescing consecutive uploads into one concurrent round and consecutive
+    record writes into one bulk upsert. Failed rounds are retried and never
+    skipped; a checkpoint records the last applied sequence number and the
+    journal is replayed from there on startup. Both operation types are
+    idempotent (upsert), so replaying an already-applied entry is harmless.
+
+    Connection errors, transient storage errors and PostgREST outages (5xx,
+    connection and resource errors) are retried indefinitely.
+    A round rejected outright (e.g. a row the database refuses) `max_attempts`
+    times is retried one entry at a time to find the entry at fault, which is
+    then moved to a dead-letter file (`dead_letter.log`, blobs under
+    `dead_letter/`) so it stops blocking everything queued behind it.
+
+    Operations:
+    - {"op": "upload", "path": ..., "blob": <spool file>, "content_type": ...}
+    - {"op": "upsert_verification", "row": {...}}
+    """
+
+    def __init__(self, storage_service: StorageService, journal_dir: str = "journal",
+                 batch_size: int = 100, flush_interval_ms: float = 50.0, fsync: bool = True,
+                 max_attempts: int = 10):
+        self.storage_service = storage_service
+        self.journal_dir = journal_dir
+        self.blob_dir = os.path.join(journal_dir, "blobs")
+        self.journal_path = os.path.join(journal_dir, "journal.log")
+        self.checkpoint_path = os.path.join(journal_dir, "checkpoint")
+        self.dead_letter_path = os.path.join(journal_dir, "dead_letter.log")
+        self.dead_letter_blob_dir = os.path.join(journal_dir, "dead_letter")
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval_ms / 1000.0
+        self.fsync = fsync
+        self.max_attempts = max(1, max_attempts)
+
+        self._pending: Deque[Dict] = deque()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._journal_lock: Optional[asyncio.Lock] = None
+        self._drainer: Optional[asyncio.Task] = None
+        self._stopping = False
+        self._next_seq = 1
+        self._applied_seq = 0
+        # Entries still to be applied one at a time while looking for a rejected one
+        self._isolating = 0
+
+        self.applied = 0
+        self.retries = 0
+        self.last_error: Optional[str] = None
+        self.last_drain_at: Optional[float] = None
+        self.dead_lettered = 0
+        self.last_dead_letter: Optional[Dict] = None
+
+        os.makedirs(self.blob_dir, exist_ok=True)
+
+    @classmethod
+    def from_env(cls, storage_service: StorageService) -> "WriteBehindQueue":
+        return cls(
+            storage_service,
+            journal_dir=os.getenv("WRITE_BEHIND_DIR", "journal"),
+            batch_size=int(os.getenv("WRITE_BEHIND_BATCH_SIZE", "100")),
+            flush_interval_ms=float(os.getenv("WRITE_BEHIND_FLUSH_MS", "50")),
+            fsync=os.getenv("WRITE_BEHIND_FSYNC", "1") == "1",
+            max_attempts=int(os.getenv("WRITE_BEHIND_MAX_ATTEMPTS", "10")),
+        )
+
+    # Journal
+
+    def _write_file(self, path: str, data: bytes):
+        with open(path, "wb") as f:
+            f.write(data)
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+
+    def _copy_file(self, path: str, source_path: str):
+        with open(source_path, "rb") as src, open(path, "wb") as f:
+            shutil.copyfileobj(src, f)
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+
+    def _append_journal(self, entries: List[Dict], blobs: List[tuple]):
+        for blob_path, content, source_path in blobs:
+            if source_path is not None:
+                self._copy_file(blob_path, source_path)
+            else:
+                self._write_file(blob_path, content)
+        with open(self.journal_path, "ab") as f:
+            for entry in entries:
+                f.write((json.dumps(entry) + "\n").encode("utf-8"))
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+
+    def _write_checkpoint(self, seq: int):
+        tmp_path = f"{self.checkpoint_path}.tmp"
+        self._write_file(tmp_path, str(seq).encode("ascii"))
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def _replay(self) -> List[Dict]:
+        """Read every journaled entry after the checkpoint"""
+        if os.path.exists(self.checkpoint_path):
+            with open(self.checkpoint_path) as f:
+                self._applied_seq = int(f.read().strip() or 0)
+        self._next_seq = self._applied_seq + 1
+
+        entries = []
+        if not os.path.exists(self.journal_path):
+            return entries
+
+        with open(self.journal_path, "rb") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # Torn final write from a crash; it was never acknowledged
+                    print("Warning: skipping truncated write-behind journal entry")
+                    break
+                self._next_seq = max(self._next_seq, entry["seq"] + 1)
+                if entry["seq"] > self._applied_seq:
+                    entries.append(entry)
+        return entries
+
+    def _compact(self):
+        """Truncate the journal once everything in it has been applied"""
+        with open(self.journal_path, "wb") as f:
+            if self.fsync:
+                os.fsync(f.fileno())
+
+    # Lifecycle
+
+    async def start(self):
+        self._wakeup = asyncio.Event()
+        self._journal_lock = asyncio.Lock()
+        self._stopping = False
+
+        replayed = await run_blocking(self._replay)
+        self._pending.extend(replayed)
+        if replayed:
+            print(f"Replaying {len(replayed)} write-behind journal entries")
+            self._wakeup.set()
+
+        self._drainer = asyncio.get_running_loop().create_task(self._drain_forever())
+
+    async def stop(self, timeout: float = 30.0):
+        """Drain what is queued (up to `timeout`) and stop; the journal keeps the rest"""
+        if self._drainer is None:
+            return
+        self._stopping = True
+        self._wakeup.set()
+        try:
+            await asyncio.wait_for(self._drainer, timeout)
+        except asyncio.TimeoutError:
+            self._drainer.cancel()
+            print(f"Warning: {len(self._pending)} write-behind entries left in journal at shutdown")
+
+    # Producers
+
+    async def enqueue(self, operations: List[Dict]):
+        """
+        Durably journal operations, in order, then queue them for draining.
+        `upload` operations carry their bytes under "content", or the path of a
+        file to copy under "source_path" (the file may be deleted once this returns).
+        """
+        async with self._journal_lock:
+            entries, blobs = [], []
+            now = time.time()
+            for operation in operations:
+                entry = {key: value for key, value in operation.items() if key not in ("content", "source_path")}
+                entry["seq"] = self._next_seq
+                entry["enqueued_at"] = now
+                if entry["op"] == "upload":
+                    entry["blob"] = os.path.join(self.blob_dir, f"{self._next_seq}.bin")
+                    blobs.append((entry["blob"], operation.get("content"), operation.get("source_path")))
+                entries.append(entry)
+                self._next_seq += 1
+
+            await run_blocking(self._append_journal, entries, blobs)
+            self._pending.extend(entries)
+
+        self._wakeup.set()
+
+    # Drainer
+
+    def _next_round(self) -> List[Dict]:
+        """Leading run of same-type operations, up to batch_size (one while isolating)"""
+        batch_size = 1 if self._isolating else self.batch_size
+        batch = []
+        for entry in self._pending:
+            if len(batch) >= batch_size or (batch and entry["op"] != batch[0]["op"]):
+                break
+            batch.append(entry)
+        return batch
+
+    def _read_blob(self, path: str) -> bytes:
+        with open(path, "rb") as f:
+            return f.read()
+
+    async def _apply(self, batch: List[Dict]):
+        if batch[0]["op"] == "upload":
+            async def upload(entry: Dict):
+                content = await run_blocking(self._read_blob, entry["blob"])
+                await self.storage_service.upload_file(content, entry["path"], entry.get("content_type"))
+
+            await asyncio.gather(*(upload(entry) for entry in batch))
+        elif batch[0]["op"] == "upsert_verification":
+            # A statement may touch each row once: merge writes to the same id, in order
+            rows: Dict[str, Dict] = {}
+            for entry in batch:
+                rows.setdefault(entry["row"]["id"], {}).update(entry["row"])
+            supabase = get_supabase_client()
+            with metrics.stage("db_write"):
+                await run_blocking(supabase.table("verifications").upsert(list(rows.values())).execute)
+        else:
+            raise ValueError(f"Unknown write-behind operation: {batch[0]['op']}")
+
+    def _acknowledge(self, batch: List[Dict]):
+        self._write_checkpoint(batch[-1]["seq"])
+        for entry in batch:
+            if entry.get("blob"):
+                try:
+                    os.remove(entry["blob"])
+                except FileNotFoundError:
+                    pass
+
+    def _dead_letter(self, entry: Dict, error: str):
+        """Set a rejected entry aside (with its blob), then checkpoint past it"""
+        if entry.get("blob") and os.path.exists(entry["blob"]):
+            os.makedirs(self.dead_letter_blob_dir, exist_ok=True)
+            blob = os.path.join(self.dead_letter_blob_dir, os.path.basename(entry["blob"]))
+            os.replace(entry["blob"], blob)
+            entry = {**entry, "blob": blob}
+        record = {"entry": entry, "error": error, "dead_lettered_at": time.time()}
+        with open(self.dead_letter_path, "ab") as f:
+            f.write((json.dumps(record) + "\n").encode("utf-8"))
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+        self._write_checkpoint(entry["seq"])
+        return record
+
+    async def _drain_forever(self):
+        attempt = 0
+        rejected = 0
+        while True:
+            if not self._pending:
+                if self._stopping:
+                    return
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                # Let a few more operations arrive so they share a round
+                await asyncio.sleep(self.flush_interval)
+                continue
+
+            batch = self._next_round()
+            try:
+                await self._apply(batch)
+            except Exception as e:
+                # Keep order: retry the same round until it succeeds
+                self.retries += 1
+                self.last_error = str(e)
+                print(f"Error draining write-behind queue (attempt {attempt + 1}): {e}")
+                if not _is_transient(e):
+                    rejected += 1
+                if rejected >= self.max_attempts:
+                    rejected = attempt = 0
+                    if len(batch) > 1:
+                        # Retry the round one entry at a time to find the one at fault
+                        self._isolating = len(batch)
+                        continue
+                    await self._dead_letter_head(batch[0], str(e))
+                    continue
+                await asyncio.sleep(min(30.0, random.uniform(0, 0.5 * (2 ** attempt))))
+                attempt = min(attempt + 1, 6)
+                continue
+
+            attempt = rejected = 0
+            self._isolating = max(0, self._isolating - len(batch))
+            async with self._journal_lock:
+                await run_blocking(self._acknowledge, batch)
+                for _ in batch:
+                    self._pending.popleft()
+                self._applied_seq = batch[-1]["seq"]
+                self.applied += len(batch)
+                self.last_drain_at = time.time()
+                if not self._pending:
+                    await run_blocking(self._compact)
+
+    async def _dead_letter_head(self, entry: Dict, error: str):
+        async with self._journal_lock:
+            record = await run_blocking(self._dead_letter, entry, error)
+            self._pending.popleft()
+            self._applied_seq = entry["seq"]
+            self._isolating = max(0, self._isolating - 1)
+            self.dead_lettered += 1
+            self.last_dead_letter = {"seq": entry["seq"], "op": entry["op"], "error": error}
+            if not self._pending:
+                await run_blocking(self._compact)
+        print(f"Moved write-behind entry {entry['seq']} ({entry['op']}) to {self.dead_letter_path}: {error}")
+        return record
+
+    def stats(self) -> Dict:
+        oldest = self._pending[0]["enqueued_at"] if self._pending else None
+        return {
+            "depth": len(self._pending),
+            "drain_lag_seconds": round(time.time() - oldest, 3) if oldest else 0.0,
+            "applied": self.applied,
+            "applied_seq": self._applied_seq,
+            "retries": self.retries,
+            "last_error": self.last_error,
+            "last_drain_at": self.last_drain_at,
+            "dead_lettered": self.dead_lettered,
+            "last_dead_letter": self.last_dead_letter,
+        }
+
+
+TRANSIENT_ERRORS = (RetryableStorageError, httpx.TransportError, ConnectionError, TimeoutError, asyncio.TimeoutError)
+
+# SQLSTATE classes of database-side trouble: connection (08), serialization and
+# deadlock (40), insufficient resources (53) and operator intervention (57)
+TRANSIENT_SQLSTATE_CLASSES = ("08", "40", "53", "57")
+
+
+def _is_transient(error: Optional[BaseException]) -> bool:
+    """
+    Failures that say nothing about the entry itself (outages, timeouts), which
+    never dead-letter it. Wrapped errors (`raise ... from e`) are unwrapped.
+    """
+    while error is not None:
+        if isinstance(error, TRANSIENT_ERRORS):
+            return True
+        if isinstance(error, APIError) and _is_transient_api_error(error):
+            return True
+        error = error.__cause__
+    return False
+
+
+def _is_transient_api_error(error: APIError) -> bool:
+    code = str(error.code or "")
+    if len(code) == 3 and code.isdigit():
+        # No JSON body (e.g. from a gateway): the code is the HTTP status
+        return code == "429" or code >= "500"
+    # PGRST000-PGRST003: PostgREST cannot reach the database or its pool timed out (HTTP 503/504)
+    return code.startswith("PGRST00") or code[:2] in TRANSIENT_SQLSTATE_CLASSES
@@ -0,0 +1,234 @@
+"""
+Inference worker for job-mode verifications (POST /jobs/verify).
+
+Each worker process loads the models once, then claims jobs from the
+shared job queue and runs up to JOB_WORKER_CONCURRENCY of them at a time,
+so concurrent jobs share micro-batches. Every finished stage is reported
+to the queue, where the API serves it to pollers and SSE subscribers.
+
+API nodes and workers scale independently: run as many worker processes
+as the inference load needs, on any host that shares the job queue,
+storage and database with the API.
+
+Usage:
+    python worker.py --processes 2
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import signal
+import socket
+import time
+from datetime import datetime
+from typing import Dict
+
+from dotenv import load_dotenv
+
+from services.executor import run_blocking
+from services.inference_pipeline import InferencePipeline
+from services.job_queue import JobQueue
+from services.replicas import available_cores, format_cores, pin_process_from_env, split_cores
+from services.profile_cache import ProfileCache
+from services.references import reference_set
+from services.storage_service import StorageService
+from services.verification import (
+    artifact_uploads, fetch_profile, reference_embedding_writer, verification_status
+)
+from services.write_behind import WriteBehindQueue
+
+load_dotenv()
+
+
+class VerificationWorker:
+    def __init__(self, worker_id: str, concurrency: int, poll_seconds: float,
+                 retention_seconds: float):
+        self.worker_id = worker_id
+        self.concurrency = max(1, concurrency)
+        self.poll_seconds = poll_seconds
+        self.retention_seconds = retention_seconds
+        self.storage_service = StorageService()
+        self.pipeline = InferencePipeline(self.storage_service)
+        self.write_behind = WriteBehindQueue.from_env(self.storage_service)
+        self.job_queue = JobQueue.from_env()
+        self.profile_cache = ProfileCache.from_env()
+        self.pipeline.on_reference_embedded = reference_embedding_writer(self.profile_cache)
+        self.stopping = asyncio.Event()
+        self.completed = 0
+        self.failed = 0
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(sig, self.stopping.set)
+
+        await self.write_behind.start()
+        await self.pipeline.ensure_loaded()
+        print(f"Worker {self.worker_id} ready ({self.concurrency} concurrent jobs)")
+        try:
+            await asyncio.gather(self._purge_forever(), *(self._slot() for _ in range(self.concurrency)))
+        finally:
+            # Jobs in flight finish before the process exits; unwritten records stay journaled
+            await self.write_behind.stop()
+            await self.storage_service.close()
+            self.job_queue.close()
+            print(f"Worker {self.worker_id} stopped: {self.completed} done, {self.failed} failed")
+
+    async def _slot(self):
+        while not self.stopping.is_set():
+            job = await run_blocking(self.job_queue.claim, self.worker_id)
+            if job is None:
+                try:
+                    await asyncio.wait_for(self.stopping.wait(), timeout=self.poll_seconds)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self._run_job(job)
+
+    async def _purge_forever(self):
+        while not self.stopping.is_set():
+            try:
+                await run_blocking(self.job_queue.purge, self.retention_seconds)
+            except Exception as e:
+                print(f"Error purging finished jobs: {e}")
+            try:
+                await asyncio.wait_for(self.stopping.wait(), timeout=3600)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _run_job(self, job: Dict):
+        job_id = job["id"]
+        started = time.perf_counter()
+        try:
+            result = await self._verify(job_id, job["payload"])
+            await run_blocking(self.job_queue.complete, job_id, result)
+            self.completed += 1
+            print(f"Job {job_id} done in {time.perf_counter() - started:.2f}s")
+        except Exception as e:
+            print(f"Job {job_id} failed: {e}")
+            self.failed += 1
+            await run_blocking(self.job_queue.fail, job_id, str(e))
+            try:
+                await self.write_behind.enqueue([
+                    {"op": "upsert_verification", "row": {**job["payload"]["row"], "status": "failed"}}
+                ])
+            except Exception:
+                pass
+
+    async def _profile(self, user_id: str) -> Dict:
+        profile = self.profile_cache.get(user_id)
+        if profile is None:
+            profile = await fetch_profile(user_id)
+            if profile is None:
+                raise LookupError("User profile not found")
+            self.profile_cache.put(user_id, profile)
+        return profile
+
+    async def _verify(self, job_id: str, payload: Dict) -> Dict:
+        """Same work as /verify, reporting each stage as it finishes"""
+        async def report(step: str, data: Dict):
+            await run_blocking(self.job_queue.progress, job_id, step, data)
+
+        user_id = payload["user_id"]
+        profile = await self._profile(user_id)
+        reference_sig_url = profile["reference_sig_url"]
+        document = await self.storage_service.download_file(
+            self.storage_service.public_url(payload["document_path"])
+        )
+
+        async def run_pipeline() -> Dict:
+            return await self.pipeline.process(
+                image=document,
+                reference_sig_url=reference_sig_url,
+                verification_id=job_id,
+                profile_id=user_id,
+                reference_version=profile.get("updated_at"),
+                references=reference_set(profile),
+                cleaning=payload.get("cleaning"),
+                on_progress=report
+            )
+
+        cache_key = await self.pipeline.result_cache_key(
+            payload["sha256"], reference_sig_url, user_id, profile.get("updated_at"), payload.get("cleaning")
+        )
+        result, cached = await self.pipeline.result_cache.get_or_compute(cache_key, run_pipeline)
+
+        # Crops are uploaded before the job is done, so the URLs it reports resolve
+        uploads = artifact_uploads(result)
+        if not cached:
+            await self.storage_service.upload_many([(op["content"], op["path"]) for op in uploads])
+        urls = {op["kind"]: self.storage_service.public_url(op["path"]) for op in uploads}
+        await report("upload", {"detected_sig_url": urls.get("detected"), "cleaned_sig_url": urls.get("cleaned")})
+
+        confidence_score = result.get("confidence_score", 0.0)
+        status = verification_status(confidence_score)
+        detections = result.get("detections", [])
+        await self.write_behind.enqueue([{"op": "upsert_verification", "row": {
+            **payload["row"],
+            "cleaned_sig_url": urls.get("cleaned"),
+            "confidence_score": confidence_score,
+            "detections": detections,
+            "status": status
+        }}])
+        return {
+            "verification_id": job_id,
+            "detected_sig_url": urls.get("detected"),
+            "cleaned_sig_url": urls.get("cleaned"),
+            "confidence_score": confidence_score,
+            "status": status,
+            "timestamp": datetime.utcnow().isoformat(),
+            "detections": detections,
+            "cached": cached,
+            "early_exit": result.get("early_exit")
+        }
+
+
+def run_process(index: int, cores: str = ""):
+    # Each process journals its own writes, so restarts replay only their own
+    journal_root = os.getenv("WRITE_BEHIND_DIR", "journal")
+    os.environ["WRITE_BEHIND_DIR"] = os.path.join(journal_root, f"worker-{index}")
+    if cores:
+        os.environ["PURESIGN_CORES"] = cores
+    pin_process_from_env()
+    worker = VerificationWorker(
+        worker_id=f"{socket.gethostname()}-{index}",
+        concurrency=int(os.getenv("JOB_WORKER_CONCURRENCY", "4")),
+        poll_seconds=float(os.getenv("JOB_POLL_MS", "200")) / 1000.0,
+        retention_seconds=float(os.getenv("JOB_RETENTION_SECONDS", "86400")),
+    )
+    asyncio.run(worker.run())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--processes", type=int, default=int(os.getenv("JOB_WORKERS", "1")))
+    args = parser.parse_args()
+
+    if args.processes <= 1:
+        run_process(0)
+        return
+
+    # Each process gets its own slice of the cores rather than all of them competing for every core
+    core_sets = split_cores(available_cores(), args.processes)
+    context = multiprocessing.get_context("spawn")
+    processes = [
+        context.Process(target=run_process, args=(i, format_cores(core_sets[i % len(core_sets)])), name=f"worker-{i}")
+        for i in range(args.processes)
+    ]
+    for process in processes:
+        process.start()
+
+    def forward(signum, _frame):
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+
+    signal.signal(signal.SIGTERM, forward)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # The children get the terminal's SIGINT themselves
+    for process in processes:
+        process.join()
+
+
+if __name__ == "__main__":
+    main()
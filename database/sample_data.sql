@@ -10,6 +10,12 @@ VALUES (
     'https://your-project.supabase.co/storage/v1/object/public/puresign-storage/reference_sigs/test_signature.jpg'
 );
 
+-- Its reference signature row (the profile trigger adds it too; this keeps the seed explicit)
+INSERT INTO reference_signatures (profile_id, sig_url)
+SELECT id, reference_sig_url FROM profiles
+WHERE id = '00000000-0000-0000-0000-000000000001'
+ON CONFLICT (profile_id, sig_url) DO NOTHING;
+
 -- Insert sample verification records
 INSERT INTO verifications (id, user_id, original_doc_url, cleaned_sig_url, confidence_score, status)
 VALUES (
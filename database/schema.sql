@@ -16,15 +16,57 @@ CREATE TABLE IF NOT EXISTS verifications (
     original_doc_url TEXT NOT NULL,
     cleaned_sig_url TEXT,
     confidence_score FLOAT,
+    detections JSONB,
     timestamp TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
     status VARCHAR(50) NOT NULL CHECK (status IN ('success', 'failed', 'processing')),
     created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
 
+-- Per-signature detection boxes and scores (added after the initial release)
+ALTER TABLE verifications ADD COLUMN IF NOT EXISTS detections JSONB;
+
+-- Reference signatures: several per profile, with the embedding computed on upload
+-- (float16, little-endian) and the model that produced it
+CREATE TABLE IF NOT EXISTS reference_signatures (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    profile_id UUID NOT NULL REFERENCES profiles(id) ON DELETE CASCADE,
+    sig_url TEXT NOT NULL,
+    embedding BYTEA,
+    embedding_model VARCHAR(100),
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    UNIQUE (profile_id, sig_url)
+);
+
+-- Existing profiles start with their single reference
+INSERT INTO reference_signatures (profile_id, sig_url)
+SELECT id, reference_sig_url FROM profiles
+ON CONFLICT (profile_id, sig_url) DO NOTHING;
+
+-- New profiles (including those written straight from the frontend) get a row for their reference too
+CREATE OR REPLACE FUNCTION add_initial_reference_signature()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF NEW.reference_sig_url IS NOT NULL THEN
+        INSERT INTO reference_signatures (profile_id, sig_url)
+        VALUES (NEW.id, NEW.reference_sig_url)
+        ON CONFLICT (profile_id, sig_url) DO NOTHING;
+    END IF;
+    RETURN NEW;
+END;
+$$ language 'plpgsql';
+
+DROP TRIGGER IF EXISTS add_profile_reference_signature ON profiles;
+CREATE TRIGGER add_profile_reference_signature AFTER INSERT ON profiles
+    FOR EACH ROW EXECUTE FUNCTION add_initial_reference_signature();
+
 -- Indexes for better query performance
-CREATE INDEX IF NOT EXISTS idx_verifications_user_id ON verifications(user_id);
+-- History pages are read by keyset on (user_id, timestamp, id), newest first;
+-- this index also serves lookups by user_id alone
+CREATE INDEX IF NOT EXISTS idx_verifications_user_timestamp ON verifications(user_id, timestamp DESC, id DESC);
+DROP INDEX IF EXISTS idx_verifications_user_id;
 CREATE INDEX IF NOT EXISTS idx_verifications_timestamp ON verifications(timestamp);
 CREATE INDEX IF NOT EXISTS idx_verifications_status ON verifications(status);
+CREATE INDEX IF NOT EXISTS idx_reference_signatures_profile_id ON reference_signatures(profile_id);
 
 -- Function to update updated_at timestamp
 CREATE OR REPLACE FUNCTION update_updated_at_column()
@@ -1,5 +1,5 @@
 import { useEffect, useState } from 'react'
-import { VerificationResult, VerificationHistory } from '../types'
+import { VerificationResult, VerificationHistory, HistoryFilters } from '../types'
 import { getVerifications } from '../services/api'
 import VerificationCard from './VerificationCard'
 import HistoryTable from './HistoryTable'
@@ -11,12 +11,15 @@ interface DashboardProps {
 
 export default function Dashboard({ verificationResult, onStartVerification }: DashboardProps) {
   const [history, setHistory] = useState<VerificationHistory[]>([])
+  const [nextCursor, setNextCursor] = useState<string | null>(null)
+  const [filters, setFilters] = useState<HistoryFilters>({})
   const [loading, setLoading] = useState(false)
+  const [loadingMore, setLoadingMore] = useState(false)
   const userId = localStorage.getItem('userId') || 'default-user-id' // In production, use auth
 
   useEffect(() => {
     loadHistory()
-  }, [])
+  }, [filters])
 
   useEffect(() => {
     if (verificationResult) {
@@ -24,11 +27,13 @@ export default function Dashboard({ verificationResult, onStartVerification }: D
     }
   }, [verificationResult])
 
+  // First page for the current filters
   const loadHistory = async () => {
     setLoading(true)
     try {
-      const verifications = await getVerifications(userId)
-      setHistory(verifications)
+      const page = await getVerifications(userId, filters)
+      setHistory(page.verifications)
+      setNextCursor(page.next_cursor)
     } catch (error) {
       console.error('Failed to load verification history:', error)
     } finally {
@@ -36,6 +41,20 @@ export default function Dashboard({ verificationResult, onStartVerification }: D
     }
   }
 
+  const loadMore = async () => {
+    if (!nextCursor) return
+    setLoadingMore(true)
+    try {
+      const page = await getVerifications(userId, filters, nextCursor)
+      setHistory((previous) => [...previous, ...page.verifications])
+      setNextCursor(page.next_cursor)
+    } catch (error) {
+      console.error('Failed to load more verification history:', error)
+    } finally {
+      setLoadingMore(false)
+    }
+  }
+
   return (
     <div className="space-y-6">
       {/* Header */}
@@ -65,11 +84,15 @@ export default function Dashboard({ verificationResult, onStartVerification }: D
       {/* History */}
       <div className="bg-white rounded-lg shadow p-6">
         <h3 className="text-xl font-semibold text-gray-900 mb-4">Verification History</h3>
-        {loading ? (
-          <div className="text-center py-8 text-gray-500">Loading...</div>
-        ) : (
-          <HistoryTable verifications={history} />
-        )}
+        <HistoryTable
+          verifications={history}
+          loading={loading}
+          filters={filters}
+          onFiltersChange={setFilters}
+          hasMore={nextCursor !== null}
+          loadingMore={loadingMore}
+          onLoadMore={loadMore}
+        />
       </div>
     </div>
   )
@@ -1,20 +1,84 @@
-import { VerificationHistory } from '../types'
+import { VerificationHistory, HistoryFilters } from '../types'
 
 interface HistoryTableProps {
   verifications: VerificationHistory[]
+  loading: boolean
+  filters: HistoryFilters
+  onFiltersChange: (filters: HistoryFilters) => void
+  hasMore: boolean
+  loadingMore: boolean
+  onLoadMore: () => void
 }
 
-export default function HistoryTable({ verifications }: HistoryTableProps) {
+export default function HistoryTable({
+  verifications,
+  loading,
+  filters,
+  onFiltersChange,
+  hasMore,
+  loadingMore,
+  onLoadMore,
+}: HistoryTableProps) {
+  const filtered = Boolean(filters.status || filters.since || filters.until)
+
+  const filterBar = (
+    <div className="flex flex-wrap gap-4 mb-4 text-sm">
+      <select
+        value={filters.status || ''}
+        onChange={(e) => onFiltersChange({ ...filters, status: (e.target.value || undefined) as HistoryFilters['status'] })}
+        className="border border-gray-300 rounded-md px-3 py-2"
+      >
+        <option value="">All statuses</option>
+        <option value="success">Success</option>
+        <option value="failed">Failed</option>
+        <option value="processing">Processing</option>
+      </select>
+      <label className="flex items-center gap-2 text-gray-600">
+        From
+        <input
+          type="date"
+          value={filters.since || ''}
+          onChange={(e) => onFiltersChange({ ...filters, since: e.target.value || undefined })}
+          className="border border-gray-300 rounded-md px-3 py-2"
+        />
+      </label>
+      <label className="flex items-center gap-2 text-gray-600">
+        Before
+        <input
+          type="date"
+          value={filters.until || ''}
+          onChange={(e) => onFiltersChange({ ...filters, until: e.target.value || undefined })}
+          className="border border-gray-300 rounded-md px-3 py-2"
+        />
+      </label>
+    </div>
+  )
+
+  if (loading) {
+    return (
+      <div>
+        {filterBar}
+        <div className="text-center py-8 text-gray-500">Loading...</div>
+      </div>
+    )
+  }
+
   if (verifications.length === 0) {
     return (
-      <div className="text-center py-8 text-gray-500">
-        No verification history yet. Start by verifying a document.
+      <div>
+        {filterBar}
+        <div className="text-center py-8 text-gray-500">
+          {filtered
+            ? 'No verifications match these filters.'
+            : 'No verification history yet. Start by verifying a document.'}
+        </div>
       </div>
     )
   }
 
   return (
     <div className="overflow-x-auto">
+      {filterBar}
       <table className="min-w-full divide-y divide-gray-200">
         <thead className="bg-gray-50">
           <tr>
@@ -70,6 +134,17 @@ export default function HistoryTable({ verifications }: HistoryTableProps) {
           ))}
         </tbody>
       </table>
+      {hasMore && (
+        <div className="text-center mt-4">
+          <button
+            onClick={onLoadMore}
+            disabled={loadingMore}
+            className="px-4 py-2 text-sm font-medium text-primary-600 hover:text-primary-900 disabled:text-gray-400"
+          >
+            {loadingMore ? 'Loading...' : 'Load more'}
+          </button>
+        </div>
+      )}
     </div>
   )
 }
@@ -1,27 +1,42 @@
-import { VerificationResult } from '../types'
+import { JobStep, JobStepName, VerificationResult } from '../types'
 
 interface StepVisualizationProps {
-  result: VerificationResult
+  result: VerificationResult | null
+  // Progress of a queued verification, in the order the stages finished
+  steps?: JobStep[]
 }
 
-export default function StepVisualization({ result }: StepVisualizationProps) {
+export default function StepVisualization({ result, steps: progress = [] }: StepVisualizationProps) {
+  const finished = (name: JobStepName) => progress.find((step) => step.step === name)
+  const upload = finished('upload')
+  const failed = finished('failed')
+  // While a job runs, a stage is "processing" until its step arrives
+  const stageStatus = (done: boolean) => (done ? 'success' : failed ? 'failed' : 'processing')
+
+  const detectedUrl = result?.detected_sig_url || upload?.data.detected_sig_url
+  const cleanedUrl = result?.cleaned_sig_url || upload?.data.cleaned_sig_url
+  const boxes = finished('detect')?.data.boxes?.length
+  const paths: string[] = finished('clean')?.data.paths || []
+
   const steps = [
     {
       title: 'Detected',
-      description: 'Signature detected by YOLO',
-      imageUrl: result.detected_sig_url,
-      status: result.detected_sig_url ? 'success' : 'pending'
+      description: boxes ? `${boxes} signature${boxes === 1 ? '' : 's'} detected by YOLO` : 'Signature detected by YOLO',
+      imageUrl: detectedUrl,
+      status: result ? (result.detected_sig_url ? 'success' : 'pending') : stageStatus(Boolean(finished('detect')))
     },
     {
       title: 'Purified',
-      description: 'Background artifacts removed by CycleGAN',
-      imageUrl: result.cleaned_sig_url,
-      status: result.cleaned_sig_url ? 'success' : 'pending'
+      description: paths.includes('gan') || paths.length === 0
+        ? 'Background artifacts removed by CycleGAN'
+        : 'Background artifacts removed by the classical cleaner',
+      imageUrl: cleanedUrl,
+      status: result ? (result.cleaned_sig_url ? 'success' : 'pending') : stageStatus(Boolean(finished('clean')))
     },
     {
       title: 'Result',
-      description: 'Verification complete',
-      status: result.status
+      description: result || !failed ? 'Verification complete' : failed.data.error || 'Verification failed',
+      status: result ? result.status : stageStatus(false)
     }
   ]
 
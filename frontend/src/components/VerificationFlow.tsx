@@ -1,7 +1,7 @@
 import { useState } from 'react'
 import { useDropzone } from 'react-dropzone'
-import { verifySignature } from '../services/api'
-import { VerificationResult } from '../types'
+import { VERIFY_MODE, followJob, submitVerificationJob, verifySignature } from '../services/api'
+import { JobStep, VerificationResult } from '../types'
 import StepVisualization from './StepVisualization'
 import ConfidenceGauge from './ConfidenceGauge'
 import { detectSignatureLocal, initializeLocalDetection, isLocalProcessingAvailable } from '../services/localDetection'
@@ -16,6 +16,7 @@ export default function VerificationFlow({ onComplete, onCancel }: VerificationF
   const [localProcessing, setLocalProcessing] = useState(false)
   const [processing, setProcessing] = useState(false)
   const [result, setResult] = useState<VerificationResult | null>(null)
+  const [steps, setSteps] = useState<JobStep[]>([])
   const [error, setError] = useState<string | null>(null)
   const userId = localStorage.getItem('userId') || 'default-user-id' // In production, use auth
 
@@ -40,6 +41,8 @@ export default function VerificationFlow({ onComplete, onCancel }: VerificationF
 
     setProcessing(true)
     setError(null)
+    setResult(null)
+    setSteps([])
 
     try {
       // Initialize local detection if enabled
@@ -49,8 +52,17 @@ export default function VerificationFlow({ onComplete, onCancel }: VerificationF
         // For now, we still send to server but the toggle demonstrates the concept
       }
 
-      const verificationResult = await verifySignature(file, userId, localProcessing)
-      setResult(verificationResult)
+      if (VERIFY_MODE === 'job') {
+        // Returns as soon as the document is queued; each stage shows up as it finishes
+        const job = await submitVerificationJob(file, userId)
+        const verificationResult = await followJob(job.verification_id, (step) =>
+          setSteps((previous) => [...previous, step])
+        )
+        setResult(verificationResult)
+      } else {
+        const verificationResult = await verifySignature(file, userId, localProcessing)
+        setResult(verificationResult)
+      }
     } catch (err: any) {
       setError(err.response?.data?.detail || err.message || 'Verification failed')
     } finally {
@@ -166,24 +178,28 @@ export default function VerificationFlow({ onComplete, onCancel }: VerificationF
       </div>
 
       {/* Results Visualization */}
-      {result && (
+      {(result || steps.length > 0) && (
         <div className="bg-white rounded-lg shadow p-6">
           <h3 className="text-xl font-semibold text-gray-900 mb-6">Verification Results</h3>
           
-          <StepVisualization result={result} />
+          <StepVisualization result={result} steps={steps} />
           
-          <div className="mt-8">
-            <ConfidenceGauge score={result.confidence_score} />
-          </div>
+          {result && (
+            <>
+              <div className="mt-8">
+                <ConfidenceGauge score={result.confidence_score} />
+              </div>
 
-          <div className="mt-6 flex justify-end">
-            <button
-              onClick={handleComplete}
-              className="px-6 py-3 bg-primary-600 text-white rounded-lg font-semibold hover:bg-primary-700 transition-colors"
-            >
-              Done
-            </button>
-          </div>
+              <div className="mt-6 flex justify-end">
+                <button
+                  onClick={handleComplete}
+                  className="px-6 py-3 bg-primary-600 text-white rounded-lg font-semibold hover:bg-primary-700 transition-colors"
+                >
+                  Done
+                </button>
+              </div>
+            </>
+          )}
         </div>
       )}
     </div>
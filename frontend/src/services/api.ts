@@ -1,8 +1,21 @@
 import axios from 'axios'
-import { VerificationResult, UserProfile, VerificationHistory } from '../types'
+import {
+  VerificationResult,
+  UserProfile,
+  VerificationHistoryPage,
+  HistoryFilters,
+  ReferenceSignature,
+  JobStep,
+  JobSubmission,
+  VerificationJob,
+} from '../types'
 
 const API_BASE_URL = import.meta.env.VITE_API_BASE_URL || 'http://localhost:8000'
 
+// "sync" (the default) waits on /verify; "job" queues verifications for the inference workers
+// (worker.py, which must be running) and follows their progress
+export const VERIFY_MODE: 'job' | 'sync' = import.meta.env.VITE_VERIFY_MODE === 'job' ? 'job' : 'sync'
+
 const api = axios.create({
   baseURL: API_BASE_URL,
   headers: {
@@ -31,13 +44,126 @@ export const verifySignature = async (
   return response.data
 }
 
+export const submitVerificationJob = async (file: File, userId: string): Promise<JobSubmission> => {
+  const formData = new FormData()
+  formData.append('file', file)
+
+  const response = await api.post<JobSubmission>('/jobs/verify', formData, {
+    headers: {
+      'Content-Type': 'multipart/form-data',
+    },
+    params: {
+      user_id: userId,
+    },
+  })
+  return response.data
+}
+
+export const getJob = async (verificationId: string): Promise<VerificationJob> => {
+  const response = await api.get<{ job: VerificationJob }>(`/jobs/${verificationId}`)
+  return response.data.job
+}
+
+const jobOutcome = (job: VerificationJob): VerificationResult => {
+  if (job.status !== 'done' || !job.result) {
+    throw new Error(job.error || 'Verification failed')
+  }
+  return job.result
+}
+
+// Polling fallback for when the event stream is unavailable
+const pollJob = async (
+  verificationId: string,
+  onStep: (step: JobStep) => void,
+  seen: number,
+  intervalMs: number = 1000
+): Promise<VerificationResult> => {
+  for (;;) {
+    const job = await getJob(verificationId)
+    for (const step of job.steps || []) {
+      if (step.seq > seen) {
+        onStep(step)
+        seen = step.seq
+      }
+    }
+    if (job.status === 'done' || job.status === 'failed') {
+      return jobOutcome(job)
+    }
+    await new Promise((resolve) => setTimeout(resolve, intervalMs))
+  }
+}
+
+/**
+ * Follow a queued verification until it finishes, calling `onStep` for each
+ * stage as it completes. Uses the server-sent event stream and falls back to
+ * polling if the stream cannot be kept open.
+ */
+export const followJob = (
+  verificationId: string,
+  onStep: (step: JobStep) => void
+): Promise<VerificationResult> => {
+  return new Promise((resolve, reject) => {
+    let seen = 0
+    const source = new EventSource(`${API_BASE_URL}/jobs/${verificationId}/events`)
+
+    source.addEventListener('step', (event) => {
+      const step: JobStep = JSON.parse((event as MessageEvent).data)
+      seen = step.seq
+      onStep(step)
+    })
+    source.addEventListener('end', (event) => {
+      source.close()
+      try {
+        resolve(jobOutcome(JSON.parse((event as MessageEvent).data)))
+      } catch (error) {
+        reject(error)
+      }
+    })
+    source.onerror = () => {
+      // EventSource reconnects on its own (resuming after the last step); only a closed stream needs polling
+      if (source.readyState === EventSource.CLOSED) {
+        pollJob(verificationId, onStep, seen).then(resolve, reject)
+      }
+    }
+  })
+}
+
 export const getProfile = async (userId: string): Promise<UserProfile> => {
   const response = await api.get<{ profile: UserProfile }>(`/profile/${userId}`)
   return response.data.profile
 }
 
-export const getVerifications = async (userId: string): Promise<VerificationHistory[]> => {
-  const response = await api.get<{ verifications: VerificationHistory[] }>(`/verifications/${userId}`)
-  return response.data.verifications
+export const addReference = async (userId: string, file: File): Promise<ReferenceSignature> => {
+  const formData = new FormData()
+  formData.append('file', file)
+
+  const response = await api.post<{ reference: ReferenceSignature }>(`/profile/${userId}/references`, formData, {
+    headers: {
+      'Content-Type': 'multipart/form-data',
+    },
+  })
+  return response.data.reference
+}
+
+export const deleteReference = async (userId: string, referenceId: string): Promise<void> => {
+  await api.delete(`/profile/${userId}/references/${referenceId}`)
+}
+
+export const getVerifications = async (
+  userId: string,
+  filters: HistoryFilters = {},
+  cursor: string | null = null,
+  limit: number = 50
+): Promise<VerificationHistoryPage> => {
+  const response = await api.get<VerificationHistoryPage>(`/verifications/${userId}`, {
+    params: {
+      limit,
+      cursor: cursor || undefined,
+      status: filters.status || undefined,
+      since: filters.since || undefined,
+      until: filters.until || undefined,
+    },
+  })
+  return response.data
 }
 
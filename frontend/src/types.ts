@@ -1,3 +1,12 @@
+export interface Detection {
+  bbox: [number, number, number, number] | null
+  confidence: number
+  score: number
+  cleaning?: 'classical' | 'gan' | 'placeholder' | 'none'
+  cleaning_ms?: number
+  verified_by?: 'fast' | 'full' | 'default'
+}
+
 export interface VerificationResult {
   verification_id: string
   detected_sig_url?: string
@@ -5,23 +14,72 @@ export interface VerificationResult {
   confidence_score: number
   status: 'success' | 'failed' | 'processing'
   timestamp: string
+  detections?: Detection[]
+  cached?: boolean
+  early_exit?: 'detect' | 'verify_fast' | null
+}
+
+export type JobStepName = 'queued' | 'running' | 'detect' | 'clean' | 'verify' | 'upload' | 'done' | 'failed'
+
+export interface JobStep {
+  seq: number
+  step: JobStepName
+  data: Record<string, any>
+  at: number
+}
+
+export interface VerificationJob {
+  id: string
+  kind: string
+  status: 'queued' | 'running' | 'done' | 'failed'
+  attempts: number
+  result: VerificationResult | null
+  error: string | null
+  steps?: JobStep[]
+}
+
+export interface JobSubmission {
+  verification_id: string
+  status: string
+  status_url: string
+  events_url: string
 }
 
 export interface UserProfile {
   id: string
   user_name: string
   reference_sig_url: string
+  reference_signatures?: ReferenceSignature[]
   created_at: string
   updated_at: string
 }
 
+export interface ReferenceSignature {
+  id: string
+  sig_url: string
+  created_at: string
+  embedding_model?: string
+}
+
 export interface VerificationHistory {
   id: string
   user_id: string
   original_doc_url: string
   cleaned_sig_url?: string
   confidence_score?: number
+  detections?: Detection[]
   timestamp: string
   status: string
 }
 
+export interface VerificationHistoryPage {
+  verifications: VerificationHistory[]
+  next_cursor: string | null
+}
+
+export interface HistoryFilters {
+  status?: 'success' | 'failed' | 'processing'
+  since?: string
+  until?: string
+}
+